@@ -0,0 +1,62 @@
+"""Measure how parse_many() scales with the number of workers, over
+the examples/cpython schemas replicated to a few thousand files."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from argparse import ArgumentParser
+from pathlib import Path
+
+from common import ASDL_DIR, measure, report
+
+import pyasdl
+
+
+def replicate(directory, count):
+    sources = sorted(ASDL_DIR.glob("*.asdl"))
+    paths = []
+    for index in range(count):
+        source = sources[index % len(sources)]
+        path = Path(directory) / f"{index}-{source.name}"
+        shutil.copyfile(source, path)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--files", type=int, default=3_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--executor", choices=["process", "thread"], default="process")
+    parser.add_argument("--engine", choices=pyasdl.ENGINES, default="pegen")
+    parser.add_argument("--repeat", type=int, default=1)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = replicate(directory, options.files)
+
+        sequential = measure(
+            lambda: [pyasdl.parse_file(path, engine=options.engine) for path in paths],
+            repeat=options.repeat,
+        )
+        report(f"parse_file ({options.files} files)", sequential)
+
+        counts = {options.max_workers}
+        counts.update(2**power for power in range(options.max_workers.bit_length()))
+        for workers in sorted(counts):
+            seconds = measure(
+                lambda: pyasdl.parse_many(
+                    paths,
+                    workers=workers,
+                    executor=options.executor,
+                    engine=options.engine,
+                ),
+                repeat=options.repeat,
+            )
+            report(f"parse_many ({workers} workers)", seconds, baseline=sequential)
+
+
+if __name__ == "__main__":
+    main()
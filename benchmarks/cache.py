@@ -0,0 +1,49 @@
+"""Compare loading a module from the parse cache (both from the
+in-memory layer and from the disk) against parsing it again."""
+
+from __future__ import annotations
+
+import tempfile
+from argparse import ArgumentParser
+
+from common import cpython_sources, measure, report, synthetic_schema
+
+import pyasdl
+import pyasdl.cache
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--definitions", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--engine", choices=pyasdl.ENGINES, default="pegen")
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    sources = {"Python-311.asdl": cpython_sources()["Python-311.asdl"]}
+    for count in options.definitions:
+        sources[f"synthetic ({count} definitions)"] = synthetic_schema(count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, source in sources.items():
+            full = measure(
+                lambda: pyasdl.parse(source, engine=options.engine),
+                repeat=options.repeat,
+            )
+            report(f"{name} (parse)", full)
+
+            for label, memory_entries in [("disk", 0), ("memory", 128)]:
+                pyasdl.cache.enable(directory, memory_entries=memory_entries)
+                try:
+                    # Populate the cache
+                    pyasdl.parse(source, engine=options.engine)
+                    cached = measure(
+                        lambda: pyasdl.parse(source, engine=options.engine),
+                        repeat=options.repeat,
+                    )
+                finally:
+                    pyasdl.cache.disable()
+                report(f"{name} (cache, {label})", cached, baseline=full)
+
+
+if __name__ == "__main__":
+    main()
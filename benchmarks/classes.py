@@ -0,0 +1,114 @@
+"""Measure build_classes() on Python-311.asdl against the code generation
+round trip (generating the dataclasses with the Python class generator and
+executing them), and the construction of the instances of both while
+converting the Python ASTs of a few standard library modules."""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import inspect
+import sys
+from argparse import ArgumentParser
+
+from common import BENCHMARKS_DIR, cpython_sources, measure, report
+
+import pyasdl
+
+sys.path.insert(0, str(BENCHMARKS_DIR.parent / "examples" / "generators" / "src"))
+from python import PythonGenerator  # noqa: E402
+
+PRELUDE = """\
+from __future__ import annotations
+import typing
+from dataclasses import dataclass as _dataclass, field as _field
+from enum import Enum as _Enum, auto as _auto
+identifier = str
+string = typing.Any
+constant = typing.Any
+class AST: ...
+"""
+
+
+def generate_dataclasses(tree):
+    source = ast.unparse(
+        ast.fix_missing_locations(PythonGenerator(with_defaults=False).generate(tree))
+    )
+    namespace = {}
+    exec(compile(PRELUDE + source, "<dataclasses>", "exec"), namespace)
+    return namespace
+
+
+def converter(classes):
+    # Convert the Python ASTs to the given classes (the attributes are
+    # only passed to the products, since the generated dataclasses don't
+    # take the attributes of the sums).
+    def convert(node):
+        if isinstance(node, ast.AST):
+            name = type(node).__name__
+            if name not in classes:
+                # A member of a simple sum (enum)
+                return classes[type(node).__base__.__name__][name]
+            cls = classes[name]
+            names = node._fields
+            if type(node).__base__ is ast.AST:
+                names += node._attributes
+            return cls(*[convert(getattr(node, name, None)) for name in names])
+        elif isinstance(node, list):
+            return [convert(item) for item in node]
+        return node
+
+    return convert
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    tree = pyasdl.parse(cpython_sources()["Python-311.asdl"])
+    baseline = measure(lambda: generate_dataclasses(tree), repeat=options.repeat)
+    report("codegen + exec (dataclasses)", baseline)
+    report(
+        "build_classes()",
+        measure(lambda: pyasdl.build_classes(tree), repeat=options.repeat),
+        baseline=baseline,
+    )
+
+    modules = [
+        ast.parse(inspect.getsource(module)) for module in (ast, inspect, argparse)
+    ]
+    generated_classes = generate_dataclasses(tree)
+    built_classes = vars(pyasdl.build_classes(tree))
+    generated = converter(generated_classes)
+    built = converter(built_classes)
+
+    baseline = measure(
+        lambda: [generated(module) for module in modules], repeat=options.repeat
+    )
+    report("construct (dataclasses)", baseline)
+    report(
+        "construct (build_classes)",
+        measure(lambda: [built(module) for module in modules], repeat=options.repeat),
+        baseline=baseline,
+    )
+
+    for name, args in [
+        ("Name", ("x", "Load")),
+        ("Call", (None, [], [])),
+        ("arguments", ([], [], None, [], [], None, [])),
+    ]:
+        results = []
+        for namespace in (generated_classes, built_classes):
+            cls = namespace[name]
+            values = [
+                namespace["expr_context"].Load if value == "Load" else value
+                for value in args
+            ]
+            results.append(measure(lambda: [cls(*values) for _ in range(100_000)]))
+        report(f"{name}() x 100k (dataclasses)", results[0])
+        report(f"{name}() x 100k (build_classes)", results[1], baseline=results[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare the codecs of pyasdl.codec.compile() against pickle, on the
+Python ASTs of a few standard library modules (with the grammar of the
+running Python as the schema); both for the classes of build_classes()
+and for the ones of the ast module itself."""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import dataclasses
+import inspect
+import pickle
+import sys
+import typing
+from argparse import ArgumentParser
+
+from common import cpython_sources, measure, report
+
+import pyasdl
+import pyasdl.codec
+
+MODULES = [ast, inspect, argparse, typing, dataclasses]
+
+
+def compare(name, codec, trees, repeat):
+    encoded = [codec.encode(tree) for tree in trees]
+    pickled = [pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL) for tree in trees]
+    print(
+        f"{name}: {sum(map(len, encoded))} bytes encoded,"
+        f" {sum(map(len, pickled))} bytes pickled"
+    )
+
+    baseline = measure(
+        lambda: [
+            pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL) for tree in trees
+        ],
+        repeat=repeat,
+    )
+    report(f"{name} (pickle.dumps)", baseline)
+    report(
+        f"{name} (encode)",
+        measure(lambda: [codec.encode(tree) for tree in trees], repeat=repeat),
+        baseline=baseline,
+    )
+
+    baseline = measure(lambda: [pickle.loads(data) for data in pickled], repeat=repeat)
+    report(f"{name} (pickle.loads)", baseline)
+    report(
+        f"{name} (decode)",
+        measure(lambda: [codec.decode(data) for data in encoded], repeat=repeat),
+        baseline=baseline,
+    )
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    schema = pyasdl.parse(
+        cpython_sources()["Python-{}{}.asdl".format(*sys.version_info)]
+    )
+    report(
+        "compile (build_classes)",
+        measure(lambda: pyasdl.codec.compile(schema), repeat=options.repeat),
+    )
+    report(
+        "compile (ast)",
+        measure(lambda: pyasdl.codec.compile(schema, ast), repeat=options.repeat),
+    )
+
+    ast_codec = pyasdl.codec.compile(schema, ast)
+    codec = pyasdl.codec.compile(schema)
+    # So that pickle can find the classes by their module
+    sys.modules[codec.classes.__name__] = codec.classes
+
+    trees = [ast.parse(inspect.getsource(module)) for module in MODULES]
+    print(f"{sum(1 for tree in trees for _ in ast.walk(tree))} nodes")
+    compare("ast", ast_codec, trees, options.repeat)
+    compare(
+        "build_classes",
+        codec,
+        [codec.decode(ast_codec.encode(tree)) for tree in trees],
+        options.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
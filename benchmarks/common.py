@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).parent
+ASDL_DIR = BENCHMARKS_DIR.parent / "examples" / "cpython"
+
+BUILTIN_KINDS = ("identifier", "string", "int", "constant")
+
+
+def cpython_sources() -> dict[str, str]:
+    return {file.name: file.read_text() for file in sorted(ASDL_DIR.glob("*.asdl"))}
+
+
+def synthetic_definitions(count: int) -> Iterator[str]:
+    for index in range(count):
+        previous = f"type_{index - 1}" if index else "identifier"
+        if index % 3 == 0:
+            yield (
+                f"    type_{index} = Node_{index}(int value, {previous}* children)\n"
+                f"        | Leaf_{index}(identifier name, string? doc)\n"
+                "        attributes (int lineno, int col_offset)\n"
+            )
+        elif index % 3 == 1:
+            yield f"    type_{index} = (identifier name, {previous}? parent)\n"
+        else:
+            yield f"    type_{index} = Load_{index} | Store_{index} | Del_{index}\n"
+
+
+def synthetic_schema(count: int, name: str = "Synthetic") -> str:
+    """Generate a synthetic ASDL module with `count` definitions."""
+    return (
+        f"-- generated schema with {count} definitions\nmodule {name}\n{{\n"
+        + "".join(synthetic_definitions(count))
+        + "}\n"
+    )
+
+
+def measure(func: Callable[[], object], *, repeat: int = 5) -> float:
+    """Return the best wall time (in seconds) of `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func: Callable[[], object]) -> int:
+    """Return the peak memory (in bytes) allocated while running `func`."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def report(name: str, seconds: float, *, baseline: float | None = None) -> None:
+    line = f"{name:<40} {seconds * 1000:>10.3f} ms"
+    if baseline is not None:
+        line += f"  ({baseline / seconds:.2f}x)"
+    print(line)
@@ -0,0 +1,53 @@
+"""Measure diff() between two versions of schemas of different sizes,
+both for separately parsed trees and for frozen ones (where all the
+unchanged definitions are shared)."""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+
+from common import cpython_sources, measure, report, synthetic_schema
+
+import pyasdl
+
+
+def edit(source, every):
+    # Add a field to every `every`th product definition
+    lines = source.splitlines(keepends=True)
+    products = [index for index, line in enumerate(lines) if "= (" in line]
+    for index in products[::every]:
+        lines[index] = lines[index].replace("= (", "= (int edited, ", 1)
+    return "".join(lines)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--definitions", type=int, nargs="+", default=[1_000, 10_000, 50_000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    sources = {"Python-311.asdl": cpython_sources()["Python-311.asdl"]}
+    for count in options.definitions:
+        sources[f"synthetic ({count} definitions)"] = synthetic_schema(count)
+
+    for name, old_source in sources.items():
+        new_source = edit(old_source, every=10)
+        old = pyasdl.parse(old_source, engine="ll1")
+        new = pyasdl.parse(new_source, engine="ll1")
+        frozen_old, frozen_new = pyasdl.freeze(old), pyasdl.freeze(new)
+        print(f"{name}: {len(pyasdl.diff(old, new).changed)} changed definitions")
+
+        report(
+            f"{name} (separate trees)",
+            measure(lambda: pyasdl.diff(old, new), repeat=options.repeat),
+        )
+        report(
+            f"{name} (frozen trees)",
+            measure(lambda: pyasdl.diff(frozen_old, frozen_new), repeat=options.repeat),
+        )
+
+
+if __name__ == "__main__":
+    main()
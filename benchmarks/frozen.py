@@ -0,0 +1,60 @@
+"""Compare the memory usage of keeping many versions of a schema as
+mutable trees against frozen (hash-consed) ones, and the time it
+takes to compare them."""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+
+from common import cpython_sources, measure, peak_memory, report
+
+import pyasdl
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--copies", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    # Each version is loaded multiple times, as if it was
+    # parsed separately by every generator in a build.
+    blobs = [
+        pyasdl.dump_schema(pyasdl.parse(source))
+        for source in cpython_sources().values()
+    ] * options.copies
+
+    def load_mutable():
+        return [pyasdl.load_schema(blob) for blob in blobs]
+
+    def load_frozen():
+        return [pyasdl.freeze(pyasdl.load_schema(blob)) for blob in blobs]
+
+    mutable_memory = peak_memory(load_mutable)
+    frozen_memory = peak_memory(load_frozen)
+    print(f"{len(blobs)} trees (mutable): {mutable_memory / 1024:>10.0f} KiB")
+    print(f"{len(blobs)} trees (frozen):  {frozen_memory / 1024:>10.0f} KiB")
+
+    mutable_trees = load_mutable()
+    frozen_trees = load_frozen()
+    mutable = measure(
+        lambda: [tree == mutable_trees[0] for tree in mutable_trees],
+        repeat=options.repeat,
+    )
+    report("compare all trees (mutable)", mutable)
+    report(
+        "compare all trees (frozen)",
+        measure(
+            lambda: [tree == frozen_trees[0] for tree in frozen_trees],
+            repeat=options.repeat,
+        ),
+        baseline=mutable,
+    )
+    report(
+        "hash all trees (frozen)",
+        measure(lambda: [hash(tree) for tree in frozen_trees], repeat=options.repeat),
+    )
+
+
+if __name__ == "__main__":
+    main()
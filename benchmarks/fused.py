@@ -0,0 +1,74 @@
+"""Measure run_visitors() against running the same visitors one by one,
+for an increasing number of visitors (that only handle a few kinds of
+nodes, and leave the rest of the traversal to generic_visit)."""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+
+from common import measure, report, synthetic_schema
+
+import pyasdl
+
+
+class FieldCounter(pyasdl.ASDLVisitor):
+    def __init__(self):
+        self.count = 0
+
+    def visit_Field(self, node):
+        self.count += 1
+
+
+class ConstructorCollector(pyasdl.ASDLVisitor):
+    def __init__(self):
+        self.names = []
+
+    def visit_Constructor(self, node):
+        self.names.append(node.name)
+
+
+class KindCollector(pyasdl.ASDLVisitor):
+    def __init__(self):
+        self.kinds = set()
+
+    def visit_Type(self, node):
+        self.kinds.add(node.name)
+        self.visit(node.value, name=node.name)
+
+    def visit_Field(self, node, name=None):
+        self.kinds.add(node.kind)
+
+
+VISITORS = [FieldCounter, ConstructorCollector, KindCollector]
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--definitions", type=int, default=20_000)
+    parser.add_argument("--visitors", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    tree = pyasdl.parse(synthetic_schema(options.definitions), engine="ll1")
+
+    for count in options.visitors:
+        classes = [VISITORS[index % len(VISITORS)] for index in range(count)]
+
+        def separately():
+            for visitor_class in classes:
+                visitor_class().visit(tree)
+
+        def fused():
+            pyasdl.run_visitors(tree, [visitor_class() for visitor_class in classes])
+
+        baseline = measure(separately, repeat=options.repeat)
+        report(f"{count} visitors (separately)", baseline)
+        report(
+            f"{count} visitors (run_visitors)",
+            measure(fused, repeat=options.repeat),
+            baseline=baseline,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measure building the type graph of a large synthetic schema, and
+running the SCC / topological order / reachability queries on it."""
+
+from __future__ import annotations
+
+import random
+from argparse import ArgumentParser
+
+from common import BUILTIN_KINDS, measure, report
+
+import pyasdl
+from pyasdl import Field, FieldQualifier, Module, Product, Type
+
+
+def random_module(count, *, fields=3, seed=0):
+    # Mostly references to the earlier types (like a real schema), with
+    # some references forward to create cycles of different sizes.
+    generator = random.Random(seed)
+    qualifiers = [None, FieldQualifier.SEQUENCE, FieldQualifier.OPTIONAL]
+    body = []
+    for index in range(count):
+        kinds = []
+        for _ in range(fields):
+            choice = generator.random()
+            if choice < 0.2:
+                kinds.append(generator.choice(BUILTIN_KINDS))
+            elif choice < 0.9 or index + 1 == count:
+                kinds.append(f"type_{generator.randrange(index + 1)}")
+            else:
+                kinds.append(f"type_{generator.randrange(index + 1, count)}")
+        body.append(
+            Type(
+                f"type_{index}",
+                Product(
+                    [
+                        Field(kind, f"field_{position}", generator.choice(qualifiers))
+                        for position, kind in enumerate(kinds)
+                    ]
+                ),
+            )
+        )
+    return Module("Synthetic", body)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--types", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    for count in options.types:
+        module = random_module(count)
+        graph = pyasdl.TypeGraph(module)
+        components = graph.strongly_connected_components()
+        print(
+            f"{count} types: {len(components)} components, largest has"
+            f" {max(map(len, components))} types"
+        )
+
+        report(
+            f"{count} types (build)",
+            measure(lambda: pyasdl.TypeGraph(module), repeat=options.repeat),
+        )
+        report(
+            f"{count} types (build + SCCs)",
+            measure(
+                lambda: pyasdl.TypeGraph(module).strongly_connected_components(),
+                repeat=options.repeat,
+            ),
+        )
+        report(
+            f"{count} types (build + order)",
+            measure(
+                lambda: pyasdl.TypeGraph(module).topological_order(),
+                repeat=options.repeat,
+            ),
+        )
+        report(
+            f"{count} types (reachable)",
+            measure(
+                lambda: graph.reachable(f"type_{count - 1}"), repeat=options.repeat
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measure the import time of pyasdl (with `-X importtime`), both for
+only using the grammar/visitors and for the first parse() call."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+SCENARIOS = {
+    "import pyasdl": "import pyasdl; pyasdl.ASDLVisitor, pyasdl.Module",
+    "import pyasdl + load_schema()": "import pyasdl; pyasdl.load_schema",
+    "import pyasdl + parse()": "import pyasdl; pyasdl.parse('module X { a = A }')",
+    "import pyasdl + parse(engine='ll1')": (
+        "import pyasdl; pyasdl.parse('module X { a = A }', engine='ll1')"
+    ),
+}
+
+HEAVY_MODULES = ["argparse", "pegen", "pyasdl.parser", "concurrent.futures"]
+
+
+def import_time(code):
+    # Return the total import time (in microseconds) of the modules
+    # that were imported by the code (pyasdl itself, and everything
+    # that it imports lazily), and the names of those modules.
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    modules = []
+    for line in process.stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if "cumulative" in cumulative:
+            continue
+        if name.strip() == "pyasdl" or modules:
+            modules.append(name.strip())
+            # Nested imports are indented, and their time is
+            # already included in the top-level ones.
+            if not name[1:].startswith(" "):
+                total += int(cumulative)
+    return total, modules
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    for name, code in SCENARIOS.items():
+        runs = [import_time(code) for _ in range(options.repeat)]
+        best = min(total for total, _ in runs)
+        loaded = [module for module in HEAVY_MODULES if module in runs[0][1]]
+        print(
+            f"{name:<40} {best / 1000:>10.3f} ms  (loads: {', '.join(loaded) or '-'})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Compare reparse() after a one line edit against parsing
+the whole file again, for schemas of different sizes."""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+
+from common import cpython_sources, measure, report, synthetic_schema
+
+import pyasdl
+
+
+def edit_middle_line(source):
+    lines = source.splitlines(keepends=True)
+    for index in range(len(lines) // 2, len(lines)):
+        if "(" in lines[index]:
+            lines[index] = lines[index].replace("(", "(int edited, ", 1)
+            return "".join(lines)
+    raise ValueError("no line to edit")
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--definitions", type=int, nargs="+", default=[1_000, 10_000, 50_000]
+    )
+    parser.add_argument("--engine", choices=pyasdl.ENGINES, default="pegen")
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    sources = {"Python-311.asdl": cpython_sources()["Python-311.asdl"]}
+    for count in options.definitions:
+        sources[f"synthetic ({count} definitions)"] = synthetic_schema(count)
+
+    for name, old_source in sources.items():
+        new_source = edit_middle_line(old_source)
+        old_tree = pyasdl.parse(old_source, engine=options.engine)
+
+        full = measure(
+            lambda: pyasdl.parse(new_source, engine=options.engine),
+            repeat=options.repeat,
+        )
+        incremental = measure(
+            lambda: pyasdl.reparse(
+                old_tree, old_source, new_source, engine=options.engine
+            ),
+            repeat=options.repeat,
+        )
+        report(f"{name} (parse)", full)
+        report(f"{name} (reparse)", incremental, baseline=full)
+
+
+if __name__ == "__main__":
+    main()
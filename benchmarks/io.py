@@ -0,0 +1,64 @@
+"""Compare parse_file() against reading the whole file
+into a string and passing it to parse()."""
+
+from __future__ import annotations
+
+import mmap
+import tempfile
+from argparse import ArgumentParser
+from pathlib import Path
+
+from common import measure, peak_memory, report, synthetic_schema
+
+import pyasdl
+
+
+def read_source(path):
+    with open(path) as stream:
+        return stream.read()
+
+
+def map_source(path):
+    with open(path, "rb") as stream:
+        with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return str(buffer, "utf-8")
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--definitions", type=int, default=40_000)
+    parser.add_argument("--engine", choices=pyasdl.ENGINES, default="ll1")
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "schema.asdl"
+        path.write_text(synthetic_schema(options.definitions))
+        print(f"schema size: {path.stat().st_size / 1024 ** 2:.2f} MiB")
+
+        # The source loading is measured on its own as well, since the
+        # peak of a full parse is dominated by the resulting tree.
+        comparisons = [
+            {
+                "read()": lambda: read_source(path),
+                "mmap + decode": lambda: map_source(path),
+            },
+            {
+                "read() + parse": lambda: pyasdl.parse(
+                    read_source(path), engine=options.engine
+                ),
+                "parse_file": lambda: pyasdl.parse_file(path, engine=options.engine),
+            },
+        ]
+        for cases in comparisons:
+            baseline = None
+            for name, func in cases.items():
+                seconds = measure(func, repeat=options.repeat)
+                report(name, seconds, baseline=baseline)
+                peak = peak_memory(func) / 1024**2
+                print(f"{'  peak memory':<40} {peak:>10.3f} MiB")
+                baseline = baseline or seconds
+
+
+if __name__ == "__main__":
+    main()
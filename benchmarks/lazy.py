@@ -0,0 +1,96 @@
+"""Compare reading a few statements (and all of them) from a large tree
+that was encoded with encode(indexed=True) and is decoded lazily from the
+mapped file, against decoding the whole tree with decode(). The tree has
+the statements of many standard library modules, with the `ast` classes
+(and the grammar of the running Python as the schema)."""
+
+from __future__ import annotations
+
+import ast
+import sys
+import tempfile
+from argparse import ArgumentParser
+from pathlib import Path
+
+from common import cpython_sources, measure, peak_memory, report
+
+import pyasdl
+import pyasdl.codec
+
+
+def large_tree(count):
+    body = []
+    for path in sorted(Path(ast.__file__).parent.glob("*.py"))[:count]:
+        try:
+            body.extend(ast.parse(path.read_bytes()).body)
+        except SyntaxError:
+            continue
+    return ast.Module(body, [])
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--modules", type=int, default=100)
+    parser.add_argument("--statements", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    codec = pyasdl.codec.compile(
+        pyasdl.parse(cpython_sources()["Python-{}{}.asdl".format(*sys.version_info)]),
+        ast,
+    )
+    tree = large_tree(options.modules)
+    report("encode", measure(lambda: codec.encode(tree), repeat=options.repeat))
+    report(
+        "encode (indexed)",
+        measure(lambda: codec.encode(tree, indexed=True), repeat=options.repeat),
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "tree.asdt"
+        indexed_path = Path(directory) / "tree-indexed.asdt"
+        path.write_bytes(codec.encode(tree))
+        indexed_path.write_bytes(codec.encode(tree, indexed=True))
+        print(
+            f"{len(tree.body)} statements, {path.stat().st_size / 1024 ** 2:.2f} MiB"
+            f" ({indexed_path.stat().st_size / 1024 ** 2:.2f} MiB indexed)"
+        )
+
+        step = len(tree.body) // options.statements
+
+        def some_statements(root):
+            return [
+                ast.dump(root.body[index]) for index in range(0, len(root.body), step)
+            ]
+
+        def everything(root):
+            return sum(1 for _ in ast.walk(root))
+
+        comparisons = [
+            {
+                "decode + some statements": lambda: some_statements(
+                    codec.decode(path.read_bytes())
+                ),
+                "load + some statements": lambda: some_statements(
+                    codec.load(indexed_path)
+                ),
+            },
+            {
+                "decode + whole tree": lambda: everything(
+                    codec.decode(path.read_bytes())
+                ),
+                "load + whole tree": lambda: everything(codec.load(indexed_path)),
+            },
+        ]
+        for cases in comparisons:
+            baseline = None
+            for name, func in cases.items():
+                seconds = measure(func, repeat=options.repeat)
+                report(name, seconds, baseline=baseline)
+                peak = peak_memory(func) / 1024**2
+                print(f"{'  peak memory':<40} {peak:>10.3f} MiB")
+                baseline = baseline or seconds
+
+
+if __name__ == "__main__":
+    main()
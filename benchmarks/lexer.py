@@ -0,0 +1,67 @@
+"""Compare the ASDL lexer against the tokenize based
+scanner that pyasdl used to ship."""
+
+from __future__ import annotations
+
+import io
+import tokenize as _tokenize
+from argparse import ArgumentParser
+from collections import deque
+from contextlib import contextmanager
+
+from common import cpython_sources, measure, report, synthetic_schema
+
+from pyasdl.lexer import tokenize
+
+
+@contextmanager
+def legacy_pseudo_token():
+    # The old scanner rewrote tokenize.PseudoToken to recognize the
+    # ASDL comments; only do it for the duration of the measurement.
+    original = _tokenize.PseudoToken
+    _tokenize.PseudoToken = _tokenize.Whitespace + _tokenize.group(
+        _tokenize.Whitespace + r"--.*?\n",
+        _tokenize.PseudoExtras,
+        _tokenize.Number,
+        _tokenize.Funny,
+        _tokenize.ContStr,
+        _tokenize.Name,
+    )
+    try:
+        yield
+    finally:
+        _tokenize.PseudoToken = original
+
+
+def legacy_tokenize(source):
+    source_buffer = io.StringIO(source)
+    for token in _tokenize.generate_tokens(source_buffer.readline):
+        if token.string.startswith("--"):
+            continue
+        yield token
+
+
+def consume(iterator):
+    deque(iterator, maxlen=0)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--definitions", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    sources = cpython_sources()
+    sources["synthetic"] = synthetic_schema(options.definitions)
+    for name, source in sources.items():
+        with legacy_pseudo_token():
+            legacy = measure(
+                lambda: consume(legacy_tokenize(source)), repeat=options.repeat
+            )
+        current = measure(lambda: consume(tokenize(source)), repeat=options.repeat)
+        report(f"{name} (tokenize)", legacy)
+        report(f"{name} (pyasdl.lexer)", current, baseline=legacy)
+
+
+if __name__ == "__main__":
+    main()
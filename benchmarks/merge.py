@@ -0,0 +1,57 @@
+"""Measure merge_versions() (and the typing stub generator, which is built
+on it) over many synthetic versions of a schema, where each version adds
+a few definitions and changes the fields of some of the existing ones."""
+
+from __future__ import annotations
+
+import sys
+from argparse import ArgumentParser
+
+from common import BENCHMARKS_DIR, measure, report, synthetic_definitions
+
+import pyasdl
+
+sys.path.insert(0, str(BENCHMARKS_DIR.parent / "examples" / "generators" / "src"))
+import typing_stub  # noqa: E402
+
+
+def synthetic_version(count, version):
+    # Every version has 1% more definitions than the previous one, and
+    # a different (overlapping) set of products have an extra field.
+    definitions = list(synthetic_definitions(count + count * version // 100))
+    for index in range(version % 5, len(definitions), 5):
+        definitions[index] = definitions[index].replace(
+            "= (", f"= (int added_{version % 3}, ", 1
+        )
+    return "module Synthetic {\n" + "".join(definitions) + "}\n"
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--definitions", type=int, nargs="+", default=[100, 1_000])
+    parser.add_argument("--versions", type=int, nargs="+", default=[5, 20, 40])
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    for count in options.definitions:
+        for version_count in options.versions:
+            versions = [
+                ((3, version), pyasdl.parse(synthetic_version(count, version)))
+                for version in range(version_count)
+            ]
+            total = sum(len(tree.body) for _, tree in versions)
+            print(f"{version_count} versions of {count} definitions ({total} total)")
+            report(
+                "merge_versions()",
+                measure(lambda: pyasdl.merge_versions(versions), repeat=options.repeat),
+            )
+            report(
+                "typing_stub.generate_stubs()",
+                measure(
+                    lambda: typing_stub.generate_stubs(versions), repeat=options.repeat
+                ),
+            )
+
+
+if __name__ == "__main__":
+    main()
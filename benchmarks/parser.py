@@ -0,0 +1,34 @@
+"""Measure how the parse time of each engine scales
+with the number of definitions in a module."""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+
+from common import measure, report, synthetic_schema
+
+import pyasdl
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--definitions", type=int, nargs="+", default=[1_000, 5_000, 25_000, 50_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    for count in options.definitions:
+        source = synthetic_schema(count)
+        baseline = None
+        for engine in pyasdl.ENGINES:
+            seconds = measure(
+                lambda: pyasdl.parse(source, engine=engine), repeat=options.repeat
+            )
+            report(f"{engine} ({count} definitions)", seconds, baseline=baseline)
+            report("  per definition", seconds / count)
+            baseline = baseline or seconds
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Measure the overhead of profile_visitor() on the Python class generator
+(running over a large synthetic schema), and check that the visitor runs
+just as fast as before once the profiling is over."""
+
+from __future__ import annotations
+
+import gc
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from common import BENCHMARKS_DIR, measure, report, synthetic_schema
+
+import pyasdl
+
+sys.path.insert(0, str(BENCHMARKS_DIR.parent / "examples" / "generators" / "src"))
+from python import PythonGenerator  # noqa: E402
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--definitions", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--collapsed", type=Path, help="write the collapsed stacks to this file"
+    )
+    options = parser.parse_args()
+
+    tree = pyasdl.parse(synthetic_schema(options.definitions), engine="ll1")
+
+    def run(generator=None):
+        generator = generator or PythonGenerator(with_defaults=True)
+        generator.generate(tree)
+
+    def run_profiled():
+        generator = PythonGenerator(with_defaults=True)
+        with pyasdl.profile_visitor(generator) as profile:
+            run(generator)
+        return profile
+
+    # The generator allocates a lot of (long living) AST nodes, which makes
+    # the timings depend on when the garbage collector happens to run.
+    gc.disable()
+    baseline = measure(run, repeat=options.repeat)
+    report("not profiled", baseline)
+    report("profiled", measure(run_profiled, repeat=options.repeat), baseline=baseline)
+    report(
+        "not profiled (after)", measure(run, repeat=options.repeat), baseline=baseline
+    )
+
+    profile = run_profiled()
+    print()
+    print(f"{'method':<20} {'calls':>8} {'inclusive':>12} {'exclusive':>12}")
+    for stats in profile.report():
+        print(
+            f"{stats.name:<20} {stats.calls:>8} {stats.inclusive_time / 1e6:>9.3f} ms"
+            f" {stats.exclusive_time / 1e6:>9.3f} ms"
+        )
+
+    if options.collapsed:
+        options.collapsed.write_text(profile.collapsed_stacks())
+
+
+if __name__ == "__main__":
+    main()
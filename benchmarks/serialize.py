@@ -0,0 +1,57 @@
+"""Compare loading a schema with load_schema() against parsing
+its source and unpickling the dataclasses."""
+
+from __future__ import annotations
+
+import pickle
+from argparse import ArgumentParser
+
+from common import cpython_sources, measure, report, synthetic_schema
+
+import pyasdl
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--definitions", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--engine", choices=pyasdl.ENGINES, default="pegen")
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    sources = {"Python-311.asdl": cpython_sources()["Python-311.asdl"]}
+    for count in options.definitions:
+        sources[f"synthetic ({count} definitions)"] = synthetic_schema(count)
+
+    for name, source in sources.items():
+        tree = pyasdl.parse(source, engine=options.engine)
+        data = pyasdl.dump_schema(tree)
+        pickled = pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL)
+        assert pyasdl.load_schema(data) == tree
+        print(
+            f"{name}: {len(source.encode())} bytes of source, {len(data)} bytes"
+            f" dumped, {len(pickled)} bytes pickled"
+        )
+
+        full = measure(
+            lambda: pyasdl.parse(source, engine=options.engine),
+            repeat=options.repeat,
+        )
+        report(f"{name} (parse)", full)
+        report(
+            f"{name} (pickle.loads)",
+            measure(lambda: pickle.loads(pickled), repeat=options.repeat),
+            baseline=full,
+        )
+        report(
+            f"{name} (load_schema)",
+            measure(lambda: pyasdl.load_schema(data), repeat=options.repeat),
+            baseline=full,
+        )
+        report(
+            f"{name} (dump_schema)",
+            measure(lambda: pyasdl.dump_schema(tree), repeat=options.repeat),
+        )
+
+
+if __name__ == "__main__":
+    main()
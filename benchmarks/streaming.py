@@ -0,0 +1,46 @@
+"""Compare the peak memory of iterparse() (while discarding
+every definition after it is yielded) against parse_file()."""
+
+from __future__ import annotations
+
+import tempfile
+from argparse import ArgumentParser
+from collections import deque
+from pathlib import Path
+
+from common import measure, peak_memory, report, synthetic_schema
+
+import pyasdl
+
+
+def stream_definitions(path):
+    with open(path) as stream:
+        deque(pyasdl.iterparse(stream), maxlen=0)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--definitions", type=int, nargs="+", default=[1_000, 10_000, 50_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "schema.asdl"
+        for count in options.definitions:
+            path.write_text(synthetic_schema(count))
+            cases = {
+                f"parse_file ({count} definitions)": lambda: pyasdl.parse_file(
+                    path, engine="ll1"
+                ),
+                f"iterparse ({count} definitions)": lambda: stream_definitions(path),
+            }
+            for name, func in cases.items():
+                report(name, measure(func, repeat=options.repeat))
+                peak = peak_memory(func) / 1024**2
+                print(f"{'  peak memory':<40} {peak:>10.3f} MiB")
+
+
+if __name__ == "__main__":
+    main()
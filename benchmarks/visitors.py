@@ -0,0 +1,82 @@
+"""Measure the per-node dispatch overhead of ASDLVisitor on a large
+synthetic tree, with the cached dispatch tables and with the previous
+lookup (which resolved the visit method by name on every node); the
+iterative traversals (the iterative mode and walk()), and a
+NodeTransformer that changes a few fields."""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+
+from common import measure, report, synthetic_schema
+
+import pyasdl
+
+
+class FieldCounter(pyasdl.ASDLVisitor):
+    # Only handles fields; everything else goes through generic_visit
+    def __init__(self):
+        self.count = 0
+
+    def visit_Field(self, node):
+        self.count += 1
+
+
+class UncachedFieldCounter(FieldCounter):
+    def visit(self, node, *args, **kwargs):
+        visitor = self.find_visitor(type(node).__name__)
+        return visitor(node, *args, **kwargs)
+
+
+class IterativeFieldCounter(FieldCounter):
+    iterative = True
+
+
+class FieldRenamer(pyasdl.NodeTransformer):
+    # Only rebuilds the definitions that have a field named "doc"
+    def visit_Field(self, node):
+        if node.name == "doc":
+            return pyasdl.Field(node.kind, "docstring", node.qualifier)
+        return node
+
+
+def count_fields(tree):
+    return sum(isinstance(node, pyasdl.Field) for node in pyasdl.walk(tree))
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--definitions", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    tree = pyasdl.parse(synthetic_schema(options.definitions), engine="ll1")
+    nodes = sum(1 for _ in pyasdl.walk(tree))
+    print(f"{nodes} nodes")
+
+    results = {}
+    for name, visitor_class in [
+        ("uncached dispatch", UncachedFieldCounter),
+        ("cached dispatch", FieldCounter),
+        ("cached dispatch (iterative)", IterativeFieldCounter),
+    ]:
+        results[name] = measure(
+            lambda: visitor_class().visit(tree), repeat=options.repeat
+        )
+        report(name, results[name], baseline=results["uncached dispatch"])
+        print(f"{'':<40} {results[name] / nodes * 1e9:>10.1f} ns/node")
+
+    report(
+        "walk()",
+        measure(lambda: count_fields(tree), repeat=options.repeat),
+        baseline=results["uncached dispatch"],
+    )
+    report(
+        "NodeTransformer",
+        measure(lambda: FieldRenamer().visit(tree), repeat=options.repeat),
+        baseline=results["uncached dispatch"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -36,22 +36,26 @@ class mod(AST):
 
 @_dataclass
 class Module(mod):
+    _fields = ("body", "type_ignores")
     body: list[stmt]
     type_ignores: list[type_ignore]
 
 
 @_dataclass
 class Interactive(mod):
+    _fields = ("body",)
     body: list[stmt]
 
 
 @_dataclass
 class Expression(mod):
+    _fields = ("body",)
     body: expr
 
 
 @_dataclass
 class FunctionType(mod):
+    _fields = ("argtypes", "returns")
     argtypes: list[expr]
     returns: expr
 
@@ -65,6 +69,7 @@ class stmt(AST):
 
 @_dataclass
 class FunctionDef(stmt):
+    _fields = ("args", "body", "decorator_list", "returns")
     name: identifier
     args: arguments
     body: list[stmt]
@@ -75,6 +80,7 @@ class FunctionDef(stmt):
 
 @_dataclass
 class AsyncFunctionDef(stmt):
+    _fields = ("args", "body", "decorator_list", "returns")
     name: identifier
     args: arguments
     body: list[stmt]
@@ -85,6 +91,7 @@ class AsyncFunctionDef(stmt):
 
 @_dataclass
 class ClassDef(stmt):
+    _fields = ("bases", "keywords", "body", "decorator_list")
     name: identifier
     bases: list[expr]
     keywords: list[keyword]
@@ -94,16 +101,19 @@ class ClassDef(stmt):
 
 @_dataclass
 class Return(stmt):
+    _fields = ("value",)
     value: expr | None
 
 
 @_dataclass
 class Delete(stmt):
+    _fields = ("targets",)
     targets: list[expr]
 
 
 @_dataclass
 class Assign(stmt):
+    _fields = ("targets", "value")
     targets: list[expr]
     value: expr
     type_comment: string | None
@@ -111,6 +121,7 @@ class Assign(stmt):
 
 @_dataclass
 class AugAssign(stmt):
+    _fields = ("target", "value")
     target: expr
     op: operator
     value: expr
@@ -118,6 +129,7 @@ class AugAssign(stmt):
 
 @_dataclass
 class AnnAssign(stmt):
+    _fields = ("target", "annotation", "value")
     target: expr
     annotation: expr
     value: expr | None
@@ -126,6 +138,7 @@ class AnnAssign(stmt):
 
 @_dataclass
 class For(stmt):
+    _fields = ("target", "iter", "body", "orelse")
     target: expr
     iter: expr
     body: list[stmt]
@@ -135,6 +148,7 @@ class For(stmt):
 
 @_dataclass
 class AsyncFor(stmt):
+    _fields = ("target", "iter", "body", "orelse")
     target: expr
     iter: expr
     body: list[stmt]
@@ -144,6 +158,7 @@ class AsyncFor(stmt):
 
 @_dataclass
 class While(stmt):
+    _fields = ("test", "body", "orelse")
     test: expr
     body: list[stmt]
     orelse: list[stmt]
@@ -151,6 +166,7 @@ class While(stmt):
 
 @_dataclass
 class If(stmt):
+    _fields = ("test", "body", "orelse")
     test: expr
     body: list[stmt]
     orelse: list[stmt]
@@ -158,6 +174,7 @@ class If(stmt):
 
 @_dataclass
 class With(stmt):
+    _fields = ("items", "body")
     items: list[withitem]
     body: list[stmt]
     type_comment: string | None
@@ -165,6 +182,7 @@ class With(stmt):
 
 @_dataclass
 class AsyncWith(stmt):
+    _fields = ("items", "body")
     items: list[withitem]
     body: list[stmt]
     type_comment: string | None
@@ -172,18 +190,21 @@ class AsyncWith(stmt):
 
 @_dataclass
 class Match(stmt):
+    _fields = ("subject", "cases")
     subject: expr
     cases: list[match_case]
 
 
 @_dataclass
 class Raise(stmt):
+    _fields = ("exc", "cause")
     exc: expr | None
     cause: expr | None
 
 
 @_dataclass
 class Try(stmt):
+    _fields = ("body", "handlers", "orelse", "finalbody")
     body: list[stmt]
     handlers: list[excepthandler]
     orelse: list[stmt]
@@ -192,6 +213,7 @@ class Try(stmt):
 
 @_dataclass
 class TryStar(stmt):
+    _fields = ("body", "handlers", "orelse", "finalbody")
     body: list[stmt]
     handlers: list[excepthandler]
     orelse: list[stmt]
@@ -200,17 +222,20 @@ class TryStar(stmt):
 
 @_dataclass
 class Assert(stmt):
+    _fields = ("test", "msg")
     test: expr
     msg: expr | None
 
 
 @_dataclass
 class Import(stmt):
+    _fields = ("names",)
     names: list[alias]
 
 
 @_dataclass
 class ImportFrom(stmt):
+    _fields = ("names",)
     module: identifier | None
     names: list[alias]
     level: int | None
@@ -218,32 +243,35 @@ class ImportFrom(stmt):
 
 @_dataclass
 class Global(stmt):
+    _fields = ()
     names: list[identifier]
 
 
 @_dataclass
 class Nonlocal(stmt):
+    _fields = ()
     names: list[identifier]
 
 
 @_dataclass
 class Expr(stmt):
+    _fields = ("value",)
     value: expr
 
 
 @_dataclass
 class Pass(stmt):
-    ...
+    _fields = ()
 
 
 @_dataclass
 class Break(stmt):
-    ...
+    _fields = ()
 
 
 @_dataclass
 class Continue(stmt):
-    ...
+    _fields = ()
 
 
 class expr(AST):
@@ -255,18 +283,21 @@ class expr(AST):
 
 @_dataclass
 class BoolOp(expr):
+    _fields = ("values",)
     op: boolop
     values: list[expr]
 
 
 @_dataclass
 class NamedExpr(expr):
+    _fields = ("target", "value")
     target: expr
     value: expr
 
 
 @_dataclass
 class BinOp(expr):
+    _fields = ("left", "right")
     left: expr
     op: operator
     right: expr
@@ -274,18 +305,21 @@ class BinOp(expr):
 
 @_dataclass
 class UnaryOp(expr):
+    _fields = ("operand",)
     op: unaryop
     operand: expr
 
 
 @_dataclass
 class Lambda(expr):
+    _fields = ("args", "body")
     args: arguments
     body: expr
 
 
 @_dataclass
 class IfExp(expr):
+    _fields = ("test", "body", "orelse")
     test: expr
     body: expr
     orelse: expr
@@ -293,29 +327,34 @@ class IfExp(expr):
 
 @_dataclass
 class Dict(expr):
+    _fields = ("keys", "values")
     keys: list[expr]
     values: list[expr]
 
 
 @_dataclass
 class Set(expr):
+    _fields = ("elts",)
     elts: list[expr]
 
 
 @_dataclass
 class ListComp(expr):
+    _fields = ("elt", "generators")
     elt: expr
     generators: list[comprehension]
 
 
 @_dataclass
 class SetComp(expr):
+    _fields = ("elt", "generators")
     elt: expr
     generators: list[comprehension]
 
 
 @_dataclass
 class DictComp(expr):
+    _fields = ("key", "value", "generators")
     key: expr
     value: expr
     generators: list[comprehension]
@@ -323,27 +362,32 @@ class DictComp(expr):
 
 @_dataclass
 class GeneratorExp(expr):
+    _fields = ("elt", "generators")
     elt: expr
     generators: list[comprehension]
 
 
 @_dataclass
 class Await(expr):
+    _fields = ("value",)
     value: expr
 
 
 @_dataclass
 class Yield(expr):
+    _fields = ("value",)
     value: expr | None
 
 
 @_dataclass
 class YieldFrom(expr):
+    _fields = ("value",)
     value: expr
 
 
 @_dataclass
 class Compare(expr):
+    _fields = ("left", "comparators")
     left: expr
     ops: list[cmpop]
     comparators: list[expr]
@@ -351,6 +395,7 @@ class Compare(expr):
 
 @_dataclass
 class Call(expr):
+    _fields = ("func", "args", "keywords")
     func: expr
     args: list[expr]
     keywords: list[keyword]
@@ -358,6 +403,7 @@ class Call(expr):
 
 @_dataclass
 class FormattedValue(expr):
+    _fields = ("value", "format_spec")
     value: expr
     conversion: int
     format_spec: expr | None
@@ -365,17 +411,20 @@ class FormattedValue(expr):
 
 @_dataclass
 class JoinedStr(expr):
+    _fields = ("values",)
     values: list[expr]
 
 
 @_dataclass
 class Constant(expr):
+    _fields = ()
     value: constant
     kind: string | None
 
 
 @_dataclass
 class Attribute(expr):
+    _fields = ("value",)
     value: expr
     attr: identifier
     ctx: expr_context
@@ -383,6 +432,7 @@ class Attribute(expr):
 
 @_dataclass
 class Subscript(expr):
+    _fields = ("value", "slice")
     value: expr
     slice: expr
     ctx: expr_context
@@ -390,30 +440,35 @@ class Subscript(expr):
 
 @_dataclass
 class Starred(expr):
+    _fields = ("value",)
     value: expr
     ctx: expr_context
 
 
 @_dataclass
 class Name(expr):
+    _fields = ()
     id: identifier
     ctx: expr_context
 
 
 @_dataclass
 class List(expr):
+    _fields = ("elts",)
     elts: list[expr]
     ctx: expr_context
 
 
 @_dataclass
 class Tuple(expr):
+    _fields = ("elts",)
     elts: list[expr]
     ctx: expr_context
 
 
 @_dataclass
 class Slice(expr):
+    _fields = ("lower", "upper", "step")
     lower: expr | None
     upper: expr | None
     step: expr | None
@@ -468,6 +523,7 @@ class cmpop(_Enum):
 
 @_dataclass
 class comprehension(AST):
+    _fields = ("target", "iter", "ifs")
     target: expr
     iter: expr
     ifs: list[expr]
@@ -483,6 +539,7 @@ class excepthandler(AST):
 
 @_dataclass
 class ExceptHandler(excepthandler):
+    _fields = ("type", "body")
     type: expr | None
     name: identifier | None
     body: list[stmt]
@@ -490,6 +547,15 @@ class ExceptHandler(excepthandler):
 
 @_dataclass
 class arguments(AST):
+    _fields = (
+        "posonlyargs",
+        "args",
+        "vararg",
+        "kwonlyargs",
+        "kw_defaults",
+        "kwarg",
+        "defaults",
+    )
     posonlyargs: list[arg]
     args: list[arg]
     vararg: arg | None
@@ -501,6 +567,7 @@ class arguments(AST):
 
 @_dataclass
 class arg(AST):
+    _fields = ("annotation",)
     arg: identifier
     annotation: expr | None
     type_comment: string | None
@@ -512,6 +579,7 @@ class arg(AST):
 
 @_dataclass
 class keyword(AST):
+    _fields = ("value",)
     arg: identifier | None
     value: expr
     lineno: int
@@ -522,6 +590,7 @@ class keyword(AST):
 
 @_dataclass
 class alias(AST):
+    _fields = ()
     name: identifier
     asname: identifier | None
     lineno: int
@@ -532,12 +601,14 @@ class alias(AST):
 
 @_dataclass
 class withitem(AST):
+    _fields = ("context_expr", "optional_vars")
     context_expr: expr
     optional_vars: expr | None
 
 
 @_dataclass
 class match_case(AST):
+    _fields = ("pattern", "guard", "body")
     pattern: pattern
     guard: expr | None
     body: list[stmt]
@@ -552,21 +623,25 @@ class pattern(AST):
 
 @_dataclass
 class MatchValue(pattern):
+    _fields = ("value",)
     value: expr
 
 
 @_dataclass
 class MatchSingleton(pattern):
+    _fields = ()
     value: constant
 
 
 @_dataclass
 class MatchSequence(pattern):
+    _fields = ("patterns",)
     patterns: list[pattern]
 
 
 @_dataclass
 class MatchMapping(pattern):
+    _fields = ("keys", "patterns")
     keys: list[expr]
     patterns: list[pattern]
     rest: identifier | None
@@ -574,6 +649,7 @@ class MatchMapping(pattern):
 
 @_dataclass
 class MatchClass(pattern):
+    _fields = ("cls", "patterns", "kwd_patterns")
     cls: expr
     patterns: list[pattern]
     kwd_attrs: list[identifier]
@@ -582,17 +658,20 @@ class MatchClass(pattern):
 
 @_dataclass
 class MatchStar(pattern):
+    _fields = ()
     name: identifier | None
 
 
 @_dataclass
 class MatchAs(pattern):
+    _fields = ("pattern",)
     pattern: pattern | None
     name: identifier | None
 
 
 @_dataclass
 class MatchOr(pattern):
+    _fields = ("patterns",)
     patterns: list[pattern]
 
 
@@ -602,5 +681,6 @@ class type_ignore(AST):
 
 @_dataclass
 class TypeIgnore(type_ignore):
+    _fields = ()
     lineno: int
     tag: string
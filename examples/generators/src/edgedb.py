@@ -120,18 +120,10 @@ def as_enum(names):
 
 class GraphQLGenerator(pyasdl.ASDLVisitor):
     def visit_Module(self, node):
-        self.enums = set()
-        definitions = [QLModel("AST", constraint=ModelConstraint.ABSTRACT)]
+        self.schema = pyasdl.Schema(node)
+        yield QLModel("AST", constraint=ModelConstraint.ABSTRACT)
         for definition in node.body:
-            definitions.extend(self.visit(definition))
-        yield from self.fix_references(definitions)
-
-    def fix_references(self, definitions):
-        for definition in definitions:
-            for field in definition.fields:
-                if field.qualifier in self.enums:
-                    field.is_property = True
-            yield definition
+            yield from self.visit(definition)
 
     def visit_Type(self, node):
         # FIX-ME: attributes are ignored, need a better way
@@ -142,9 +134,7 @@ class GraphQLGenerator(pyasdl.ASDLVisitor):
         yield QLModel(name, self.visit_all(node.fields))
 
     def visit_Sum(self, node, name):
-        constructor_names = [constructor.name for constructor in node.types]
-        if pyasdl.is_simple_sum(node):
-            self.enums.add(name)
+        if self.schema.is_simple_sum(name):
             yield QLModel(
                 name,
                 constraint=ModelConstraint.SCALAR,
@@ -165,7 +155,16 @@ class GraphQLGenerator(pyasdl.ASDLVisitor):
             qualifier = FieldConstraint.MULTI
         elif node.qualifier is pyasdl.FieldQualifier.OPTIONAL:
             qualifier = None
-        return QLField(node.name, node.kind, qualifier)
+        # Enums are stored as scalars, so they are properties as well
+        return QLField(
+            node.name,
+            node.kind,
+            qualifier,
+            is_property=(
+                self.schema.is_builtin(node.kind)
+                or self.schema.is_simple_sum(node.kind)
+            ),
+        )
 
 
 def main():
@@ -173,8 +172,7 @@ def main():
     parser.add_argument("file", type=Path)
 
     options = parser.parse_args()
-    with open(options.file) as source:
-        tree = pyasdl.parse(source.read())
+    tree = pyasdl.parse_file(options.file)
 
     visitor = GraphQLGenerator()
     print("START MIGRATION TO {")
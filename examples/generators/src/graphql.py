@@ -113,8 +113,7 @@ def main():
     parser.add_argument("file", type=Path)
 
     options = parser.parse_args()
-    with open(options.file) as source:
-        tree = pyasdl.parse(source.read())
+    tree = pyasdl.parse_file(options.file)
 
     visitor = GraphQLGenerator()
     for ql_type in visitor.visit(tree):
@@ -20,6 +20,10 @@ class PythonGenerator(pyasdl.ASDLVisitor):
         self.definitions = []
         self.with_defaults = with_defaults
 
+    def visit_Module(self, node):
+        self.schema = pyasdl.Schema(node)
+        self.visit_all(node.body)
+
     def visit_Type(self, node):
         self.visit(
             node.value,
@@ -43,14 +47,18 @@ class PythonGenerator(pyasdl.ASDLVisitor):
         self._create_dataclass(
             name=node.name,
             base=base,
-            body=self.visit_all(node.fields) if node.fields else _ELLIPSIS,
+            body=[self._create_child_fields(node.fields), *self.visit_all(node.fields)],
         )
 
     def visit_Product(self, node, name, attributes):
         self._create_dataclass(
             name=name,
             base=_BASE_CLASS,
-            body=self.visit_all(node.fields) + attributes,
+            body=[
+                self._create_child_fields(node.fields + node.attributes),
+                *self.visit_all(node.fields),
+                *attributes,
+            ],
         )
 
     def visit_Field(self, node):
@@ -86,6 +94,18 @@ class PythonGenerator(pyasdl.ASDLVisitor):
 
         return ast.AnnAssign(target, annotation, default, simple=1)
 
+    def _create_child_fields(self, fields):
+        # The fields that might hold other nodes (which are the
+        # only ones that the visitors need to descend into).
+        child_fields = [
+            ast.Constant(field.name)
+            for field in fields
+            if field.kind in self.schema and not self.schema.is_simple_sum(field.kind)
+        ]
+        return ast.Assign(
+            [ast.Name("_fields", ast.Store())], ast.Tuple(child_fields, ast.Load())
+        )
+
     def _create_class(self, name, base, body, decorators=()):
         cls = ast.ClassDef(
             name=name,
@@ -120,8 +140,7 @@ def main():
     parser.add_argument("-o", "--out", default=1)
     options = parser.parse_args()
 
-    with open(options.file) as stream:
-        tree = pyasdl.parse(stream.read())
+    tree = pyasdl.parse_file(options.file)
 
     generator = PythonGenerator(with_defaults=options.with_defaults)
     stub = generator.generate(tree)
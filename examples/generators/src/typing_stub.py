@@ -13,40 +13,36 @@ _BASE_CLASS = "AST"
 
 _TYPING = ast.Name("typing", ast.Load())
 _SYS_VERSION = ast.Attribute(ast.Name("sys"), "version_info", ast.Load())
-_EMPTY_BODY = [ast.Constant(...)]
+_ELLIPSIS = ast.Constant(...)
 _DUMMY_CONDITION = ast.AST(test=ast.AST())
 
 
 class StubGenerator(pyasdl.ASDLVisitor):
-    def __init__(self):
-        self.namespaces = defaultdict(list)
-
-    def visit_Type(self, node):
-        return self.visit(
-            node.value,
-            name=node.name,
-            attributes=self.visit_all(node.value.attributes),
-        )
-
-    def visit_Sum(self, node, name, attributes):
-        self._create_type(name, base=_BASE_CLASS, fields=attributes or _EMPTY_BODY)
-
-        for constructor in node.types:
-            if constructor.fields:
-                fields = self.visit_all(constructor.fields)
-            else:
-                fields = _EMPTY_BODY
-
-            self._create_type(constructor.name, base=name, fields=fields)
-
-    def visit_Product(self, node, name, attributes):
-        self._create_type(
-            name,
-            base=_BASE_CLASS,
-            fields=[*self.visit_all(node.fields), *attributes],
-        )
+    """Collect the base classes and the body items of each class,
+    together with the versions they appear in, from a merged
+    schema."""
 
-    def visit_Field(self, node):
+    def __init__(self):
+        self.bases = defaultdict(dict)
+        self.items = defaultdict(dict)
+
+    def visit_MergedSchema(self, node):
+        self.visit_all(node.types.values())
+        self.visit_all(node.constructors.values())
+
+    def visit_MergedType(self, node):
+        self._add_bases(node.name, {_BASE_CLASS: node.versions})
+        self._add_fields(node.name, node.fields, group=0)
+        self._add_fields(node.name, node.attributes, group=1)
+        # Sums without any attributes have an empty body
+        self._add_empty_body(node.name, node.sum_versions, node.attributes)
+
+    def visit_MergedConstructor(self, node):
+        self._add_bases(node.name, node.parents)
+        self._add_fields(node.name, node.fields, group=0)
+        self._add_empty_body(node.name, node.versions, node.fields)
+
+    def visit_MergedField(self, node):
         target = ast.Name(node.name, ast.Store())
         annotation = ast.Name(node.kind, ast.Load())
         if node.qualifier is not None:
@@ -64,18 +60,46 @@ class StubGenerator(pyasdl.ASDLVisitor):
             )
         return ast.AnnAssign(target, annotation, simple=1)
 
-    def _create_type(self, name, base, fields):
-        stub = ast.ClassDef(
-            name=name,
-            bases=[ast.Name(base, ast.Load())],
-            keywords=[],
-            body=fields,
-            decorator_list=[],
-        )
-        self._add_stub(name, stub)
+    def _add_bases(self, name, bases):
+        for base, versions in bases.items():
+            self.bases[name][base] = self.bases[name].get(base, 0) | versions
+
+    def _add_fields(self, name, fields, group):
+        for index, field in enumerate(fields):
+            # Items are sorted by the version they are first seen in, and
+            # then by their position in that version (where the fields of
+            # a product come before its attributes).
+            self._add_item(
+                name,
+                key=(field.name, field.kind, field.qualifier),
+                stub=self.visit(field),
+                versions=field.versions,
+                order=(lowest_bit(field.versions), group, index),
+            )
+
+    def _add_empty_body(self, name, versions, fields):
+        for field in fields:
+            versions &= ~field.versions
+        if versions:
+            self._add_item(
+                name,
+                key=...,
+                stub=_ELLIPSIS,
+                versions=versions,
+                order=(lowest_bit(versions), 0, 0),
+            )
 
-    def _add_stub(self, name, stub):
-        self.namespaces[name].append((self.version, stub))
+    def _add_item(self, name, key, stub, versions, order):
+        item = self.items[name].get(key)
+        if item is None:
+            self.items[name][key] = [stub, versions, order]
+        else:
+            item[1] |= versions
+            item[2] = min(item[2], order)
+
+
+def lowest_bit(versions):
+    return versions & -versions
 
 
 def by_version(item):
@@ -83,21 +107,22 @@ def by_version(item):
     return version
 
 
-def group_fields(namespaces):
-    fields = defaultdict(list)
+def by_order(item):
+    *_, order = item
+    return order
 
-    def _search_match(item):
-        for field in fields:
-            if ast.dump(field) == ast.dump(item):
-                return field
-        else:
-            return item
 
-    for version, namespace in namespaces:
-        for item in namespace.body:
-            fields[_search_match(item)].append(version)
-
-    return fields
+def class_names(asdls):
+    # All the classes (the definitions, each followed by its
+    # constructors) in the order they are first seen.
+    names = {}
+    for _, tree in asdls:
+        for definition in tree.body:
+            names.setdefault(definition.name)
+            if isinstance(definition.value, pyasdl.Sum):
+                for constructor in definition.value.types:
+                    names.setdefault(constructor.name)
+    return names
 
 
 def with_guard(node, lowest, highest):
@@ -120,45 +145,41 @@ def with_guard(node, lowest, highest):
     return ast.If(condition, body=[node], orelse=[])
 
 
-def generate_guard(
-    node,
-    versions,
-    all_asdl_versions,
-    lowest_asdl_version,
-    highest_asdl_version,
-):
-    if set(versions) == set(all_asdl_versions):
+def generate_guard(node, versions, schema):
+    if versions == schema.all_versions:
         return node
-    elif max(versions) != highest_asdl_version:
-        if min(versions) == lowest_asdl_version:
+
+    lowest_asdl_version, *_, highest_asdl_version = schema.versions
+    versions = schema.versions_of(versions)
+    if versions[-1] != highest_asdl_version:
+        if versions[0] == lowest_asdl_version:
             lowest = None
         else:
-            lowest = min(versions)
-        return with_guard(node, lowest=lowest, highest=max(versions))
-    elif min(versions) != lowest_asdl_version:
-        if max(versions) == highest_asdl_version:
-            highest = None
-        else:
-            highest = max(versions)
-        return with_guard(node, lowest=min(versions), highest=highest)
+            lowest = versions[0]
+        return with_guard(node, lowest=lowest, highest=versions[-1])
+    elif versions[0] != lowest_asdl_version:
+        return with_guard(node, lowest=versions[0], highest=None)
     else:
         raise ValueError(f"Unexpected version chain: {versions}")
 
 
 def unmarshal_low_level_versions(node):
     previous_condition = _DUMMY_CONDITION
-    for item in node.body.copy():
+    body = []
+    for item in node.body:
         if (
             isinstance(item, ast.If)
             and ast.dump(item.test) == ast.dump(previous_condition.test)
             and not item.orelse
         ):
             previous_condition.body.extend(item.body)
-            node.body.remove(item)
         elif isinstance(item, ast.If):
             previous_condition = item
+            body.append(item)
         else:
             previous_condition = _DUMMY_CONDITION
+            body.append(item)
+    node.body = body
 
 
 def unmarshal_top_level_versions(guarded_node):
@@ -195,39 +216,46 @@ def unmarshal_top_level_versions(guarded_node):
 
 def generate_stubs(asdls):
     asdls.sort(key=by_version)
-
-    all_asdl_versions = [version for version, _ in asdls]
-    _guard_generator = partial(
-        generate_guard,
-        all_asdl_versions=all_asdl_versions,
-        lowest_asdl_version=all_asdl_versions[0],
-        highest_asdl_version=all_asdl_versions[-1],
-    )
+    schema = pyasdl.merge_versions(asdls)
+    _guard_generator = partial(generate_guard, schema=schema)
 
     stub_generator = StubGenerator()
-    for stub_generator.version, tree in asdls:
-        stub_generator.visit(tree)
+    stub_generator.visit(schema)
 
     body = []
-    for name, namespaces in stub_generator.namespaces.items():
-        namespaces.sort(key=by_version)
-        latest_stub_version, latest_stub = namespaces[-1]
-
-        latest_stub.body = [
-            _guard_generator(field, versions)
-            for field, versions in group_fields(namespaces).items()
-        ]
-
-        all_stub_versions = []
-        all_stub_bases = defaultdict(list)
-        for version, stub in namespaces:
-            all_stub_versions.append(version)
-            all_stub_bases[stub.bases[0].id].append(version)
-
-        if len(all_stub_bases) > 1:
+    for name in class_names(asdls):
+        bases = sorted(
+            stub_generator.bases[name].items(),
+            key=lambda item: lowest_bit(item[1]),
+        )
+        all_stub_versions = 0
+        for _, base_versions in bases:
+            all_stub_versions |= base_versions
+
+        # The latest version of the class decides its base
+        # (unless it changed, see the switch below).
+        latest_stub_base = next(
+            base
+            for base, base_versions in bases
+            if base_versions.bit_length() == all_stub_versions.bit_length()
+        )
+        latest_stub = ast.ClassDef(
+            name=name,
+            bases=[ast.Name(latest_stub_base, ast.Load())],
+            keywords=[],
+            body=[
+                _guard_generator(stub, versions)
+                for stub, versions, _ in sorted(
+                    stub_generator.items[name].values(), key=by_order
+                )
+            ],
+            decorator_list=[],
+        )
+
+        if len(bases) > 1:
             base_name = ast.Name(f"_{name}Base", ast.Store())
             base_switch = top_level_switch = None
-            for base, base_versions in all_stub_bases.items():
+            for base, base_versions in bases:
                 base_assign = ast.Assign([base_name], ast.Name(base, ast.Load()))
                 guarded_base_assign = _guard_generator(base_assign, base_versions)
                 if base_switch is None:
@@ -248,9 +276,9 @@ def generate_stubs(asdls):
     return module
 
 
-def retrive_version(source):
-    for comment in pyasdl.fetch_comments(source):
-        comment = comment.lstrip()
+def retrive_version(comments):
+    for comment in comments:
+        comment = comment.text.lstrip()
         if comment.startswith("version="):
             comment = comment.replace("version=", "")
             tuple_version = comment.replace(".", ",")
@@ -268,9 +296,8 @@ def main():
     asdls = []
     for file in options.files:
         with open(file) as stream:
-            source = stream.read()
-            version = retrive_version(source)
-            asdls.append((version, pyasdl.parse(source)))
+            tree, comments = pyasdl.parse_with_comments(stream.read())
+            asdls.append((retrive_version(comments), tree))
 
     stub = generate_stubs(asdls)
     print("from __future__ import annotations")
@@ -1,5 +1,103 @@
 from __future__ import annotations
 
-from pyasdl.asdl import *
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from pyasdl.grammar import *
-from pyasdl.visitors import ASDLVisitor
+from pyasdl.visitors import ASDLVisitor, NodeTransformer, run_visitors, walk
+
+if TYPE_CHECKING:
+    from pyasdl.asdl import *
+    from pyasdl.batch import *
+    from pyasdl.classes import *
+    from pyasdl.comments import *
+    from pyasdl.compare import *
+    from pyasdl.frozen import *
+    from pyasdl.graph import *
+    from pyasdl.incremental import *
+    from pyasdl.merge import *
+    from pyasdl.profiling import *
+    from pyasdl.schema import *
+    from pyasdl.serialize import *
+
+# Only the grammar and the visitors are imported eagerly, everything
+# else (including the whole parser stack) is imported when one of its
+# names is first accessed (PEP 562); so tools that only work with
+# already parsed (or loaded) trees don't pay for it.
+_LAZY_ATTRIBUTES = {
+    "ENGINES": "pyasdl.asdl",
+    "parse": "pyasdl.asdl",
+    "parse_with_comments": "pyasdl.asdl",
+    "parse_bytes": "pyasdl.asdl",
+    "parse_file": "pyasdl.asdl",
+    "iterparse": "pyasdl.asdl",
+    "fetch_comments": "pyasdl.asdl",
+    "ParseResult": "pyasdl.batch",
+    "parse_many": "pyasdl.batch",
+    "build_classes": "pyasdl.classes",
+    "Comment": "pyasdl.comments",
+    "FieldChange": "pyasdl.compare",
+    "FieldsDiff": "pyasdl.compare",
+    "ConstructorDiff": "pyasdl.compare",
+    "TypeDiff": "pyasdl.compare",
+    "SchemaDiff": "pyasdl.compare",
+    "diff": "pyasdl.compare",
+    "FrozenNode": "pyasdl.frozen",
+    "freeze": "pyasdl.frozen",
+    "thaw": "pyasdl.frozen",
+    "reparse": "pyasdl.incremental",
+    "MergedField": "pyasdl.merge",
+    "MergedConstructor": "pyasdl.merge",
+    "MergedType": "pyasdl.merge",
+    "MergedSchema": "pyasdl.merge",
+    "merge_versions": "pyasdl.merge",
+    "MethodStats": "pyasdl.profiling",
+    "VisitorProfile": "pyasdl.profiling",
+    "profile_visitor": "pyasdl.profiling",
+    "BUILTIN_TYPES": "pyasdl.schema",
+    "Reference": "pyasdl.schema",
+    "Schema": "pyasdl.schema",
+    "is_simple_sum": "pyasdl.schema",
+    "TypeGraph": "pyasdl.graph",
+    "dump_schema": "pyasdl.serialize",
+    "load_schema": "pyasdl.serialize",
+}
+_LAZY_SUBMODULES = frozenset(["cache", "codec", "frozen"])
+
+__all__ = [
+    "identifier",
+    "string",
+    "constant",
+    "AST",
+    "Module",
+    "Type",
+    "type",
+    "Sum",
+    "Product",
+    "Constructor",
+    "Field",
+    "FieldQualifier",
+    "ASDLVisitor",
+    "NodeTransformer",
+    "run_visitors",
+    "walk",
+    *_LAZY_ATTRIBUTES,
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name])
+        value = getattr(module, name)
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module(f"pyasdl.{name}")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # Cache it, so that __getattr__ is only called once for each name.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_LAZY_ATTRIBUTES, *_LAZY_SUBMODULES})
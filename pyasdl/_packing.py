@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import sys
+from typing import Any, Union
+
+from pyasdl.grammar import (
+    Constructor,
+    Field,
+    FieldQualifier,
+    Module,
+    Product,
+    Sum,
+    Type,
+)
+
+StrPath = Union[str, "os.PathLike[str]"]
+
+_QUALIFIERS = [None, *FieldQualifier]
+_QUALIFIER_CODES = {qualifier: code for code, qualifier in enumerate(_QUALIFIERS)}
+
+# Trees are stored by the parse cache (and sent between processes by
+# parse_many()) as nested tuples with interned strings, which serialize
+# much faster than the dataclasses and only store each distinct name
+# once. They only consist of the builtin types, so they can be loaded
+# with `marshal` (which, unlike `pickle`, never runs any code from a
+# shared cache directory).
+
+
+def _pack_fields(fields: list[Field]) -> tuple[Any, ...]:
+    return tuple(
+        (
+            sys.intern(field.kind),
+            sys.intern(field.name),
+            _QUALIFIER_CODES[field.qualifier],
+        )
+        for field in fields
+    )
+
+
+def pack(module: Module) -> tuple[Any, ...]:
+    definitions = []
+    for definition in module.body:
+        value = definition.value
+        if isinstance(value, Sum):
+            body = tuple(
+                (sys.intern(constructor.name), _pack_fields(constructor.fields))
+                for constructor in value.types
+            )
+        else:
+            body = _pack_fields(value.fields)
+        definitions.append(
+            (
+                sys.intern(definition.name),
+                isinstance(value, Sum),
+                body,
+                _pack_fields(value.attributes),
+            )
+        )
+    return module.name, tuple(definitions)
+
+
+def _unpack_fields(fields: tuple[Any, ...]) -> list[Field]:
+    return [
+        Field(kind, name, _QUALIFIERS[qualifier]) for kind, name, qualifier in fields
+    ]
+
+
+def unpack(packed: tuple[Any, ...]) -> Module:
+    name, definitions = packed
+    body = []
+    for type_name, is_sum, value, attributes in definitions:
+        if is_sum:
+            constructors = [
+                Constructor(constructor, _unpack_fields(fields))
+                for constructor, fields in value
+            ]
+            node: Sum | Product = Sum(constructors, _unpack_fields(attributes))
+        else:
+            node = Product(_unpack_fields(value), _unpack_fields(attributes))
+        body.append(Type(type_name, node))  # type: ignore
+    return Module(name, body)
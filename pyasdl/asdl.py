@@ -1,81 +1,167 @@
 from __future__ import annotations
 
-import argparse
-import io
-import tokenize as _tokenize
-from collections.abc import Iterator
-
-from pegen.tokenizer import Tokenizer
-
-from pyasdl.grammar import Module, Sum
-from pyasdl.parser import GeneratedParser as _ASDLParser
-
-__all__ = ["parse", "fetch_comments", "is_simple_sum"]
-# Since the pegen.tokenizer.Tokenizer uses .type instead of .exact_type
-# it is not trivial to change the default comment behavior. A workaround
-# way is sanitizing the input before passing it into the real parser
-
-COMMENT_PATTERN = _tokenize.Whitespace + r"--.*?\n"
-_tokenize.PseudoToken = _tokenize.Whitespace + _tokenize.group(
-    COMMENT_PATTERN,
-    _tokenize.PseudoExtras,
-    _tokenize.Number,
-    _tokenize.Funny,
-    _tokenize.ContStr,
-    _tokenize.Name,
-)
-
-
-def tokenize(
-    source: str, ignore_comments: bool = True
-) -> Iterator[_tokenize.TokenInfo]:
-    # A wrapper around tokenize.generate_tokens to pass comment tokens
-    source_buffer = io.StringIO(source)
-    for token in _tokenize.generate_tokens(source_buffer.readline):
-        if token.string.startswith("--") and ignore_comments:
-            continue
-        yield token
-
-
-def parse(source: str, *, filename: str = "<pyasdl>") -> Module:
-    """Parse the given `source` string, and return
-    the AST in the shape of an `pyasdl.Module`."""
-
-    tokenizer = Tokenizer(tokenize(source))
-    parser = _ASDLParser(tokenizer)
+import mmap
+import os
+from collections.abc import Callable, Iterable, Iterator
+from token import COMMENT
+from tokenize import TokenInfo
+
+from pyasdl import cache as _cache
+from pyasdl.comments import Comment, CommentCollector
+from pyasdl.grammar import Module, Type
+from pyasdl.lexer import tokenize, tokenize_lines
+from pyasdl.ll1 import LL1Parser
+from pyasdl.schema import is_simple_sum
+
+__all__ = [
+    "ENGINES",
+    "parse",
+    "parse_with_comments",
+    "parse_bytes",
+    "parse_file",
+    "iterparse",
+    "fetch_comments",
+    "is_simple_sum",
+]
+
+ENGINES = ("pegen", "ll1")
+
+
+def _parse_pegen(tokens: Iterator[TokenInfo], filename: str) -> Module:
+    from pegen.tokenizer import Tokenizer
+
+    from pyasdl.parser import GeneratedParser
+
+    parser = GeneratedParser(Tokenizer(tokens))
     tree = parser.start()
 
     if tree is None:
-        raise parser.make_syntax_error(filename)
+        raise parser.make_syntax_error("invalid syntax", filename)
     return tree
 
 
+def _parse_ll1(tokens: Iterator[TokenInfo], filename: str) -> Module:
+    parser = LL1Parser(tokens, filename=filename)
+    return parser.start()
+
+
+def _get_parser(engine: str) -> Callable[[Iterator[TokenInfo], str], Module]:
+    if engine == "pegen":
+        return _parse_pegen
+    elif engine == "ll1":
+        return _parse_ll1
+    else:
+        raise ValueError(f"Unknown parser engine: {engine!r}")
+
+
+def parse(source: str, *, filename: str = "<pyasdl>", engine: str = "pegen") -> Module:
+    """Parse the given `source` string, and return
+    the AST in the shape of an `pyasdl.Module`."""
+
+    parser = _get_parser(engine)
+    cache = _cache.current()
+    if cache is None:
+        return parser(tokenize(source), filename)
+
+    return cache.fetch(
+        source.encode("utf-8", "surrogatepass"),
+        "utf-8",
+        lambda: parser(tokenize(source), filename),
+    )
+
+
+def parse_with_comments(
+    source: str, *, filename: str = "<pyasdl>", engine: str = "pegen"
+) -> tuple[Module, list[Comment]]:
+    """Parse the given `source` string, and return the
+    AST together with all the comments in it (each one is
+    attached to the nearest definition, if it is inside the
+    module body) in a single tokenization pass."""
+
+    parser = _get_parser(engine)
+    collector = CommentCollector()
+    tokens = tokenize(source, ignore_comments=False)
+    tree = parser(collector.filter(tokens), filename)
+    return tree, collector.attach(tree)
+
+
+def parse_bytes(
+    buffer: bytes | bytearray | memoryview | mmap.mmap,
+    *,
+    filename: str = "<pyasdl>",
+    engine: str = "pegen",
+    encoding: str = "utf-8",
+) -> Module:
+    """Parse the given `buffer` (anything that supports the
+    buffer protocol), and return the AST in the shape of an
+    `pyasdl.Module`. The buffer is decoded only once, without
+    any intermediate copies."""
+
+    parser = _get_parser(engine)
+    cache = _cache.current()
+    if cache is None:
+        return parser(tokenize(str(buffer, encoding)), filename)
+
+    # The cache is keyed by the raw bytes, so hits don't
+    # even need to decode the buffer.
+    return cache.fetch(
+        buffer, encoding, lambda: parser(tokenize(str(buffer, encoding)), filename)
+    )
+
+
+def parse_file(
+    path: str | os.PathLike[str], *, engine: str = "pegen", encoding: str = "utf-8"
+) -> Module:
+    """Parse the ASDL file at the given `path` through a memory
+    map, and return the AST in the shape of an `pyasdl.Module`."""
+
+    filename = os.fspath(path)
+    with open(filename, "rb") as stream:
+        if os.fstat(stream.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            return parse_bytes(b"", filename=filename, engine=engine)
+
+        with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return parse_bytes(
+                buffer, filename=filename, engine=engine, encoding=encoding
+            )
+
+
+def iterparse(
+    stream: Iterable[str], *, filename: str | None = None
+) -> Iterator[tuple[str, Type]]:
+    """Parse the ASDL source from the given text `stream` (or any
+    other iterable of lines), and yield a `(module_name, definition)`
+    pair as soon as each definition is complete. Syntax errors are
+    raised when they are reached."""
+
+    if filename is None:
+        # Streams opened from a file descriptor have an int name
+        filename = str(getattr(stream, "name", "<pyasdl>"))
+
+    parser = LL1Parser(tokenize_lines(stream), filename=filename)
+    name = parser.header()
+    for definition in parser.definitions():
+        yield name, definition
+
+
 def fetch_comments(source: str) -> Iterator[str]:
     """Return an iterator of the ASDL comments in the
     given `source` string."""
     for token in tokenize(source, ignore_comments=False):
-        if token.string.startswith("--"):
+        if token.type == COMMENT:
             yield token.string[2:]
 
 
-def is_simple_sum(node: Sum) -> bool:
-    """Check whether if the given `node`'s
-    all children lack any fields."""
-    return (
-        all(len(constructor.fields) == 0 for constructor in node.types)
-        and len(node.attributes) == 0
-    )
-
-
 def main() -> None:
+    import argparse
+
     parser = argparse.ArgumentParser()
     parser.add_argument("file")
+    parser.add_argument("--engine", choices=ENGINES, default="pegen")
     options = parser.parse_args()
 
-    with open(options.file) as f:
-        content = f.read()
-
-    print(parse(content))
+    print(parse_file(options.file, engine=options.engine))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from pyasdl._packing import StrPath, pack, unpack
+from pyasdl.asdl import parse_file
+from pyasdl.grammar import Module
+
+__all__ = ["ParseResult", "parse_many"]
+
+
+@dataclass
+class ParseResult:
+    path: StrPath
+    module: Module | None = None
+    error: SyntaxError | OSError | UnicodeDecodeError | None = None
+
+
+# Trees are sent back from the worker processes in their packed
+# form, which pickles much faster than the dataclasses.
+
+
+def _parse_one(path: StrPath, engine: str, packed: bool) -> tuple[Any, ...]:
+    try:
+        module = parse_file(path, engine=engine)
+    except (SyntaxError, OSError, UnicodeDecodeError) as exc:
+        return False, exc
+    else:
+        return True, pack(module) if packed else module
+
+
+def parse_many(
+    paths: Iterable[StrPath],
+    *,
+    workers: int | None = None,
+    executor: str = "process",
+    engine: str = "pegen",
+) -> list[ParseResult]:
+    """Parse all the ASDL files in the given `paths` in parallel,
+    with `workers` processes (or threads, depending on the `executor`).
+
+    The results are returned in the same order as the `paths`. Files
+    with syntax errors (or that can't be read or decoded) don't stop the
+    rest of the batch, instead the error is stored in their result."""
+
+    paths = list(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    pool: Executor
+    if executor == "process":
+        pool = ProcessPoolExecutor(max_workers=workers)
+        packed = True
+    elif executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=workers)
+        packed = False
+    else:
+        raise ValueError(f"Unknown executor: {executor!r}")
+
+    chunksize = max(1, len(paths) // (workers * 4))
+    with pool:
+        outcomes = pool.map(
+            _parse_one,
+            paths,
+            [engine] * len(paths),
+            [packed] * len(paths),
+            chunksize=chunksize,
+        )
+
+        results = []
+        for path, (success, value) in zip(paths, outcomes):
+            if not success:
+                results.append(ParseResult(path, error=value))
+            elif packed:
+                results.append(ParseResult(path, module=unpack(value)))
+            else:
+                results.append(ParseResult(path, module=value))
+    return results
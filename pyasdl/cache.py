@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import codecs
+import hashlib
+import marshal
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pyasdl._packing import StrPath, pack, unpack
+from pyasdl.grammar import Module
+
+__all__ = ["CacheStats", "ParseCache", "enable", "disable", "current"]
+
+# Bump whenever the layout of the packed trees (pyasdl._packing) changes.
+_FORMAT = 1
+_MAGIC = b"PYASDL%c%c" % (_FORMAT, marshal.version)
+
+_TEMPORARY_SUFFIX = ".tmp"
+_SUFFIX = ".asdlc"
+
+# Temporary files that are older than this were left
+# behind by a crashed writer, and can be removed.
+_STALE_TEMPORARY_AGE = 60 * 60
+
+
+def _get_version() -> str:
+    from importlib import metadata
+
+    try:
+        return metadata.version("pyasdl")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _default_directory() -> Path:
+    if directory := os.environ.get("PYASDL_CACHE_DIR"):
+        return Path(directory)
+    if cache_home := os.environ.get("XDG_CACHE_HOME"):
+        return Path(cache_home) / "pyasdl"
+    return Path.home() / ".cache" / "pyasdl"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    memory_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+
+class ParseCache:
+    """A content addressed cache of parsed modules, stored in the
+    given `directory` (which can be shared by multiple processes)
+    with an in-memory LRU layer of `memory_entries` in front of it.
+
+    Once the files in the directory exceed `max_size` bytes, the
+    least recently used ones are evicted; and entries that weren't
+    used for `max_age` seconds are considered to be stale."""
+
+    def __init__(
+        self,
+        directory: StrPath | None = None,
+        *,
+        max_size: int = 64 * 1024 * 1024,
+        max_age: float | None = None,
+        memory_entries: int = 128,
+    ) -> None:
+        if directory is None:
+            directory = _default_directory()
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.memory_entries = memory_entries
+        self.stats = CacheStats()
+
+        self._salt = f"pyasdl {_get_version()} {_FORMAT}\0".encode()
+        self._memory: OrderedDict[str, tuple[Any, ...]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._size: int | None = None
+
+    def key(self, data: Any, encoding: str = "utf-8") -> str:
+        """Return the cache key of the given source `data` (anything
+        that supports the buffer protocol), in the given `encoding`."""
+        hasher = hashlib.sha256(self._salt)
+        hasher.update(codecs.lookup(encoding).name.encode())
+        hasher.update(b"\0")
+        hasher.update(data)
+        return hasher.hexdigest()
+
+    def fetch(self, data: Any, encoding: str, parse: Callable[[], Module]) -> Module:
+        """Return the module for the given source `data` from the cache,
+        or call `parse` (and store the result) if it isn't there."""
+        key = self.key(data, encoding)
+        packed = self.get(key)
+        if packed is None:
+            module = parse()
+            self.put(key, module)
+            return module
+        return unpack(packed)
+
+    def get(self, key: str) -> tuple[Any, ...] | None:
+        with self._lock:
+            packed = self._memory.get(key)
+            if packed is not None:
+                self._memory.move_to_end(key)
+                self.stats.hits += 1
+                self.stats.memory_hits += 1
+                return packed
+
+        packed = self._load(self._path(key))
+        with self._lock:
+            if packed is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+                self._remember(key, packed)
+        return packed
+
+    def put(self, key: str, module: Module) -> None:
+        packed = pack(module)
+        with self._lock:
+            self._remember(key, packed)
+
+        try:
+            size = self._store(self._path(key), marshal.dumps(packed))
+        except OSError:
+            # The cache is only an optimization; failing to write
+            # to it (e.g. a read-only directory) shouldn't fail the
+            # parse itself.
+            return
+
+        with self._lock:
+            self.stats.writes += 1
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += size
+            evict = self._size > self.max_size
+        if evict:
+            self.prune()
+
+    def prune(self) -> None:
+        """Remove the stale entries, and then the least recently
+        used ones until the cache fits into its `max_size`."""
+        now = time.time()
+        entries, total = self._scan()
+        entries.sort()
+
+        removed = 0
+        for mtime, size, path in entries:
+            if path.endswith(_TEMPORARY_SUFFIX):
+                if now - mtime > _STALE_TEMPORARY_AGE:
+                    self._remove(path)
+                continue
+            if total <= self.max_size and not self._is_stale(mtime, now):
+                continue
+            if self._remove(path):
+                removed += 1
+            total -= size
+
+        with self._lock:
+            self.stats.evictions += removed
+            self._size = total
+
+    def clear(self) -> None:
+        """Remove all the entries, both from memory and the disk."""
+        with self._lock:
+            self._memory.clear()
+        for _, _, path in self._scan()[0]:
+            self._remove(path)
+        with self._lock:
+            self._size = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + _SUFFIX)
+
+    def _remember(self, key: str, packed: tuple[Any, ...]) -> None:
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = packed
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _is_stale(self, mtime: float, now: float) -> bool:
+        return self.max_age is not None and now - mtime > self.max_age
+
+    def _load(self, path: Path) -> tuple[Any, ...] | None:
+        try:
+            with open(path, "rb") as stream:
+                if self._is_stale(os.fstat(stream.fileno()).st_mtime, time.time()):
+                    raise ValueError("stale entry")
+                if stream.read(len(_MAGIC)) != _MAGIC:
+                    raise ValueError("incompatible entry")
+                packed = marshal.loads(stream.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, TypeError):
+            self._remove(path)
+            return None
+
+        try:
+            # Mark the entry as recently used, for the eviction.
+            os.utime(path)
+        except OSError:
+            pass
+        return packed
+
+    def _store(self, path: Path, data: bytes) -> int:
+        import tempfile
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file and then atomically move it into its
+        # place, so that the concurrent readers (possibly from other
+        # processes) either see the complete entry or nothing at all.
+        descriptor, temporary = tempfile.mkstemp(
+            dir=self.directory, suffix=_TEMPORARY_SUFFIX
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as stream:
+                stream.write(_MAGIC)
+                stream.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            self._remove(temporary)
+            raise
+        return len(_MAGIC) + len(data)
+
+    def _scan(self) -> tuple[list[tuple[float, int, str]], int]:
+        entries: list[tuple[float, int, str]] = []
+        total = 0
+        try:
+            iterator = os.scandir(self.directory)
+        except FileNotFoundError:
+            return entries, total
+
+        with iterator:
+            for entry in iterator:
+                if not entry.name.endswith((_SUFFIX, _TEMPORARY_SUFFIX)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                if entry.name.endswith(_SUFFIX):
+                    total += stat.st_size
+        return entries, total
+
+    @staticmethod
+    def _remove(path: StrPath) -> bool:
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
+
+
+_current: ParseCache | None = None
+
+
+def enable(
+    directory: StrPath | None = None,
+    *,
+    max_size: int = 64 * 1024 * 1024,
+    max_age: float | None = None,
+    memory_entries: int = 128,
+) -> ParseCache:
+    """Enable the parse cache for `parse()`, `parse_bytes()` and
+    `parse_file()`, and return it. The `directory` defaults to the
+    `PYASDL_CACHE_DIR` environment variable or `~/.cache/pyasdl`."""
+    global _current
+    _current = ParseCache(
+        directory,
+        max_size=max_size,
+        max_age=max_age,
+        memory_entries=memory_entries,
+    )
+    return _current
+
+
+def disable() -> None:
+    """Disable the parse cache (the entries on disk are kept)."""
+    global _current
+    _current = None
+
+
+def current() -> ParseCache | None:
+    """Return the enabled parse cache, if there is one."""
+    return _current
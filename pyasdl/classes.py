@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import keyword
+from enum import Enum
+from types import CodeType, FunctionType, ModuleType
+from typing import Any
+
+from pyasdl.grammar import Field, FieldQualifier, Module, Sum
+from pyasdl.schema import Schema
+
+__all__ = ["build_classes"]
+
+
+class _Node:
+    # The base of the AST classes of all the namespaces; the fields of
+    # each class are in its _field_names (in the order of the schema),
+    # and the ones that might hold other nodes are in its _fields.
+    __slots__ = ()
+
+    _field_names: tuple[str, ...] = ()
+    _fields: tuple[str, ...] = ()
+
+    def __eq__(self, other: object) -> bool:
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self._field_names
+        )
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{name}={getattr(self, name, None)!r}" for name in self._field_names
+        )
+        return f"{type(self).__name__}({fields})"
+
+
+def _abstract_init(self: Any, *args: Any, **kwargs: Any) -> None:
+    raise TypeError(f"Can't instantiate the abstract class {type(self).__name__}")
+
+
+def _check_names(fields: list[Field]) -> None:
+    names = set()
+    for field in fields:
+        if (
+            not field.name.isidentifier()
+            or keyword.iskeyword(field.name)
+            or field.name == "self"
+        ):
+            raise ValueError(f"Invalid field name: {field.name!r}")
+        elif field.name in names:
+            raise ValueError(f"Duplicate field name: {field.name!r}")
+        names.add(field.name)
+
+
+# The kinds of the __init__ parameters
+_REQUIRED, _OPTIONAL, _SEQUENCE = range(3)
+
+# The code of the __init__s for each shape of parameters, with the
+# placeholder names (which are replaced with the names of the fields).
+_TEMPLATES: dict[tuple[tuple[int, ...], tuple[int, ...]], CodeType] = {}
+
+
+def _compile_template(
+    field_kinds: tuple[int, ...], attribute_kinds: tuple[int, ...]
+) -> CodeType:
+    parameters = ["self"]
+    body = []
+    for prefix, kinds in [("f", field_kinds), ("a", attribute_kinds)]:
+        for index, kind in enumerate(kinds):
+            name = f"{prefix}{index}"
+            if kind == _REQUIRED:
+                parameters.append(name)
+                body.append(f"self.{name} = {name}")
+            elif kind == _OPTIONAL:
+                parameters.append(f"{name}=None")
+                body.append(f"self.{name} = {name}")
+            else:
+                parameters.append(f"{name}=None")
+                body.append(f"self.{name} = [] if {name} is None else {name}")
+
+    source = f"def __init__({', '.join(parameters)}):\n" + "".join(
+        f"    {line}\n" for line in body or ["pass"]
+    )
+    namespace: dict[str, Any] = {}
+    exec(compile(source, "<pyasdl.build_classes>", "exec"), namespace)
+    return namespace["__init__"].__code__
+
+
+def _create_init(
+    qualname: str, fields: list[Field], attributes: list[Field]
+) -> FunctionType:
+    # Take the fields, and then the attributes. Optional and sequence
+    # fields default to None (and an empty list), unless they are followed
+    # by a required one; the attributes always have defaults.
+    field_kinds = [
+        _REQUIRED
+        if field.qualifier is None
+        else _SEQUENCE
+        if field.qualifier is FieldQualifier.SEQUENCE
+        else _OPTIONAL
+        for field in fields
+    ]
+    for index in range(len(field_kinds) - 1, -1, -1):
+        if field_kinds[index] == _REQUIRED:
+            field_kinds[:index] = [_REQUIRED] * index
+            break
+    attribute_kinds = tuple(
+        _SEQUENCE if field.qualifier is FieldQualifier.SEQUENCE else _OPTIONAL
+        for field in attributes
+    )
+
+    key = (tuple(field_kinds), attribute_kinds)
+    template = _TEMPLATES.get(key)
+    if template is None:
+        template = _TEMPLATES[key] = _compile_template(*key)
+
+    names = {"self": "self"}
+    names.update((f"f{index}", field.name) for index, field in enumerate(fields))
+    names.update((f"a{index}", field.name) for index, field in enumerate(attributes))
+    code = template.replace(
+        co_varnames=tuple(names[name] for name in template.co_varnames),
+        co_names=tuple(names[name] for name in template.co_names),
+    )
+
+    defaults = (None,) * (
+        len(attributes) + len(field_kinds) - field_kinds.count(_REQUIRED)
+    )
+    init = FunctionType(code, {}, "__init__", defaults or None)
+    init.__qualname__ = qualname
+    return init
+
+
+def build_classes(module: Module) -> ModuleType:
+    """Create the Python classes for all the definitions in the given
+    `module`, and return them in a new namespace (named after the module),
+    together with their `AST` base class. Simple sums become `Enum`s,
+    other sums become abstract base classes (with their attributes) for
+    their constructors; and the constructors and products become classes
+    with `__slots__`, and an `__init__` that takes the fields and then the
+    attributes (which default to None).
+
+    The `__init__`s are compiled once for each shape of parameters (and
+    shared between all the schemas), and only their names are replaced
+    for each class."""
+
+    schema = Schema(module)
+    namespace = ModuleType(module.name)
+    base = type("AST", (_Node,), {"__slots__": (), "__module__": module.name})
+    namespace.AST = base  # type: ignore
+
+    def child_fields(fields: list[Field]) -> tuple[str, ...]:
+        return tuple(
+            field.name
+            for field in fields
+            if field.kind in schema and not schema.is_simple_sum(field.kind)
+        )
+
+    # (name, base class, fields, attributes) of each concrete class
+    concrete = []
+    for definition in module.body:
+        value = definition.value
+        if isinstance(value, Sum):
+            if schema.is_simple_sum(definition.name):
+                setattr(
+                    namespace,
+                    definition.name,
+                    Enum(  # type: ignore
+                        definition.name,
+                        [constructor.name for constructor in value.types],
+                        module=module.name,
+                    ),
+                )
+                continue
+
+            sum_class = type(
+                definition.name,
+                (base,),
+                {
+                    "__slots__": tuple(field.name for field in value.attributes),
+                    "__init__": _abstract_init,
+                    "__module__": module.name,
+                },
+            )
+            setattr(namespace, definition.name, sum_class)
+            for constructor in value.types:
+                concrete.append(
+                    (constructor.name, sum_class, constructor.fields, value.attributes)
+                )
+        else:
+            concrete.append((definition.name, base, value.fields, value.attributes))
+
+    for name, parent, fields, attributes in concrete:
+        _check_names([*fields, *attributes])
+        init = _create_init(f"{name}.__init__", fields, attributes)
+
+        own_attributes = [] if parent is not base else attributes
+        field_names = tuple(field.name for field in fields)
+        setattr(
+            namespace,
+            name,
+            type(
+                name,
+                (parent,),
+                {
+                    "__slots__": field_names
+                    + tuple(field.name for field in own_attributes),
+                    "__init__": init,
+                    "__match_args__": field_names,
+                    "_field_names": field_names
+                    + tuple(field.name for field in attributes),
+                    "_fields": child_fields([*fields, *attributes]),
+                    "__module__": module.name,
+                },
+            ),
+        )
+
+    return namespace
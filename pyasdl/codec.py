@@ -0,0 +1,1270 @@
+from __future__ import annotations
+
+import builtins
+import keyword
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from collections.abc import Callable, Iterator
+from enum import Enum
+from functools import partial
+from itertools import accumulate
+from types import MemberDescriptorType
+from typing import Any, Union, cast
+
+from pyasdl.classes import _check_names, _Node, build_classes
+from pyasdl.grammar import Field, FieldQualifier, Module, Product, Sum
+from pyasdl.schema import Schema
+from pyasdl.serialize import _read_varints, _write_varint, dump_schema
+
+__all__ = ["Codec", "compile"]
+
+# The format of the encoded trees consists of:
+#
+#   header:       b"ASDT" + format version (1 byte) + layout (1 byte,
+#                 0 for this one) + the CRC-32 of the schema (as dumped
+#                 by dump_schema(), 4 bytes)
+#   string table: count, the length of each string (in code points),
+#                 and then the size (in bytes) and the contents of
+#                 all the strings concatenated (in UTF-8)
+#   values:       all the values of the tree (until the end)
+#
+# where the integers in the header and the string table are unsigned
+# LEB128 varints. The values start with the index of the definition
+# that the root belongs to, and then the root node:
+#
+#   node:         the tag of the constructor (its index in the sum,
+#                 starting from 1; 0 stands for None) unless it is a
+#                 product, the bitsets of the optional fields that are
+#                 present (16 fields per value, if it has any), and
+#                 then all the fields and the attributes in order
+#
+# where each field is encoded depending on its kind: the nodes of sums
+# and products as above, the members of simple sums as their tag, the
+# identifiers and strings as their index in the string table, the ints
+# as themselves (or as _ESCAPE and the index of their hexadecimal form
+# in the string table, for the negative and very large ones), and the
+# constants as a tag and then their value. Sequences are prefixed by
+# their length, and the missing optional fields are skipped.
+#
+# Each value is stored as a code point of a UTF-8 string, which is a
+# variable length encoding that takes 1 byte for the values below 128
+# (and 2 bytes below 2048, 3 below 65536); so all of them are written
+# (and read) at once by the codecs, instead of byte by byte.
+#
+# The indexed layout (layout 1, written by encode(node, indexed=True))
+# can be read lazily, one node at a time:
+#
+#   header:       as above
+#   index:        the number of strings, the index of the definition
+#                 that the root belongs to, and the offset of the root
+#                 (from the start of the records); 4 bytes each
+#   string table: the end offset of each string (in bytes, 4 bytes
+#                 each), and then all the strings concatenated (UTF-8)
+#   records:      the records of all the nodes, children first
+#
+# where the record of a node holds the same values as above (as LEB128
+# varints), except that the nodes of its fields are referenced by their
+# distance (in bytes) from the start of its own record, 0 standing for
+# None. The sequences of nodes are stored as their length, the width of
+# the distances (1, 2, 4 or 8 bytes) and then the distances themselves,
+# so any item can be found without reading the others; the strings are
+# found through their end offsets in the same way.
+#
+# The encoders and decoders are generated as Python source for each
+# schema, with one function per constructor (and product) that writes
+# or reads its fields in order; so they never look at the schema (or
+# the fields of the nodes) while running.
+
+_MAGIC = b"ASDT"
+_VERSION = 1
+_HEADER_SIZE = len(_MAGIC) + 6
+
+# The layouts of the values
+_SEQUENTIAL, _INDEXED = range(2)
+_INDEX = struct.Struct("<3I")
+_OFFSET = struct.Struct("<I")
+
+_ESCAPE = 0x10FFFF
+_OPTIONAL_BITS = 16
+
+# Unsigned 32-bit integers in the native byte order, for
+# converting the values from (and to) UTF-32.
+_UINT32 = "I" if array("I").itemsize == 4 else "L"
+_UTF32 = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"
+
+# The array types of the distances in the tables
+# of the indexed layout, by their width.
+_WIDTHS = {1: "B", 2: "H", 4: _UINT32, 8: "Q"}
+
+# The tags of the constants
+(
+    _NONE,
+    _FALSE,
+    _TRUE,
+    _ELLIPSIS,
+    _INT,
+    _FLOAT,
+    _COMPLEX,
+    _STR,
+    _BYTES,
+    _TUPLE,
+    _FROZENSET,
+) = range(11)
+
+# The kinds of the values, as far as the codec is concerned
+_STRING, _INTEGER, _CONSTANT, _SIMPLE, _SUM, _PRODUCT = range(6)
+_STRING_KINDS = frozenset(["identifier", "string"])
+
+# How the nodes of each class are created by the decoder: calling the
+# class with all the values as positional arguments (the classes of
+# build_classes()), creating the instance and filling its __dict__
+# (like pickle does), or calling the class with the fields as positional
+# arguments and the attributes as keyword arguments.
+_POSITIONAL, _DICT, _KEYWORDS = range(3)
+
+# How the fields of each class are stored by decode_lazy(): into the
+# __dict__ or the slots of a proxy (a subclass of the class, which
+# loads them on first access and then becomes an instance of the class
+# itself), or through setattr() when the node is created (for the classes
+# that can't have proxies, e.g. the ones whose fields are properties).
+_FILL_DICT, _FILL_SLOTS, _FILL_ATTRIBUTES = range(3)
+_STATE_KEY = "_lazy_state"
+
+
+def _write_int(
+    append: Callable[[int], None], strings: dict[str, int], value: int
+) -> None:
+    if 0 <= value < _ESCAPE:
+        append(value)
+    else:
+        append(_ESCAPE)
+        append(strings[format(value, "x")])
+
+
+def _write_constant(
+    append: Callable[[int], None], strings: dict[str, int], value: Any
+) -> None:
+    kind = type(value)
+    if kind is str:
+        append(_STR)
+        append(strings[value])
+    elif kind is int:
+        append(_INT)
+        _write_int(append, strings, value)
+    elif value is None:
+        append(_NONE)
+    elif value is False:
+        append(_FALSE)
+    elif value is True:
+        append(_TRUE)
+    elif value is Ellipsis:
+        append(_ELLIPSIS)
+    elif kind is float:
+        append(_FLOAT)
+        append(strings[repr(value)])
+    elif kind is complex:
+        append(_COMPLEX)
+        append(strings[repr(value.real)])
+        append(strings[repr(value.imag)])
+    elif kind is bytes:
+        append(_BYTES)
+        append(strings[value.decode("latin-1")])
+    elif kind is tuple or kind is frozenset:
+        append(_TUPLE if kind is tuple else _FROZENSET)
+        append(len(value))
+        for item in value:
+            _write_constant(append, strings, item)
+    else:
+        raise TypeError(f"Can't encode a constant of type {kind.__name__!r}")
+
+
+def _read_constant(
+    take: Callable[[], int], table: list[str] | _Reader, tag: int
+) -> Any:
+    # Read a constant, whose tag is already taken.
+    if tag == _STR:
+        return table[take()]
+    elif tag == _INT:
+        value = take()
+        return value if value != _ESCAPE else int(table[take()], 16)
+    elif tag == _NONE:
+        return None
+    elif tag == _FALSE:
+        return False
+    elif tag == _TRUE:
+        return True
+    elif tag == _ELLIPSIS:
+        return Ellipsis
+    elif tag == _FLOAT:
+        return float(table[take()])
+    elif tag == _COMPLEX:
+        real = float(table[take()])
+        return complex(real, float(table[take()]))
+    elif tag == _BYTES:
+        return table[take()].encode("latin-1")
+    elif tag == _TUPLE or tag == _FROZENSET:
+        items = [_read_constant(take, table, take()) for _ in range(take())]
+        return tuple(items) if tag == _TUPLE else frozenset(items)
+    else:
+        raise ValueError(f"Invalid constant tag: {tag}")
+
+
+def _read_uint(data: memoryview, position: int) -> tuple[int, int]:
+    # Read a single varint of a record, and return it with the end position.
+    value = data[position]
+    if value < 0x80:
+        return value, position + 1
+
+    value &= 0x7F
+    shift = 7
+    while True:
+        position += 1
+        byte = data[position]
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position + 1
+        shift += 7
+
+
+def _read_references(data: memoryview, position: int) -> tuple[list[int], int]:
+    # Read the distances of a sequence of nodes.
+    count, position = _read_uint(data, position)
+    if not count:
+        return [], position
+
+    width = data[position]
+    end = position + 1 + count * width
+    distances = array(_WIDTHS[width])
+    distances.frombytes(data[position + 1 : end])
+    if len(distances) != count:
+        raise IndexError("Truncated table of distances")
+    if sys.byteorder == "big":
+        distances.byteswap()
+    return distances.tolist(), end
+
+
+def _load_constant(reader: _Reader, position: int) -> tuple[Any, int]:
+    data = reader.data
+
+    def take() -> int:
+        nonlocal position
+        value, position = _read_uint(data, position)
+        return value
+
+    value = _read_constant(take, reader, take())
+    return value, position
+
+
+def _write_record(output: bytearray, record: list[Any]) -> int:
+    # Write the record of a node (whose values are either plain values,
+    # the start of a child as its complement, or the starts of the items
+    # of a sequence as a tuple, with -1 for None), and return its start.
+    start = len(output)
+    for value in record:
+        if value.__class__ is tuple:
+            distances = [start - child if child >= 0 else 0 for child in value]
+            _write_varint(output, len(distances))
+            if distances:
+                largest = max(distances)
+                width = (
+                    1
+                    if largest < 1 << 8
+                    else 2
+                    if largest < 1 << 16
+                    else 4
+                    if largest < 1 << 32
+                    else 8
+                )
+                items = array(_WIDTHS[width], distances)
+                if sys.byteorder == "big":
+                    items.byteswap()
+                output.append(width)
+                output += items
+        else:
+            if value < 0:
+                value = start - ~value
+            if value < 0x80:
+                output.append(value)
+            else:
+                _write_varint(output, value)
+    return start
+
+
+class _Reader(dict):
+    # The data of an indexed tree, and its strings (by their index in the
+    # string table), which are decoded on first use.
+    __slots__ = ("data", "count", "ends", "blob")
+
+    def __init__(self, data: memoryview, count: int, ends: int, blob: int) -> None:
+        super().__init__()
+        self.data = data
+        self.count = count
+        self.ends = ends
+        self.blob = blob
+
+    def __missing__(self, index: int) -> str:
+        if not 0 <= index < self.count:
+            raise ValueError(f"Invalid string index: {index}")
+        data, ends, blob = self.data, self.ends, self.blob
+        start = _OFFSET.unpack_from(data, ends + 4 * (index - 1))[0] if index else 0
+        (end,) = _OFFSET.unpack_from(data, ends + 4 * index)
+        string = self[index] = str(
+            data[blob + start : blob + end], "utf-8", "surrogatepass"
+        )
+        return string
+
+
+# Serializes the loading of the proxies (so that the other
+# threads never see a node whose fields are partially set).
+_LOAD_LOCK = threading.RLock()
+
+
+def _load(node: Any) -> None:
+    with _LOAD_LOCK:
+        # Unless it was loaded by another thread in the meantime
+        fill = vars(type(node)).get("_lazy_fill")
+        if fill is not None:
+            try:
+                fill(node)
+            except (IndexError, KeyError, struct.error) as exc:
+                raise ValueError("Truncated or corrupted tree data") from exc
+
+
+class _LazyField:
+    # A field of the proxies, which loads the node on first access. On
+    # the class itself, it is the attribute of the original class (e.g.
+    # the defaults that ast.dump() compares against).
+    __slots__ = ("name", "cls")
+
+    def __init__(self, name: str, cls: type) -> None:
+        self.name = name
+        self.cls = cls
+
+    def __get__(self, node: Any, owner: type | None = None) -> Any:
+        if node is None:
+            return getattr(self.cls, self.name, self)
+        _load(node)
+        return getattr(node, self.name)
+
+    def __set__(self, node: Any, value: Any) -> None:
+        _load(node)
+        setattr(node, self.name, value)
+
+    def __delete__(self, node: Any) -> None:
+        _load(node)
+        delattr(node, self.name)
+
+
+def _lazy_eq(node: Any, other: object) -> bool:
+    _load(node)
+    return node == other
+
+
+def _lazy_reduce_ex(node: Any, protocol: int) -> Any:
+    _load(node)
+    return node.__reduce_ex__(protocol)
+
+
+def _no_node(reader: _Reader, start: int) -> Any:
+    # The tag 0 (None) is never written into a record
+    raise ValueError("Truncated or corrupted tree data")
+
+
+def _proxy_class(cls: type, names: list[str]) -> type | None:
+    # The class of the proxies of the given class (whose fill function
+    # is set once it is generated), unless it can't be subclassed.
+    namespace: dict[str, Any] = {name: _LazyField(name, cls) for name in names}
+    namespace.update(
+        {
+            "__slots__": (),
+            "__module__": cls.__module__,
+            "__qualname__": cls.__qualname__,
+            "__eq__": _lazy_eq,
+            "__hash__": cls.__hash__,
+            "__reduce_ex__": _lazy_reduce_ex,
+        }
+    )
+    try:
+        return type(cls.__name__, (cls,), namespace)
+    except TypeError:
+        return None
+
+
+def _lazy_maker(
+    cls: type, proxy: type | None, fill: Callable[..., None], names: list[str]
+) -> Callable[[_Reader, int], Any]:
+    # Create the function that creates the nodes of the given class
+    # from their records (as proxies, if the class has them).
+    new: Callable[..., Any] = cls.__new__
+    if proxy is None:
+
+        def make(reader: _Reader, start: int) -> Any:
+            node = new(cls)
+            fill(node, reader, start)
+            return node
+
+        return make
+
+    proxy._lazy_fill = fill  # type: ignore
+    if proxy.__dictoffset__:
+
+        def make(reader: _Reader, start: int) -> Any:
+            node = new(proxy)
+            node.__dict__[_STATE_KEY] = (reader, start)
+            return node
+
+    else:
+        # The state is kept in the first slot, until it is filled
+        set_state = getattr(cls, names[0]).__set__
+
+        def make(reader: _Reader, start: int) -> Any:
+            node = new(proxy)
+            set_state(node, (reader, start))
+            return node
+
+    return make
+
+
+def _definitions(
+    module: Module,
+) -> Iterator[tuple[str, Sum | Product, list[str]]]:
+    # The name and the value of each definition of the module, and
+    # the names of its constructors (none for the products).
+    for definition in module.body:
+        value = cast(Union[Sum, Product], definition.value)
+        names = (
+            [constructor.name for constructor in value.types]
+            if isinstance(value, Sum)
+            else []
+        )
+        yield definition.name, value, names
+
+
+class _StringTable(dict):
+    # Assigns the next index to each new string.
+    def __missing__(self, string: str) -> int:
+        index = self[string] = len(self)
+        return index
+
+
+class _Dispatch(dict):
+    # The encoders of the constructors of a sum, by their classes. The
+    # classes of other namespaces (e.g. the `ast` module for a Python
+    # schema) are resolved by their names on first use.
+    def __init__(self, sum_name: str, encoders: dict[str, Any]) -> None:
+        super().__init__()
+        self.sum_name = sum_name
+        self.encoders = encoders
+
+    def __missing__(self, cls: type) -> Any:
+        encoder = self.encoders.get(cls.__name__)
+        if encoder is None:
+            raise TypeError(f"Can't encode {cls.__name__!r} as {self.sum_name!r}")
+        self[cls] = encoder
+        return encoder
+
+
+class _Tags(dict):
+    # The tags of the members of a simple sum, by their classes (or by
+    # the members themselves, for enums).
+    def __init__(self, sum_name: str, tags: dict[str, int]) -> None:
+        super().__init__()
+        self.sum_name = sum_name
+        self.tags = tags
+
+    def __missing__(self, key: Any) -> int:
+        if isinstance(key, Enum):
+            name = key.name
+        elif isinstance(key, type) and not issubclass(key, Enum):
+            name = key.__name__
+        else:
+            # Members of other namespaces (in a schema whose members are
+            # enums) aren't cached, since they might not be singletons.
+            name = type(key).__name__
+            if name in self.tags:
+                return self.tags[name]
+
+        if name not in self.tags:
+            raise TypeError(f"Can't encode {key!r} as {self.sum_name!r}")
+        tag = self[key] = self.tags[name]
+        return tag
+
+
+class _Generator:
+    # Generates the source of the encoders and decoders of a schema.
+
+    def __init__(self, schema: Schema, classes: Any) -> None:
+        self.schema = schema
+        self.classes = classes
+        self.lines = [
+            "def encode_none(node):",
+            "    append(0)",
+            "def decode_none():",
+            "    return None",
+        ]
+        self.namespace: dict[str, Any] = {
+            "write_int": _write_int,
+            "write_constant": _write_constant,
+            "read_constant": _read_constant,
+            "read": _read_uint,
+            "read_references": _read_references,
+            "load_constant": _load_constant,
+            "object_setattr": object.__setattr__,
+        }
+        # The concrete classes (name, tag, fields, attributes) and the
+        # sums (name, constructors), for generating the indexed encoders and the lazy decoders
+        # (which are only generated on first use).
+        self.concretes: list[tuple[str, int | None, list[Field], list[Field]]] = []
+        self.sums: list[tuple[str, list[str]]] = []
+
+    def emit(self, indent: int, line: str) -> None:
+        self.lines.append("    " * indent + line)
+
+    def kind_of(self, field: Field) -> int:
+        if field.kind in _STRING_KINDS:
+            return _STRING
+        elif field.kind == "int":
+            return _INTEGER
+        elif field.kind not in self.schema:
+            # constant, and the builtin types of other schemas
+            return _CONSTANT
+
+        value = self.schema[field.kind].value
+        if not isinstance(value, Sum):
+            return _PRODUCT
+        elif self.schema.is_simple_sum(field.kind):
+            return _SIMPLE
+        else:
+            return _SUM
+
+    def index_value(self, field: Field) -> str:
+        # The expression that writes the records of the node in `v`
+        # (and its children), and returns the start of its record.
+        if self.kind_of(field) == _SUM:
+            return f"index_dispatch_{field.kind}[v.__class__](v)"
+        else:
+            return f"index_{field.kind}(v)"
+
+    def encode_value(self, indent: int, field: Field, indexed: bool = False) -> None:
+        # Encode the value in `v`
+        kind = self.kind_of(field)
+        if indexed and kind in (_SUM, _PRODUCT):
+            self.emit(indent, f"append(~{self.index_value(field)})")
+            return
+        if kind == _STRING:
+            self.emit(indent, "append(strings[v])")
+        elif kind == _INTEGER:
+            self.emit(
+                indent,
+                f"append(v) if 0 <= v < {_ESCAPE} else write_int(append, strings, v)",
+            )
+        elif kind == _CONSTANT:
+            self.emit(indent, "if v.__class__ is str:")
+            self.emit(indent + 1, f"append({_STR})")
+            self.emit(indent + 1, "append(strings[v])")
+            self.emit(indent, "else:")
+            self.emit(indent + 1, "write_constant(append, strings, v)")
+        elif kind == _SIMPLE:
+            sum_class = getattr(self.classes, field.kind, None)
+            if isinstance(sum_class, type) and issubclass(sum_class, Enum):
+                self.emit(indent, f"append(tags_{field.kind}[v])")
+            else:
+                self.emit(indent, f"append(tags_{field.kind}[v.__class__])")
+        elif kind == _SUM:
+            self.emit(indent, f"dispatch_{field.kind}[v.__class__](v)")
+        else:
+            self.emit(indent, f"encode_{field.kind}(v)")
+
+    def decode_value(self, field: Field) -> str:
+        # The expression that decodes a value of the given field
+        # (which might use `v` as a temporary variable).
+        kind = self.kind_of(field)
+        if kind == _STRING:
+            return "table[take()]"
+        elif kind == _INTEGER:
+            return f"(v if (v := take()) != {_ESCAPE} else int(table[take()], 16))"
+        elif kind == _CONSTANT:
+            return (
+                f"(table[take()] if (v := take()) == {_STR} else read_constant(take,"
+                " table, v))"
+            )
+        elif kind == _SIMPLE:
+            return f"members_{field.kind}[take()]"
+        elif kind == _SUM:
+            return f"decoders_{field.kind}[take()]()"
+        else:
+            return f"decode_{field.kind}()"
+
+    def encoder(
+        self,
+        name: str,
+        tag: int | None,
+        fields: list[Field],
+        attributes: list[Field],
+        indexed: bool = False,
+    ) -> None:
+        # The indexed encoders collect the values into the record of the
+        # node (after writing the records of its children), and write it.
+        if indexed:
+            self.emit(0, f"def index_{name}(node):")
+            self.emit(1, f"r = [{tag}]" if tag is not None else "r = []")
+            self.emit(1, "append = r.append")
+        else:
+            self.emit(0, f"def encode_{name}(node):")
+            if tag is not None:
+                self.emit(1, f"append({tag})")
+
+        everything = [*fields, *attributes]
+        optional = [
+            field for field in everything if field.qualifier is FieldQualifier.OPTIONAL
+        ]
+        variables = {field.name: f"o{index}" for index, field in enumerate(optional)}
+        for field in optional:
+            self.emit(1, f"{variables[field.name]} = node.{field.name}")
+        for start in range(0, len(optional), _OPTIONAL_BITS):
+            bits = " | ".join(
+                f"({variables[field.name]} is not None) << {index}"
+                for index, field in enumerate(optional[start : start + _OPTIONAL_BITS])
+            )
+            self.emit(1, f"append({bits})")
+
+        for field in everything:
+            if field.qualifier is FieldQualifier.OPTIONAL:
+                self.emit(1, f"v = {variables[field.name]}")
+                self.emit(1, "if v is not None:")
+                self.encode_value(2, field, indexed)
+            elif field.qualifier is FieldQualifier.SEQUENCE:
+                if indexed and self.kind_of(field) in (_SUM, _PRODUCT):
+                    self.emit(
+                        1,
+                        f"append(tuple([{self.index_value(field)} for v in"
+                        f" node.{field.name}]))",
+                    )
+                    continue
+                self.emit(1, f"s = node.{field.name}")
+                self.emit(1, "append(len(s))")
+                self.emit(1, "for v in s:")
+                self.encode_value(2, field, indexed)
+            else:
+                self.emit(1, f"v = node.{field.name}")
+                self.encode_value(1, field, indexed)
+
+        if indexed:
+            self.emit(1, "return write_record(r)")
+        elif not everything and tag is None:
+            self.emit(1, "pass")
+
+    def decoder(
+        self, name: str, fields: list[Field], attributes: list[Field], creation: int
+    ) -> None:
+        self.emit(0, f"def decode_{name}():")
+        everything = [*fields, *attributes]
+        optional = [
+            field for field in everything if field.qualifier is FieldQualifier.OPTIONAL
+        ]
+        for start in range(0, len(optional), _OPTIONAL_BITS):
+            self.emit(1, f"b{start // _OPTIONAL_BITS} = take()")
+        if creation == _DICT:
+            self.emit(1, f"node = new_{name}(cls_{name})")
+            self.emit(1, "d = node.__dict__")
+
+        arguments = []
+        for index, field in enumerate(everything):
+            value = self.decode_value(field)
+            if field.qualifier is FieldQualifier.OPTIONAL:
+                position = optional.index(field)
+                bits = f"b{position // _OPTIONAL_BITS}"
+                bit = 1 << position % _OPTIONAL_BITS
+                value = f"{value} if {bits} & {bit} else None"
+            elif field.qualifier is FieldQualifier.SEQUENCE:
+                if ":=" in value:
+                    # Assignment expressions can't be used within the
+                    # comprehensions, so they are decoded one by one.
+                    self.emit(1, f"s{index} = []")
+                    self.emit(1, "for _ in range(take()):")
+                    self.emit(2, f"s{index}.append({value})")
+                    value = f"s{index}"
+                else:
+                    # Most of the sequences are empty or have a single item
+                    value = (
+                        f"([] if not (n := take()) else [{value}] if n == 1 else"
+                        f" [{value} for _ in range(n)])"
+                    )
+
+            if creation == _DICT:
+                self.emit(1, f"d[{field.name!r}] = {value}")
+            elif creation == _KEYWORDS and index >= len(fields):
+                arguments.append(f"{field.name}={value}")
+            else:
+                arguments.append(value)
+
+        if creation == _DICT:
+            self.emit(1, "return node")
+        else:
+            self.emit(1, f"return cls_{name}({', '.join(arguments)})")
+
+    def read(self, indent: int, target: str) -> None:
+        # Read a varint of the record into `target` (most of them
+        # are one or two bytes long, which are read inline).
+        self.emit(indent, f"{target} = data[p]")
+        self.emit(indent, f"if {target} < 0x80: p += 1")
+        self.emit(indent, "elif (w := data[p + 1]) < 0x80:")
+        self.emit(indent + 1, f"{target} = {target} & 0x7F | w << 7")
+        self.emit(indent + 1, "p += 2")
+        self.emit(indent, f"else: {target}, p = read(data, p)")
+
+    def load_value(self, indent: int, field: Field, target: str) -> None:
+        # Read a value of the given field from the record into `target`
+        # (which might use `v` as a temporary variable).
+        kind = self.kind_of(field)
+        if kind == _INTEGER:
+            self.read(indent, target)
+            self.emit(indent, f"if {target} == {_ESCAPE}:")
+            self.read(indent + 1, "v")
+            self.emit(indent + 1, f"{target} = int(reader[v], 16)")
+            return
+        elif kind == _CONSTANT:
+            self.emit(indent, f"{target}, p = load_constant(reader, p)")
+            return
+
+        self.read(indent, "v")
+        if kind == _STRING:
+            self.emit(indent, f"{target} = reader[v]")
+        elif kind == _SIMPLE:
+            self.emit(indent, f"{target} = members_{field.kind}[v]")
+        elif kind == _SUM:
+            self.emit(
+                indent,
+                f"{target} = lazy_{field.kind}(reader, start - v) if v else None",
+            )
+        else:
+            self.emit(indent, f"{target} = lazy_{field.kind}(reader, start - v)")
+
+    def filler(
+        self,
+        name: str,
+        tag: int | None,
+        fields: list[Field],
+        attributes: list[Field],
+        filling: int,
+    ) -> None:
+        # The proxies are filled from the state that they were created
+        # with, and then turned into the instances of the class itself;
+        # the other nodes are filled right after they are created. All
+        # the fields are read from the record first, and only then stored
+        # (so a corrupted record leaves the node as it was).
+        if filling == _FILL_DICT:
+            self.emit(0, f"def fill_{name}(node):")
+            self.emit(1, "d = node.__dict__")
+            self.emit(1, f"reader, start = d[{_STATE_KEY!r}]")
+        elif filling == _FILL_SLOTS:
+            self.emit(0, f"def fill_{name}(node):")
+            self.emit(1, f"reader, start = state_{name}(node)")
+        else:
+            self.emit(0, f"def fill_{name}(node, reader, start):")
+        self.emit(1, "data = reader.data")
+        if tag is None:
+            self.emit(1, "p = start")
+        else:
+            # Skip the tag, which is read when the node is created
+            self.emit(1, f"p = start + {(tag.bit_length() + 6) // 7}")
+
+        everything = [*fields, *attributes]
+        optional = [
+            field for field in everything if field.qualifier is FieldQualifier.OPTIONAL
+        ]
+        for start in range(0, len(optional), _OPTIONAL_BITS):
+            self.read(1, f"b{start // _OPTIONAL_BITS}")
+
+        for index, field in enumerate(everything):
+            target = f"f{index}"
+            if field.qualifier is FieldQualifier.OPTIONAL:
+                position = optional.index(field)
+                bits = f"b{position // _OPTIONAL_BITS}"
+                self.emit(1, f"if {bits} & {1 << position % _OPTIONAL_BITS}:")
+                self.load_value(2, field, target)
+                self.emit(1, "else:")
+                self.emit(2, f"{target} = None")
+            elif field.qualifier is FieldQualifier.SEQUENCE:
+                if self.kind_of(field) in (_SUM, _PRODUCT):
+                    self.emit(1, "s, p = read_references(data, p)")
+                    self.emit(
+                        1,
+                        f"{target} = [lazy_{field.kind}(reader, start - d) if d else"
+                        " None for d in s]",
+                    )
+                else:
+                    self.emit(1, f"{target} = []")
+                    self.read(1, "n")
+                    self.emit(1, "for _ in range(n):")
+                    self.load_value(2, field, "v")
+                    self.emit(2, f"{target}.append(v)")
+            else:
+                self.load_value(1, field, target)
+
+        if filling == _FILL_DICT:
+            self.emit(1, f"del d[{_STATE_KEY!r}]")
+        for index, field in enumerate(everything):
+            if filling == _FILL_DICT:
+                self.emit(1, f"d[{field.name!r}] = f{index}")
+            elif filling == _FILL_SLOTS:
+                self.emit(1, f"set_{name}_{field.name}(node, f{index})")
+            else:
+                self.emit(1, f"object_setattr(node, {field.name!r}, f{index})")
+        if filling != _FILL_ATTRIBUTES:
+            self.emit(1, f"object_setattr(node, '__class__', cls_{name})")
+        elif not everything:
+            self.emit(1, "pass")
+
+    def filling_of(self, cls: Any, names: list[str]) -> tuple[int, type | None]:
+        # The way the fields of the given class are filled,
+        # and the class of its proxies (if it can have them).
+        if not names or not isinstance(cls, type):
+            return _FILL_ATTRIBUTES, None
+        elif cls.__dictoffset__ and not any(
+            hasattr(getattr(cls, name, None), "__set__") for name in names
+        ):
+            filling = _FILL_DICT
+        elif all(
+            isinstance(getattr(cls, name, None), MemberDescriptorType) for name in names
+        ):
+            filling = _FILL_SLOTS
+        else:
+            return _FILL_ATTRIBUTES, None
+
+        proxy = _proxy_class(cls, names)
+        if proxy is None:
+            return _FILL_ATTRIBUTES, None
+        return filling, proxy
+
+    def concrete(
+        self, name: str, tag: int | None, fields: list[Field], attributes: list[Field]
+    ) -> None:
+        _check_names([*fields, *attributes])
+        cls = getattr(self.classes, name)
+        if isinstance(cls, type) and issubclass(cls, _Node):
+            creation = _POSITIONAL
+        elif isinstance(cls, type) and cls.__dictoffset__:
+            creation = _DICT
+            self.namespace[f"new_{name}"] = cls.__new__
+        else:
+            creation = _KEYWORDS
+        self.namespace[f"cls_{name}"] = cls
+        self.encoder(name, tag, fields, attributes)
+        self.decoder(name, fields, attributes, creation)
+        self.concretes.append((name, tag, fields, attributes))
+
+    def simple_sum(self, name: str, names: list[str]) -> None:
+        sum_class = getattr(self.classes, name, None)
+        if isinstance(sum_class, type) and issubclass(sum_class, Enum):
+            members = [sum_class[member] for member in names]
+        else:
+            members = [getattr(self.classes, member)() for member in names]
+
+        tags = _Tags(name, {member: tag for tag, member in enumerate(names, 1)})
+        for tag, member in enumerate(members, 1):
+            tags[member if isinstance(member, Enum) else type(member)] = tag
+        self.namespace[f"tags_{name}"] = tags
+        self.namespace[f"members_{name}"] = [None, *members]
+
+    def check_names(self) -> None:
+        # The names of the definitions and the constructors end up in the
+        # generated code (the field names are checked by `_check_names`).
+        for name, _, names in _definitions(self.schema.module):
+            for identifier in [name, *names]:
+                if not identifier.isidentifier() or keyword.iskeyword(identifier):
+                    raise ValueError(f"Invalid name: {identifier!r}")
+
+    def check_classes(self) -> None:
+        # Look up all the classes before generating anything, so that the
+        # namespaces that don't match the schema (e.g. the `ast` module of
+        # another version of Python) are reported with the missing names.
+        missing = []
+        for name, value, names in _definitions(self.schema.module):
+            if not isinstance(value, Sum):
+                names = [name]
+            elif self.schema.is_simple_sum(name):
+                sum_class = getattr(self.classes, name, None)
+                if isinstance(sum_class, type) and issubclass(sum_class, Enum):
+                    missing += [
+                        f"{name}.{member}"
+                        for member in names
+                        if member not in sum_class.__members__
+                    ]
+                    continue
+            missing += [
+                class_name
+                for class_name in names
+                if not hasattr(self.classes, class_name)
+            ]
+        if missing:
+            raise ValueError(
+                f"Missing classes for the {self.schema.module.name} schema: "
+                + ", ".join(map(repr, missing))
+            )
+
+    def generate(self) -> dict[str, Any]:
+        self.check_names()
+        self.check_classes()
+        schema, namespace = self.schema, self.namespace
+        for name, value, names in _definitions(schema.module):
+            if not isinstance(value, Sum):
+                self.concrete(name, None, value.fields, value.attributes)
+            elif schema.is_simple_sum(name):
+                self.simple_sum(name, names)
+            else:
+                self.sums.append((name, names))
+                for tag, constructor in enumerate(value.types, 1):
+                    self.concrete(
+                        names[tag - 1], tag, constructor.fields, value.attributes
+                    )
+
+        self.execute()
+        for sum_name, names in self.sums:
+            dispatch = _Dispatch(
+                sum_name, {name: namespace[f"encode_{name}"] for name in names}
+            )
+            dispatch[type(None)] = namespace["encode_none"]
+            for name in names:
+                dispatch[namespace[f"cls_{name}"]] = namespace[f"encode_{name}"]
+            namespace[f"dispatch_{sum_name}"] = dispatch
+            namespace[f"decoders_{sum_name}"] = [
+                namespace["decode_none"],
+                *[namespace[f"decode_{name}"] for name in names],
+            ]
+        return namespace
+
+    def generate_lazy(self) -> None:
+        namespace = self.namespace
+        self.lines = ["def index_none(node):", "    return -1"]
+        proxies: dict[str, tuple[type | None, list[str]]] = {}
+        for name, tag, fields, attributes in self.concretes:
+            cls = namespace[f"cls_{name}"]
+            names = [field.name for field in [*fields, *attributes]]
+            filling, proxy = self.filling_of(cls, names)
+            proxies[name] = (proxy, names)
+            if filling == _FILL_SLOTS:
+                namespace[f"state_{name}"] = getattr(cls, names[0]).__get__
+                for field_name in names:
+                    namespace[f"set_{name}_{field_name}"] = getattr(
+                        cls, field_name
+                    ).__set__
+            self.encoder(name, tag, fields, attributes, indexed=True)
+            self.filler(name, tag, fields, attributes, filling)
+
+        for sum_name, constructors in self.sums:
+            # Create the nodes of the sum by the tags of their records
+            self.emit(0, f"def lazy_{sum_name}(reader, start):")
+            if len(constructors) < 0x80:
+                read_tag = "reader.data[start]"
+            else:
+                read_tag = "read(reader.data, start)[0]"
+            self.emit(1, f"return makers_{sum_name}[{read_tag}](reader, start)")
+        self.execute()
+
+        for name, (proxy, names) in proxies.items():
+            namespace[f"lazy_{name}"] = _lazy_maker(
+                namespace[f"cls_{name}"], proxy, namespace[f"fill_{name}"], names
+            )
+        for sum_name, constructors in self.sums:
+            dispatch = _Dispatch(
+                sum_name, {name: namespace[f"index_{name}"] for name in constructors}
+            )
+            dispatch[type(None)] = namespace["index_none"]
+            for name in constructors:
+                dispatch[namespace[f"cls_{name}"]] = namespace[f"index_{name}"]
+            namespace[f"index_dispatch_{sum_name}"] = dispatch
+            namespace[f"makers_{sum_name}"] = [
+                _no_node,
+                *[namespace[f"lazy_{name}"] for name in constructors],
+            ]
+
+    def execute(self) -> None:
+        source = "\n".join(self.lines) + "\n"
+        filename = f"<pyasdl.codec {self.schema.module.name}>"
+        exec(builtins.compile(source, filename, "exec"), self.namespace)
+
+
+class Codec:
+    """The encoder and the decoder of the trees of a schema,
+    created by `compile()`."""
+
+    def __init__(self, module: Module, classes: Any) -> None:
+        self.module = module
+        self.classes = classes
+
+        schema = Schema(module)
+        self._generator: _Generator | None = _Generator(schema, classes)
+        self._namespace = namespace = self._generator.generate()
+        self._checksum = zlib.crc32(dump_schema(module)).to_bytes(4, "little")
+
+        # The generated functions write into the same buffer and the
+        # same string table (which are cleared after each call), and
+        # take the values from the end of the (reversed) list that is in
+        # their namespace. The indexed encoders write the records of the
+        # nodes into their own buffer.
+        self._buffer: list[int] = []
+        self._strings = _StringTable()
+        self._records = bytearray()
+        self._lock = threading.Lock()
+        namespace["append"] = self._buffer.append
+        namespace["strings"] = self._strings
+        namespace["write_record"] = partial(_write_record, self._records)
+
+        # The encoder (and the index of the definition) for the name of
+        # each root class, and the decoder for each definition (and the
+        # name of its lazy decoder, unless it is a simple sum).
+        self._roots: dict[str, tuple[int, Callable[[Any], None]]] = {}
+        self._root_decoders: list[Callable[[], Any]] = []
+        self._lazy_roots: list[str | None] = []
+        for index, (name, value, names) in enumerate(_definitions(module)):
+            if not isinstance(value, Sum):
+                encoder = namespace[f"encode_{name}"]
+                self._roots[name] = (index, encoder)
+                self._root_decoders.append(namespace[f"decode_{name}"])
+                self._lazy_roots.append(f"lazy_{name}")
+            elif not schema.is_simple_sum(name):
+                for constructor_name in names:
+                    encoder = namespace[f"encode_{constructor_name}"]
+                    self._roots[constructor_name] = (index, encoder)
+
+                def decode_sum(
+                    decoders: list[Callable[[], Any]] = namespace[f"decoders_{name}"]
+                ) -> Any:
+                    return decoders[namespace["take"]()]()
+
+                self._root_decoders.append(decode_sum)
+                self._lazy_roots.append(f"lazy_{name}")
+            else:
+                self._root_decoders.append(namespace["decode_none"])
+                self._lazy_roots.append(None)
+
+    def _prepare_lazy(self) -> dict[str, Any]:
+        # The indexed encoders and the lazy decoders are generated on
+        # first use, since they take as long to generate as the others.
+        with self._lock:
+            if self._generator is not None:
+                self._generator.generate_lazy()
+                self._generator = None
+        return self._namespace
+
+    def _header(self, layout: int) -> bytes:
+        return _MAGIC + bytes([_VERSION, layout]) + self._checksum
+
+    def _check_header(self, data: memoryview, layout: int) -> None:
+        header = bytes(data[:_HEADER_SIZE])
+        if header[: len(_MAGIC)] != _MAGIC:
+            raise ValueError("Not an encoded ASDL tree")
+        if header[len(_MAGIC)] != _VERSION:
+            raise ValueError(
+                f"Unsupported tree format version: {header[len(_MAGIC)]} (expected"
+                f" {_VERSION})"
+            )
+        if header[len(_MAGIC) + 1] != layout:
+            if layout == _INDEXED:
+                raise ValueError("The tree wasn't encoded with indexed=True")
+            else:
+                raise ValueError(
+                    "The tree was encoded with indexed=True, and it can only be"
+                    " read by decode_lazy()"
+                )
+        if header != self._header(layout):
+            raise ValueError(
+                f"The tree wasn't encoded with the {self.module.name} schema"
+            )
+
+    def encode(self, node: Any, *, indexed: bool = False) -> bytes:
+        """Encode the given `node` (an instance of a constructor
+        or a product of the schema) and all of its children.
+
+        With `indexed`, the nodes are stored with the offsets of their
+        children, so that `decode_lazy()` can read them one by one
+        (instead of `decode()`); at the cost of a larger and slower
+        encoding."""
+
+        name = type(node).__name__
+        if name not in self._roots:
+            raise TypeError(f"Can't encode {name!r} with the {self.module.name} schema")
+        index, encoder = self._roots[name]
+        if indexed:
+            indexer = self._prepare_lazy()[f"index_{name}"]
+            return self._encode_indexed(node, index, indexer)
+
+        with self._lock:
+            buffer, strings = self._buffer, self._strings
+            try:
+                buffer.append(index)
+                encoder(node)
+                values = array(_UINT32, buffer)
+                table = list(strings)
+            except OverflowError:
+                raise ValueError(
+                    "Can't encode sequences (or string tables) with more than"
+                    f" {_ESCAPE} items"
+                ) from None
+            finally:
+                buffer.clear()
+                strings.clear()
+
+        try:
+            body = values.tobytes().decode(_UTF32, "surrogatepass")
+            blob = "".join(table)
+        except UnicodeDecodeError:
+            raise ValueError(
+                "Can't encode sequences (or string tables) with more than"
+                f" {_ESCAPE} items"
+            ) from None
+        except TypeError:
+            raise TypeError(
+                "Can't encode the non-string values of identifier/string fields"
+            ) from None
+
+        result = bytearray(self._header(_SEQUENTIAL))
+        _write_varint(result, len(table))
+        for string in table:
+            _write_varint(result, len(string))
+        blob_data = blob.encode("utf-8", "surrogatepass")
+        _write_varint(result, len(blob_data))
+        result += blob_data
+        result += body.encode("utf-8", "surrogatepass")
+        return bytes(result)
+
+    def _encode_indexed(
+        self, node: Any, index: int, indexer: Callable[[Any], int]
+    ) -> bytes:
+        with self._lock:
+            records, strings = self._records, self._strings
+            try:
+                root = indexer(node)
+                table = list(strings)
+                data = bytes(records)
+            finally:
+                records.clear()
+                strings.clear()
+
+        try:
+            blobs = [string.encode("utf-8", "surrogatepass") for string in table]
+        except AttributeError:
+            raise TypeError(
+                "Can't encode the non-string values of identifier/string fields"
+            ) from None
+
+        try:
+            ends = array(_UINT32, accumulate(map(len, blobs)))
+            index_data = _INDEX.pack(len(table), index, root)
+        except (OverflowError, struct.error):
+            raise ValueError(
+                "Can't encode trees larger than 4 GiB with indexed=True"
+            ) from None
+        if sys.byteorder == "big":
+            ends.byteswap()
+
+        result = bytearray(self._header(_INDEXED))
+        result += index_data
+        result += ends
+        result += b"".join(blobs)
+        result += data
+        return bytes(result)
+
+    def decode(self, data: Any) -> Any:
+        """Decode a tree that was encoded with `encode()` from the given
+        `data` (anything that supports the buffer protocol)."""
+
+        data = memoryview(data).cast("B")
+        self._check_header(data, _SEQUENTIAL)
+
+        try:
+            position, values = _read_varints(data, _HEADER_SIZE, 1)
+            (count,) = values
+            position, lengths = _read_varints(data, position, count + 1)
+            size = lengths.pop()
+            text = str(data[position : position + size], "utf-8", "surrogatepass")
+            body = str(data[position + size :], "utf-8", "surrogatepass")
+        except (IndexError, UnicodeDecodeError) as exc:
+            raise ValueError("Truncated or corrupted tree data") from exc
+
+        table = []
+        offset = 0
+        for length in lengths:
+            table.append(text[offset : offset + length])
+            offset += length
+        if offset != len(text):
+            raise ValueError("Corrupted string table")
+
+        values = memoryview(body.encode(_UTF32, "surrogatepass")).cast(_UINT32).tolist()
+        values.reverse()
+        namespace = self._namespace
+        with self._lock:
+            namespace["take"] = take = values.pop
+            namespace["table"] = table
+            try:
+                node = self._root_decoders[take()]()
+            except (IndexError, StopIteration) as exc:
+                raise ValueError("Truncated or corrupted tree data") from exc
+            finally:
+                namespace["take"] = namespace["table"] = None
+
+        if values:
+            raise ValueError("Trailing data after the encoded tree")
+        return node
+
+    def decode_lazy(self, data: Any) -> Any:
+        """Decode a tree that was encoded with `encode(node, indexed=True)`
+        from the given `data` (anything that supports the buffer protocol,
+        e.g. an `mmap`) without copying it, and without reading any of its
+        nodes beforehand.
+
+        The nodes are proxies (subclasses of the classes that `decode()`
+        would create) that read their fields on their first access, and
+        then turn into instances of the classes themselves; their children
+        (and strings) are read the same way, so the cost depends on the
+        part of the tree that is accessed. The nodes keep a reference to
+        the `data`, until all the proxies are loaded or released."""
+
+        data = memoryview(data).cast("B")
+        self._check_header(data, _INDEXED)
+        try:
+            count, index, root = _INDEX.unpack_from(data, _HEADER_SIZE)
+            ends = _HEADER_SIZE + _INDEX.size
+            blob = ends + 4 * count
+            size = _OFFSET.unpack_from(data, blob - 4)[0] if count else 0
+            name = self._lazy_roots[index]
+        except (IndexError, struct.error) as exc:
+            raise ValueError("Truncated or corrupted tree data") from exc
+        if name is None or blob + size + root >= len(data):
+            raise ValueError("Truncated or corrupted tree data")
+        maker = self._prepare_lazy()[name]
+
+        reader = _Reader(data, count, ends, blob)
+        try:
+            return maker(reader, blob + size + root)
+        except (IndexError, KeyError, struct.error) as exc:
+            raise ValueError("Truncated or corrupted tree data") from exc
+
+    def load(self, path: str | os.PathLike[str]) -> Any:
+        """Map the file at the given `path` into memory, and decode the
+        tree in it with `decode_lazy()`. The file stays mapped until all
+        of its nodes are loaded (or released)."""
+
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.decode_lazy(data)
+
+
+def compile(module: Module, classes: Any = None) -> Codec:
+    """Compile an encoder and a decoder for the trees of the given
+    `module`, whose nodes are instances of the `classes` (a namespace
+    with a class for each constructor and product, like the ones that
+    `build_classes()` returns, which is the default). The trees are
+    decoded into the same classes, and the nodes of other classes are
+    encoded as long as they have the same names (e.g. the `ast` module
+    for the Python schema)."""
+
+    if classes is None:
+        classes = build_classes(module)
+    return Codec(module, classes)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import token
+from bisect import bisect_right
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from tokenize import TokenInfo
+
+from pyasdl.grammar import Module, Type
+
+__all__ = ["Comment"]
+
+
+@dataclass
+class Comment:
+    text: str
+    line: int
+    column: int
+    definition: Type | None = field(default=None, repr=False)
+
+
+class CommentCollector:
+    """Split the comments out of a token stream while it is being
+    fed into the parser, and keep track of the lines that each
+    top-level definition spans so that the comments can be attached
+    to the nearest definition once the tree is built."""
+
+    def __init__(self) -> None:
+        self.comments: list[tuple[Comment, bool]] = []
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+
+    def filter(self, tokens: Iterator[TokenInfo]) -> Iterator[TokenInfo]:
+        depth = 0
+        previous_line = current_line = 0
+        previous: TokenInfo | None = None
+        for tok in tokens:
+            if tok.type == token.COMMENT:
+                comment = Comment(
+                    tok.string[2:].rstrip("\r\n"), tok.start[0], tok.start[1]
+                )
+                self.comments.append((comment, depth > 0))
+                continue
+
+            if tok.type == token.OP:
+                if tok.string in "({":
+                    depth += 1
+                elif tok.string in ")}":
+                    depth -= 1
+                    if depth == 0 and self.starts:
+                        self._close(current_line)
+                elif (
+                    tok.string == "="
+                    and depth == 1
+                    and previous is not None
+                    and previous.type == token.NAME
+                ):
+                    # The name before the '=' starts a new definition, and
+                    # the token before that one was the end of the previous.
+                    if self.starts:
+                        self._close(previous_line)
+                    self.starts.append(previous.start[0])
+
+            previous_line, current_line = current_line, tok.end[0]
+            previous = tok
+            yield tok
+
+    def _close(self, line: int) -> None:
+        if len(self.ends) < len(self.starts):
+            self.ends.append(line)
+
+    def attach(self, tree: Module) -> list[Comment]:
+        """Return all the comments, with their `definition`
+        set to the nearest definition in the given `tree`."""
+        starts, ends = self.starts, self.ends
+        ends.extend(starts[len(ends) :])
+
+        comments = []
+        for comment, in_module in self.comments:
+            if in_module and starts:
+                index = self._nearest(comment.line)
+                comment.definition = tree.body[index]
+            comments.append(comment)
+        return comments
+
+    def _nearest(self, line: int) -> int:
+        starts, ends = self.starts, self.ends
+        index = bisect_right(starts, line) - 1
+        if index < 0:
+            return 0
+        elif line <= ends[index] or index + 1 == len(starts):
+            return index
+        elif starts[index + 1] - line <= line - ends[index]:
+            return index + 1
+        else:
+            return index
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from pyasdl.frozen import FrozenNode, freeze
+from pyasdl.grammar import Constructor, Field, Module, Sum, Type
+
+__all__ = [
+    "FieldChange",
+    "FieldsDiff",
+    "ConstructorDiff",
+    "TypeDiff",
+    "SchemaDiff",
+    "diff",
+]
+
+
+@dataclass
+class FieldChange:
+    """A field that exists in both versions (with the same
+    name), but with a different kind or qualifier."""
+
+    name: str
+    old: Field
+    new: Field
+
+    @property
+    def kind_changed(self) -> bool:
+        return self.old.kind != self.new.kind
+
+    @property
+    def qualifier_changed(self) -> bool:
+        return self.old.qualifier != self.new.qualifier
+
+
+@dataclass
+class FieldsDiff:
+    added: list[Field] = field(default_factory=list)
+    removed: list[Field] = field(default_factory=list)
+    changed: list[FieldChange] = field(default_factory=list)
+    # Whether the fields that exist in both versions are in
+    # a different order (which matters for the constructors
+    # that take their fields positionally).
+    reordered: bool = False
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed or self.reordered)
+
+
+@dataclass
+class ConstructorDiff:
+    name: str
+    old: Constructor
+    new: Constructor
+    fields: FieldsDiff
+
+
+@dataclass
+class TypeDiff:
+    """The differences between the two versions of a definition. If it
+    was changed from a sum to a product (or the other way around), only
+    `kind_changed` is set; otherwise the constructors (for sums) or the
+    fields (for products), and the attributes are compared."""
+
+    name: str
+    old: Type
+    new: Type
+    kind_changed: bool = False
+    added_constructors: list[Constructor] = field(default_factory=list)
+    removed_constructors: list[Constructor] = field(default_factory=list)
+    changed_constructors: list[ConstructorDiff] = field(default_factory=list)
+    reordered_constructors: bool = False
+    fields: FieldsDiff = field(default_factory=FieldsDiff)
+    attributes: FieldsDiff = field(default_factory=FieldsDiff)
+
+
+@dataclass
+class SchemaDiff:
+    old: Module
+    new: Module
+    added: list[Type] = field(default_factory=list)
+    removed: list[Type] = field(default_factory=list)
+    changed: list[TypeDiff] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.added or self.removed or self.changed or self.old.name != self.new.name
+        )
+
+    @property
+    def changed_names(self) -> set[str]:
+        """The names of all the definitions that were added,
+        removed or changed."""
+        return {
+            *(definition.name for definition in self.added),
+            *(definition.name for definition in self.removed),
+            *(change.name for change in self.changed),
+        }
+
+
+def _is_reordered(old_names: Sequence[str], new_names: Sequence[str]) -> bool:
+    # Compare the relative order of the names that are in both.
+    new_set = set(new_names)
+    old_set = set(old_names)
+    return [name for name in old_names if name in new_set] != [
+        name for name in new_names if name in old_set
+    ]
+
+
+def _diff_fields(old_fields: list[Field], new_fields: list[Field]) -> FieldsDiff:
+    result = FieldsDiff()
+    if old_fields == new_fields:
+        return result
+
+    old_by_name = {old_field.name: old_field for old_field in old_fields}
+    new_by_name = {new_field.name: new_field for new_field in new_fields}
+    for name, old_field in old_by_name.items():
+        new_field = new_by_name.get(name)
+        if new_field is None:
+            result.removed.append(old_field)
+        elif new_field != old_field:
+            result.changed.append(FieldChange(name, old_field, new_field))
+    for name, new_field in new_by_name.items():
+        if name not in old_by_name:
+            result.added.append(new_field)
+
+    result.reordered = _is_reordered(list(old_by_name), list(new_by_name))
+    return result
+
+
+def _diff_type(old: Type, new: Type) -> TypeDiff:
+    result = TypeDiff(old.name, old, new)
+    old_value, new_value = old.value, new.value
+    if type(old_value) is not type(new_value):
+        result.kind_changed = True
+        return result
+
+    if isinstance(old_value, Sum):
+        old_by_name = {constructor.name: constructor for constructor in old_value.types}
+        new_by_name = {constructor.name: constructor for constructor in new_value.types}
+        for name, old_constructor in old_by_name.items():
+            new_constructor = new_by_name.get(name)
+            if new_constructor is None:
+                result.removed_constructors.append(old_constructor)
+            elif new_constructor is not old_constructor:
+                fields = _diff_fields(old_constructor.fields, new_constructor.fields)
+                if fields:
+                    result.changed_constructors.append(
+                        ConstructorDiff(name, old_constructor, new_constructor, fields)
+                    )
+        for name, new_constructor in new_by_name.items():
+            if name not in old_by_name:
+                result.added_constructors.append(new_constructor)
+        result.reordered_constructors = _is_reordered(
+            list(old_by_name), list(new_by_name)
+        )
+    else:
+        result.fields = _diff_fields(old_value.fields, new_value.fields)
+
+    result.attributes = _diff_fields(old_value.attributes, new_value.attributes)
+    return result
+
+
+def diff(old: Module, new: Module) -> SchemaDiff:
+    """Compare the given two versions of a schema by matching
+    their definitions, constructors and fields by name, and
+    return all the differences in a `pyasdl.SchemaDiff`.
+
+    It runs in time linear to the size of the schemas, and the
+    definitions that are shared between them (e.g. the ones that
+    `reparse()` didn't touch) aren't even compared."""
+
+    if isinstance(old, FrozenNode) != isinstance(new, FrozenNode):
+        # Frozen nodes are never equal to the mutable ones
+        old, new = freeze(old), freeze(new)
+
+    result = SchemaDiff(old, new)
+    old_by_name = {definition.name: definition for definition in old.body}
+    new_by_name = {definition.name: definition for definition in new.body}
+
+    for name, old_definition in old_by_name.items():
+        new_definition = new_by_name.get(name)
+        if new_definition is None:
+            result.removed.append(old_definition)
+        elif new_definition is not old_definition and new_definition != old_definition:
+            result.changed.append(_diff_type(old_definition, new_definition))
+
+    for name, new_definition in new_by_name.items():
+        if name not in old_by_name:
+            result.added.append(new_definition)
+    return result
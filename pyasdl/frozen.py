@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import weakref
+from collections.abc import Iterable
+from dataclasses import FrozenInstanceError
+from typing import Any
+
+from pyasdl import grammar
+
+__all__ = ["FrozenNode", "freeze", "thaw"]
+
+# All the frozen nodes are hash-consed: they are interned in this pool,
+# keyed by their class and their field values (whose children are also
+# interned). So structurally equal nodes are the same object, no matter
+# which tree (or which version of a schema) they came from. Nodes are
+# dropped from the pool once nothing else refers to them.
+_POOL: weakref.WeakValueDictionary[
+    tuple[Any, ...], FrozenNode
+] = weakref.WeakValueDictionary()
+
+
+class FrozenNode:
+    """Base class of the immutable, interned nodes. They can only be
+    created through their constructors (which return the existing node
+    if there is already an equal one) or `freeze()`."""
+
+    __slots__ = ("_hash",)
+
+    _field_names: tuple[str, ...] = ()
+    _hash: int
+
+    @classmethod
+    def _intern(cls, values: tuple[Any, ...]) -> Any:
+        key = (cls, *values)
+        node = _POOL.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            for name, value in zip(cls._field_names, values):
+                object.__setattr__(node, name, value)
+            # The children are interned (and their hashes are cached),
+            # so hashing the key is proportional to the number of them.
+            object.__setattr__(node, "_hash", hash(key))
+            node = _POOL.setdefault(key, node)
+        return node
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        # Everything is done in __new__
+        pass
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        elif type(self) is not type(other):
+            return NotImplemented
+
+        # Only nodes from different pools (e.g. one that was unpickled
+        # in another process, before its pool was cleared) might be
+        # equal without being identical.
+        return self._hash == other._hash and all(  # type: ignore
+            getattr(self, name) == getattr(other, name) for name in self._field_names
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return type(self), tuple(getattr(self, name) for name in self._field_names)
+
+    def __copy__(self) -> FrozenNode:
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> FrozenNode:
+        return self
+
+
+def _freeze_all(nodes: Iterable[Any]) -> tuple[Any, ...]:
+    return tuple(map(freeze, nodes))
+
+
+class Field(FrozenNode, grammar.Field):
+    __slots__ = ()
+    _field_names = ("kind", "name", "qualifier")
+
+    def __new__(
+        cls, kind: str, name: str, qualifier: grammar.FieldQualifier | None = None
+    ) -> Field:
+        return cls._intern((kind, name, qualifier))
+
+
+class Constructor(FrozenNode, grammar.Constructor):
+    __slots__ = ()
+    _field_names = ("name", "fields")
+
+    def __new__(cls, name: str, fields: Iterable[grammar.Field] = ()) -> Constructor:
+        return cls._intern((name, _freeze_all(fields)))
+
+
+class Sum(FrozenNode, grammar.Sum):
+    __slots__ = ()
+    _field_names = ("types", "attributes")
+
+    def __new__(
+        cls,
+        types: Iterable[grammar.Constructor] = (),
+        attributes: Iterable[grammar.Field] = (),
+    ) -> Sum:
+        return cls._intern((_freeze_all(types), _freeze_all(attributes)))
+
+
+class Product(FrozenNode, grammar.Product):
+    __slots__ = ()
+    _field_names = ("fields", "attributes")
+
+    def __new__(
+        cls,
+        fields: Iterable[grammar.Field] = (),
+        attributes: Iterable[grammar.Field] = (),
+    ) -> Product:
+        return cls._intern((_freeze_all(fields), _freeze_all(attributes)))
+
+
+class Type(FrozenNode, grammar.Type):
+    __slots__ = ()
+    _field_names = ("name", "value")
+
+    def __new__(cls, name: str, value: grammar.type) -> Type:
+        return cls._intern((name, freeze(value)))
+
+
+class Module(FrozenNode, grammar.Module):
+    __slots__ = ()
+    _field_names = ("name", "body")
+
+    def __new__(cls, name: str, body: Iterable[grammar.Type] = ()) -> Module:
+        return cls._intern((name, _freeze_all(body)))
+
+
+_FROZEN_CLASSES: dict[type, type[FrozenNode]] = {
+    grammar.Field: Field,
+    grammar.Constructor: Constructor,
+    grammar.Sum: Sum,
+    grammar.Product: Product,
+    grammar.Type: Type,
+    grammar.Module: Module,
+}
+_MUTABLE_CLASSES = {frozen: mutable for mutable, frozen in _FROZEN_CLASSES.items()}
+
+
+def freeze(node: Any) -> Any:
+    """Return the immutable (and interned) version of the
+    given node, with all the lists turned into tuples. Frozen
+    nodes are hashable, and they can be compared in constant
+    time."""
+
+    if isinstance(node, FrozenNode):
+        return node
+
+    frozen_class = _FROZEN_CLASSES[type(node)]
+    return frozen_class(*[getattr(node, name) for name in frozen_class._field_names])
+
+
+def thaw(node: Any) -> Any:
+    """Return a mutable copy of the given frozen node
+    (in the shape of the regular `pyasdl.grammar` nodes)."""
+
+    if not isinstance(node, FrozenNode):
+        return node
+
+    values = []
+    for name in node._field_names:
+        value = getattr(node, name)
+        if isinstance(value, tuple):
+            values.append([thaw(child) for child in value])
+        else:
+            values.append(thaw(value))
+    return _MUTABLE_CLASSES[type(node)](*values)
@@ -35,13 +35,15 @@ class AST:
 
 @_dataclass
 class Module(AST):
-    name: string
+    _fields = ("body",)
+    name: identifier
     body: list[Type] = _field(default_factory=list)
 
 
 @_dataclass
 class Type(AST):
-    name: string
+    _fields = ("value",)
+    name: identifier
     value: type
 
 
@@ -51,26 +53,30 @@ class type(AST):
 
 @_dataclass
 class Sum(type):
+    _fields = ("types", "attributes")
     types: list[Constructor] = _field(default_factory=list)
     attributes: list[Field] = _field(default_factory=list)
 
 
 @_dataclass
 class Product(type):
+    _fields = ("fields", "attributes")
     fields: list[Field] = _field(default_factory=list)
     attributes: list[Field] = _field(default_factory=list)
 
 
 @_dataclass
 class Constructor(AST):
-    name: string
+    _fields = ("fields",)
+    name: identifier
     fields: list[Field] = _field(default_factory=list)
 
 
 @_dataclass
 class Field(AST):
-    kind: string
-    name: string
+    _fields = ()
+    kind: identifier
+    name: identifier
     qualifier: FieldQualifier | None = _field(default=None)
 
 
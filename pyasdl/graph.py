@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+
+from pyasdl.grammar import Field, Module, Sum
+
+__all__ = ["TypeGraph"]
+
+
+def _fields_of(value: object) -> Iterator[Field]:
+    if isinstance(value, Sum):
+        for constructor in value.types:
+            yield from constructor.fields
+    else:
+        yield from value.fields  # type: ignore
+    yield from value.attributes  # type: ignore
+
+
+class TypeGraph:
+    """The dependency graph of the definitions in the given `module`,
+    where each definition depends on the kinds of all of its fields
+    (including the constructor fields and the attributes). Builtin
+    and undefined kinds are not a part of the graph.
+
+    All the algorithms run in O(V + E) time, on integer indices."""
+
+    def __init__(self, module: Module) -> None:
+        self.names = tuple(definition.name for definition in module.body)
+        self._indices = indices = {name: index for index, name in enumerate(self.names)}
+
+        # The edges are stored in flat lists (the edges of the node `i`
+        # are `targets[offsets[i] : offsets[i + 1]]`) rather than a list
+        # per node; large graphs would otherwise create a lot of
+        # containers for the garbage collector to traverse.
+        offsets = [0]
+        targets: list[int] = []
+        last_source = [-1] * len(self.names)
+        for index, definition in enumerate(module.body):
+            for field in _fields_of(definition.value):
+                target = indices.get(field.kind)
+                if target is not None and last_source[target] != index:
+                    last_source[target] = index
+                    targets.append(target)
+            offsets.append(len(targets))
+
+        # The reverse edges, with the same layout (and each node's
+        # sources in the module order).
+        reverse_offsets = [0] * (len(self.names) + 1)
+        for target in targets:
+            reverse_offsets[target + 1] += 1
+        for index in range(len(self.names)):
+            reverse_offsets[index + 1] += reverse_offsets[index]
+        sources = [0] * len(targets)
+        positions = reverse_offsets[:-1]
+        for index in range(len(self.names)):
+            for target in targets[offsets[index] : offsets[index + 1]]:
+                sources[positions[target]] = index
+                positions[target] += 1
+
+        self._offsets = offsets
+        self._targets = targets
+        self._reverse_offsets = reverse_offsets
+        self._sources = sources
+        self._components: list[list[int]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._indices
+
+    def _successors(self, index: int) -> list[int]:
+        return self._targets[self._offsets[index] : self._offsets[index + 1]]
+
+    def successors(self, name: str) -> list[str]:
+        """Return the names of the definitions that the given
+        definition depends on (in the order they are referred)."""
+        names = self.names
+        return [names[index] for index in self._successors(self._indices[name])]
+
+    def predecessors(self, name: str) -> list[str]:
+        """Return the names of the definitions that depend
+        on the given definition."""
+        index = self._indices[name]
+        names = self.names
+        return [
+            names[source]
+            for source in self._sources[
+                self._reverse_offsets[index] : self._reverse_offsets[index + 1]
+            ]
+        ]
+
+    def _tarjan(self) -> list[list[int]]:
+        if self._components is not None:
+            return self._components
+
+        offsets, targets = self._offsets, self._targets
+        size = len(self.names)
+        order = [-1] * size
+        low = [0] * size
+        on_stack = bytearray(size)
+        stack: list[int] = []
+        component_of = [0] * size
+        component_count = 0
+        counter = 0
+
+        # The position of the next edge to follow, for each node on the
+        # work stack (which replaces the recursion, so that deep graphs
+        # don't hit the recursion limit).
+        next_edge = offsets[:-1]
+        work: list[int] = []
+
+        for root in range(size):
+            if order[root] != -1:
+                continue
+
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work.append(root)
+
+            while work:
+                node = work[-1]
+                position = next_edge[node]
+                if position < offsets[node + 1]:
+                    next_edge[node] = position + 1
+                    child = targets[position]
+                    if order[child] == -1:
+                        order[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack[child] = True
+                        work.append(child)
+                    elif on_stack[child] and order[child] < low[node]:
+                        low[node] = order[child]
+                    continue
+
+                work.pop()
+                if work and low[node] < low[work[-1]]:
+                    low[work[-1]] = low[node]
+
+                if low[node] == order[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component_of[member] = component_count
+                        if member == node:
+                            break
+                    component_count += 1
+
+        # Collect the members of each component in the module order
+        # (without sorting them, to keep everything linear).
+        components: list[list[int]] = [[] for _ in range(component_count)]
+        for index, component in enumerate(component_of):
+            components[component].append(index)
+
+        self._components = components
+        return components
+
+    def strongly_connected_components(self) -> list[list[str]]:
+        """Return the strongly connected components of the graph (with
+        their members in the module order). Every component comes after
+        all the components it depends on."""
+        names = self.names
+        return [[names[index] for index in component] for component in self._tarjan()]
+
+    def topological_order(self) -> list[str]:
+        """Return the names of all the definitions so that each one comes
+        after its dependencies. The definitions in a cycle are kept
+        together, in the module order (and they should be declared
+        ahead with `recursive_types()`)."""
+        names = self.names
+        return [names[index] for component in self._tarjan() for index in component]
+
+    def recursive_types(self) -> set[str]:
+        """Return the names of all the definitions that depend on
+        themselves (directly or through other definitions)."""
+        names = self.names
+        recursive: set[str] = set()
+        for component in self._tarjan():
+            if len(component) > 1 or component[0] in self._successors(component[0]):
+                recursive.update(names[index] for index in component)
+        return recursive
+
+    def reachable(self, roots: str | Iterable[str]) -> list[str]:
+        """Return the names of all the definitions that are reachable
+        from the given root(s), including themselves (in the module
+        order). Everything else is unused by the roots, and can be
+        pruned."""
+        if isinstance(roots, str):
+            roots = [roots]
+
+        offsets, targets = self._offsets, self._targets
+        seen = bytearray(len(self.names))
+        pending = []
+        for root in roots:
+            index = self._indices[root]
+            if not seen[index]:
+                seen[index] = True
+                pending.append(index)
+
+        while pending:
+            node = pending.pop()
+            for child in targets[offsets[node] : offsets[node + 1]]:
+                if not seen[child]:
+                    seen[child] = True
+                    pending.append(child)
+
+        names = self.names
+        return [name for name, flag in zip(names, seen) if flag]
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import re
+import token
+
+from pyasdl.asdl import _get_parser, parse
+from pyasdl.grammar import Module
+from pyasdl.lexer import tokenize
+
+__all__ = ["reparse"]
+
+# Outside of comments, the '=' sign only appears right after the
+# name of a top-level definition; so the definitions around an edit
+# can be found (and counted) without tokenizing the whole source.
+_COMMENTED_EQUALS = re.compile(r"--[^\n=]*=[^\n]*")
+
+_BLOCK_SIZE = 4096
+
+_TRAILING_TOKENS = frozenset([token.NEWLINE, token.ENDMARKER])
+
+
+def _common_prefix(old: str, new: str, limit: int) -> int:
+    # Compare block by block, and then binary search
+    # for the first difference in the mismatching block.
+    start = 0
+    while start < limit:
+        end = min(start + _BLOCK_SIZE, limit)
+        if old[start:end] != new[start:end]:
+            break
+        start = end
+    else:
+        return limit
+
+    low, high = start, min(start + _BLOCK_SIZE, limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[start:middle] == new[start:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(old: str, new: str, limit: int) -> int:
+    old_end, new_end = len(old), len(new)
+    length = 0
+    while length < limit:
+        step = min(_BLOCK_SIZE, limit - length)
+        if (
+            old[old_end - length - step : old_end - length]
+            != new[new_end - length - step : new_end - length]
+        ):
+            break
+        length += step
+    else:
+        return limit
+
+    low, high = length, min(length + _BLOCK_SIZE, limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if (
+            old[old_end - middle : old_end - length]
+            == new[new_end - middle : new_end - length]
+        ):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _is_commented(source: str, position: int) -> bool:
+    line_start = source.rfind("\n", 0, position) + 1
+    return source.find("--", line_start, position) != -1
+
+
+def _count_definitions(source: str, end: int) -> int:
+    count = source.count("=", 0, end)
+    for match in _COMMENTED_EQUALS.finditer(source, 0, end):
+        count -= match[0].count("=")
+    return count
+
+
+def _name_start(source: str, equals: int) -> int | None:
+    position = equals
+    while position > 0 and source[position - 1].isspace():
+        position -= 1
+    while position > 0 and (
+        source[position - 1].isalnum() or source[position - 1] == "_"
+    ):
+        position -= 1
+
+    if _is_commented(source, position):
+        return None
+    return position
+
+
+def _definition_before(source: str, position: int) -> int | None:
+    # The start of the last definition whose '=' is before the position.
+    while (equals := source.rfind("=", 0, position)) != -1:
+        if not _is_commented(source, equals):
+            return _name_start(source, equals)
+        position = equals
+    return None
+
+
+def _definition_after(source: str, position: int) -> int | None:
+    # The start of the first definition that starts after the position.
+    search = position
+    while (equals := source.find("=", search)) != -1:
+        if not _is_commented(source, equals):
+            start = _name_start(source, equals)
+            if start is None or start > position:
+                return start
+        search = equals + 1
+    return None
+
+
+def reparse(
+    old_module: Module,
+    old_source: str,
+    new_source: str,
+    *,
+    filename: str = "<pyasdl>",
+    engine: str = "pegen",
+) -> Module:
+    """Parse the `new_source`, which is an edited version of
+    the `old_source` that `old_module` was parsed from.
+
+    Only the definitions that are touched by the edit are parsed
+    again, and all the other `Type` nodes are shared with the
+    `old_module` (so the changes can be found by comparing the
+    definitions by identity)."""
+
+    if _count_definitions(old_source, len(old_source)) != len(old_module.body):
+        return parse(new_source, filename=filename, engine=engine)
+
+    limit = min(len(old_source), len(new_source))
+    prefix = _common_prefix(old_source, new_source, limit)
+    if prefix == limit == len(new_source) == len(old_source):
+        return old_module
+
+    suffix = _common_suffix(old_source, new_source, limit - prefix)
+    old_end = len(old_source) - suffix
+
+    # Parse the definitions around the edit again (including the one
+    # right before it; the edit might be continuing its last line).
+    region_start = _definition_before(old_source, prefix)
+    if region_start is None:
+        # The edit starts in the module header or the first definition.
+        return parse(new_source, filename=filename, engine=engine)
+
+    first = _count_definitions(old_source, region_start)
+    region_end = _definition_after(old_source, old_end)
+    if region_end is not None:
+        last = _count_definitions(old_source, region_end)
+        offset = len(new_source) - len(old_source)
+        region = new_source[region_start : region_end + offset] + "}"
+    else:
+        last = len(old_module.body)
+        region = new_source[region_start:]
+
+    # Both parsers stop at the first '}' (it can only close the module),
+    # so if the edit added one in the middle of the region, the rest of
+    # the region (and all the definitions after it) would be dropped by
+    # a full parse. Leave these edits to the full parse too.
+    tokens = list(tokenize(f"module {old_module.name} {{" + region))
+    for index, tok in enumerate(tokens):
+        if tok.string == "}" and tok.type == token.OP:
+            if any(rest.type not in _TRAILING_TOKENS for rest in tokens[index + 1 :]):
+                return parse(new_source, filename=filename, engine=engine)
+            break
+
+    # The region is parsed directly, without going through the parse
+    # cache (it is only a fragment, which is unlikely to be seen again).
+    parser = _get_parser(engine)
+    try:
+        region_module = parser(iter(tokens), filename)
+    except SyntaxError:
+        # Let the full parse decide whether the edit is actually invalid
+        # (and report the error with the correct location).
+        return parse(new_source, filename=filename, engine=engine)
+
+    return Module(
+        old_module.name,
+        old_module.body[:first] + region_module.body + old_module.body[last:],
+    )
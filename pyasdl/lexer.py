@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import re
+import token
+from collections.abc import Iterable, Iterator
+from tokenize import TokenInfo
+
+__all__ = ["tokenize", "tokenize_lines"]
+
+# ASDL only consists of names, a handful of punctuation and
+# the `--` comments; so instead of running the full Python
+# tokenizer we split the source into lines and scan each one
+# with a single master pattern. The leading lookahead lets the
+# search skip the whitespace without trying every alternative,
+# so each match is a token and its span is the column range
+# within the line. The token type comes from the index of the
+# group that matched.
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?=[^ \t\f\r\n])
+    (?:
+        ([^\W\d]\w*)            # 1: name
+      | ([{}()=|,?*])           # 2: punctuation
+      | (--[^\n]*\n?)           # 3: comment (with its line break)
+      | (.)                     # 4: anything else
+    )
+    """,
+    re.VERBOSE,
+)
+_TOKEN_TYPES = (None, token.NAME, token.OP, token.COMMENT, token.ERRORTOKEN)
+_LINE_PATTERN = re.compile(r"[^\n]*\n|[^\n]+")
+
+# Skip the Python level TokenInfo.__new__ on the hot path
+_new_token = tuple.__new__
+
+
+def tokenize(source: str, *, ignore_comments: bool = True) -> Iterator[TokenInfo]:
+    """Return an iterator of the tokens in the given
+    ASDL `source` string."""
+    return tokenize_lines((source,), ignore_comments=ignore_comments)
+
+
+def tokenize_lines(
+    lines: Iterable[str], *, ignore_comments: bool = True
+) -> Iterator[TokenInfo]:
+    """Return an iterator of the tokens in the given iterable
+    of ASDL source `lines` (e.g. a text file). Each item might
+    consist of multiple lines, but it should end with a line
+    break (unless it is the last one)."""
+
+    lineno = 1
+    line = ""
+
+    depth = 0
+    pending_newline = False
+
+    scan = _TOKEN_PATTERN.finditer
+    for chunk in lines:
+        line = ""
+        for line in _LINE_PATTERN.findall(chunk):
+            tokens = [
+                _new_token(
+                    TokenInfo,
+                    (
+                        _TOKEN_TYPES[match.lastindex],  # type: ignore
+                        match[0],
+                        (lineno, match.start()),
+                        (lineno, match.end()),
+                        line,
+                    ),
+                )
+                for match in scan(line)
+            ]
+
+            # A comment is always the last token, and takes the
+            # line break with it.
+            comment = None
+            if tokens and tokens[-1][0] == token.COMMENT:
+                comment = tokens.pop()
+
+            if tokens:
+                # Only the last name/operator decides whether the line
+                # ends a statement, so the bracket depth is only needed
+                # at the end of the line.
+                code = line if comment is None else line[: comment[2][1]]
+                depth += (
+                    code.count("(")
+                    + code.count("{")
+                    - code.count(")")
+                    - code.count("}")
+                )
+                if any(tok[0] != token.ERRORTOKEN for tok in tokens):
+                    pending_newline = depth == 0
+                yield from tokens
+
+            if comment is not None:
+                if not ignore_comments:
+                    yield comment
+            elif pending_newline and line[-1] == "\n":
+                column = len(line) - 1
+                yield _new_token(
+                    TokenInfo,
+                    (
+                        token.NEWLINE,
+                        "\n",
+                        (lineno, column),
+                        (lineno, column + 1),
+                        line,
+                    ),
+                )
+                pending_newline = False
+
+            if line[-1] == "\n":
+                lineno += 1
+                line = ""
+
+    column = len(line)
+    if pending_newline:
+        yield TokenInfo(token.NEWLINE, "", (lineno, column), (lineno, column + 1), "")
+    if column:
+        lineno, column = lineno + 1, 0
+    yield TokenInfo(token.ENDMARKER, "", (lineno, column), (lineno, column), "")
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import token
+from collections.abc import Iterator
+from tokenize import TokenInfo
+
+from pyasdl.grammar import (
+    Constructor,
+    Field,
+    FieldQualifier,
+    Module,
+    Product,
+    Sum,
+    Type,
+)
+
+__all__ = ["LL1Parser"]
+
+_QUALIFIERS = {
+    "?": FieldQualifier.OPTIONAL,
+    "*": FieldQualifier.SEQUENCE,
+}
+
+
+def make_syntax_error(message: str, filename: str, tok: TokenInfo) -> SyntaxError:
+    return SyntaxError(message, (filename, tok.start[0], 1 + tok.start[1], tok.line))
+
+
+class LL1Parser:
+    """A predictive parser for the grammar in `static/asdl.gram`.
+
+    Every alternative is chosen by looking at the next token (the
+    `attributes` soft keyword is the only place that also looks at
+    the token after it), so unlike the pegen generated parser there
+    is no backtracking and nothing to memoize."""
+
+    def __init__(
+        self, tokens: Iterator[TokenInfo], *, filename: str = "<pyasdl>"
+    ) -> None:
+        self._tokens = tokens
+        self._filename = filename
+        self._token = next(tokens)
+        self._lookahead: TokenInfo | None = None
+
+    def _advance(self) -> TokenInfo:
+        current = self._token
+        if self._lookahead is not None:
+            self._token, self._lookahead = self._lookahead, None
+        else:
+            self._token = next(self._tokens)
+        return current
+
+    def _peek(self) -> TokenInfo:
+        if self._lookahead is None:
+            self._lookahead = next(self._tokens)
+        return self._lookahead
+
+    def _expect(self, string: str) -> TokenInfo:
+        if self._token.string != string:
+            raise self.make_syntax_error()
+        return self._advance()
+
+    def _name(self) -> str:
+        if self._token.type != token.NAME:
+            raise self.make_syntax_error()
+        return self._advance().string
+
+    def make_syntax_error(self, message: str = "invalid syntax") -> SyntaxError:
+        return make_syntax_error(message, self._filename, self._token)
+
+    def start(self) -> Module:
+        # start: "module" NAME NEWLINE? "{" definitions "}"
+        name = self.header()
+        return Module(name, list(self.definitions()))
+
+    def header(self) -> str:
+        # "module" NAME NEWLINE? "{"
+        self._expect("module")
+        name = self._name()
+        if self._token.type == token.NEWLINE:
+            self._advance()
+        self._expect("{")
+        return name
+
+    def definitions(self) -> Iterator[Type]:
+        # definitions: definition+
+        # (followed by the "}" that closes the module)
+        yield self.definition()
+        while self._token.type == token.NAME:
+            yield self.definition()
+        self._expect("}")
+
+    def definition(self) -> Type:
+        # definition: NAME "=" define
+        name = self._name()
+        self._expect("=")
+        return Type(name, self.define())  # type: ignore
+
+    def define(self) -> Product | Sum:
+        # define: sum_body attributes? | fields attributes?
+        if self._token.string == "(":
+            return Product(self.fields(allow_empty=False), self.attributes())
+        else:
+            return Sum(self.sum_body(), self.attributes())
+
+    def sum_body(self) -> list[Constructor]:
+        # sum_body: constructor ("|" constructor)*
+        constructors = [self.constructor()]
+        while self._token.string == "|":
+            self._advance()
+            constructors.append(self.constructor())
+        return constructors
+
+    def constructor(self) -> Constructor:
+        # constructor: NAME fields?
+        name = self._name()
+        if self._token.string == "(":
+            return Constructor(name, self.fields(allow_empty=True))
+        else:
+            return Constructor(name, [])
+
+    def fields(self, *, allow_empty: bool) -> list[Field]:
+        # fields: "(" fields_body? ")"
+        # (only constructors can have an empty field list)
+        self._expect("(")
+        if self._token.string == ")" and allow_empty:
+            self._advance()
+            return []
+
+        fields = [self.field()]
+        while self._token.string == ",":
+            self._advance()
+            fields.append(self.field())
+        self._expect(")")
+        return fields
+
+    def field(self) -> Field:
+        # field: NAME field_qualifier? NAME
+        kind = self._name()
+        qualifier = _QUALIFIERS.get(self._token.string)
+        if qualifier is not None:
+            self._advance()
+        return Field(kind, self._name(), qualifier)
+
+    def attributes(self) -> list[Field]:
+        # attributes: "attributes" fields
+        if self._token.string != "attributes" or self._peek().string != "(":
+            return []
+
+        self._advance()
+        return self.fields(allow_empty=False)
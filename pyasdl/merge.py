@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from collections.abc import Hashable, Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from pyasdl.grammar import Field, FieldQualifier, Module, Sum
+
+__all__ = [
+    "MergedField",
+    "MergedConstructor",
+    "MergedType",
+    "MergedSchema",
+    "merge_versions",
+]
+
+
+@dataclass
+class MergedField:
+    """A field (identified by its name, kind and qualifier, so a field
+    whose kind changed between two versions is merged as two different
+    fields) and the versions it appears in."""
+
+    kind: str
+    name: str
+    qualifier: FieldQualifier | None = None
+    versions: int = 0
+
+
+@dataclass
+class MergedConstructor:
+    """A constructor and the versions it appears in. Constructors are
+    merged by their names, even if they moved to a different sum; the
+    `parents` map the name of each sum that the constructor belonged to
+    (its base class) to the versions it was in that sum."""
+
+    name: str
+    versions: int = 0
+    fields: list[MergedField] = field(default_factory=list)
+    parents: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class MergedType:
+    """A definition and the versions it appears in. In the versions set
+    in `sum_versions` it is a sum (whose constructors, by name, are in
+    `constructors`), and in the rest it is a product (with the given
+    `fields`)."""
+
+    name: str
+    versions: int = 0
+    sum_versions: int = 0
+    constructors: dict[str, int] = field(default_factory=dict)
+    fields: list[MergedField] = field(default_factory=list)
+    attributes: list[MergedField] = field(default_factory=list)
+
+    @property
+    def product_versions(self) -> int:
+        return self.versions & ~self.sum_versions
+
+
+@dataclass
+class MergedSchema:
+    """All the definitions, constructors and fields of multiple versions
+    of a schema, each with the set of versions it appears in; which is
+    a bitset over `versions` (the bit `1 << i` stands for `versions[i]`).
+
+    Everything is kept in the order it is first seen, going through the
+    versions in the given order."""
+
+    versions: tuple[Any, ...]
+    types: dict[str, MergedType] = field(default_factory=dict)
+    constructors: dict[str, MergedConstructor] = field(default_factory=dict)
+
+    @property
+    def all_versions(self) -> int:
+        """The bitset that contains all the versions."""
+        return (1 << len(self.versions)) - 1
+
+    def bitset(self, versions: Iterable[Any]) -> int:
+        """Return the bitset of the given versions."""
+        indices = {version: index for index, version in enumerate(self.versions)}
+        bits = 0
+        for version in versions:
+            bits |= 1 << indices[version]
+        return bits
+
+    def iter_versions(self, bits: int) -> Iterator[Any]:
+        """Iterate over the versions in the given bitset (in order)."""
+        while bits:
+            lowest = bits & -bits
+            yield self.versions[lowest.bit_length() - 1]
+            bits ^= lowest
+
+    def versions_of(self, bits: int) -> list[Any]:
+        """Return the versions in the given bitset (in order)."""
+        return list(self.iter_versions(bits))
+
+
+def _merge_fields(
+    index: dict[tuple[Any, ...], MergedField],
+    owner: tuple[str, str],
+    target: list[MergedField],
+    sources: Iterable[Field],
+    bit: int,
+) -> None:
+    for source in sources:
+        key = (*owner, source.name, source.kind, source.qualifier)
+        merged_field = index.get(key)
+        if merged_field is None:
+            merged_field = index[key] = MergedField(
+                source.kind, source.name, source.qualifier
+            )
+            target.append(merged_field)
+        merged_field.versions |= bit
+
+
+def merge_versions(versions: Iterable[tuple[Hashable, Module]]) -> MergedSchema:
+    """Merge the given `(version, module)` pairs into a single
+    `pyasdl.MergedSchema`, where each definition, constructor, field
+    and the parent of each constructor records the versions that it
+    appears in. Everything is matched through hash lookups, so it runs
+    in time linear to the total size of the modules."""
+
+    versions = list(versions)
+    labels = tuple(version for version, _ in versions)
+    if len(set(labels)) != len(labels):
+        raise ValueError("Duplicate versions")
+
+    merged = MergedSchema(labels)
+    types = merged.types
+    constructors = merged.constructors
+
+    # All the merged fields, keyed by their owner and their identity
+    # (so there is no need to keep an index in each owner).
+    fields: dict[tuple[Any, ...], MergedField] = {}
+
+    for index, (_, module) in enumerate(versions):
+        bit = 1 << index
+        for definition in module.body:
+            name = definition.name
+            merged_type = types.get(name)
+            if merged_type is None:
+                merged_type = types[name] = MergedType(name)
+            merged_type.versions |= bit
+
+            value = definition.value
+            if isinstance(value, Sum):
+                merged_type.sum_versions |= bit
+                for constructor in value.types:
+                    merged_type.constructors[constructor.name] = (
+                        merged_type.constructors.get(constructor.name, 0) | bit
+                    )
+                    merged_constructor = constructors.get(constructor.name)
+                    if merged_constructor is None:
+                        merged_constructor = constructors[
+                            constructor.name
+                        ] = MergedConstructor(constructor.name)
+                    merged_constructor.versions |= bit
+                    merged_constructor.parents[name] = (
+                        merged_constructor.parents.get(name, 0) | bit
+                    )
+                    _merge_fields(
+                        fields,
+                        ("constructor", constructor.name),
+                        merged_constructor.fields,
+                        constructor.fields,
+                        bit,
+                    )
+            else:
+                _merge_fields(
+                    fields, ("fields", name), merged_type.fields, value.fields, bit
+                )
+            _merge_fields(
+                fields,
+                ("attributes", name),
+                merged_type.attributes,
+                value.attributes,
+                bit,
+            )
+
+    return merged
@@ -42,13 +42,10 @@ class GeneratedParser(Parser):
 
     @memoize
     def definitions(self) -> TypeList | None:
-        # definitions: definition definitions | definition
+        # definitions: definition+
         mark = self._mark()
-        if (definition := self.definition()) and (definitions := self.definitions()):
-            return [definition] + definitions
-        self._reset(mark)
-        if definition := self.definition():
-            return [definition]
+        if types := self._loop1_1():
+            return types
         self._reset(mark)
         return None
 
@@ -86,7 +83,7 @@ class GeneratedParser(Parser):
         ):
             return [constructor]
         self._reset(mark)
-        if constructors := self._gather_1():
+        if constructors := self._gather_2():
             return constructors
         self._reset(mark)
         return None
@@ -120,7 +117,7 @@ class GeneratedParser(Parser):
         if (field := self.field()) and self.negative_lookahead(self.expect, ","):
             return [field]
         self._reset(mark)
-        if fields := self._gather_3():
+        if fields := self._gather_4():
             return fields
         self._reset(mark)
         return None
@@ -160,8 +157,19 @@ class GeneratedParser(Parser):
         return None
 
     @memoize
-    def _loop0_2(self) -> Any | None:
-        # _loop0_2: "|" constructor
+    def _loop1_1(self) -> Any | None:
+        # _loop1_1: definition
+        mark = self._mark()
+        children = []
+        while definition := self.definition():
+            children.append(definition)
+            mark = self._mark()
+        self._reset(mark)
+        return children
+
+    @memoize
+    def _loop0_3(self) -> Any | None:
+        # _loop0_3: "|" constructor
         mark = self._mark()
         children = []
         while (literal := self.expect("|")) and (elem := self.constructor()):
@@ -171,19 +179,19 @@ class GeneratedParser(Parser):
         return children
 
     @memoize
-    def _gather_1(self) -> Any | None:
-        # _gather_1: constructor _loop0_2
+    def _gather_2(self) -> Any | None:
+        # _gather_2: constructor _loop0_3
         mark = self._mark()
         if (elem := self.constructor()) is not None and (
-            seq := self._loop0_2()
+            seq := self._loop0_3()
         ) is not None:
             return [elem] + seq
         self._reset(mark)
         return None
 
     @memoize
-    def _loop0_4(self) -> Any | None:
-        # _loop0_4: "," field
+    def _loop0_5(self) -> Any | None:
+        # _loop0_5: "," field
         mark = self._mark()
         children = []
         while (literal := self.expect(",")) and (elem := self.field()):
@@ -193,10 +201,10 @@ class GeneratedParser(Parser):
         return children
 
     @memoize
-    def _gather_3(self) -> Any | None:
-        # _gather_3: field _loop0_4
+    def _gather_4(self) -> Any | None:
+        # _gather_4: field _loop0_5
         mark = self._mark()
-        if (elem := self.field()) is not None and (seq := self._loop0_4()) is not None:
+        if (elem := self.field()) is not None and (seq := self._loop0_5()) is not None:
             return [elem] + seq
         self._reset(mark)
         return None
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from pyasdl.visitors import ASDLVisitor
+
+__all__ = ["MethodStats", "VisitorProfile", "profile_visitor"]
+
+
+@dataclass
+class MethodStats:
+    """The statistics of a single visit method (or `generic_visit`).
+    All the times are in nanoseconds; the inclusive time contains the
+    time spent in the other methods called from this one (counted once
+    for recursive calls), while the exclusive time doesn't."""
+
+    name: str
+    calls: int = 0
+    inclusive_time: int = 0
+    exclusive_time: int = 0
+    # The number of nodes of each class that were dispatched to it
+    nodes: Counter[str] = field(default_factory=Counter)
+
+
+@dataclass
+class VisitorProfile:
+    visitor: ASDLVisitor
+    methods: dict[str, MethodStats] = field(default_factory=dict)
+    # The exclusive time spent in each stack of methods
+    stacks: Counter[tuple[str, ...]] = field(default_factory=Counter)
+
+    def report(self) -> list[MethodStats]:
+        """Return the statistics of all the methods that were called,
+        sorted by their exclusive time (the most expensive first)."""
+        return sorted(
+            self.methods.values(), key=lambda stats: stats.exclusive_time, reverse=True
+        )
+
+    def collapsed_stacks(self) -> str:
+        """Return the exclusive times of all the call stacks in the
+        collapsed (folded) format that the flame graph tools use; one
+        `root;caller;callee <nanoseconds>` line for each stack."""
+        root = type(self.visitor).__name__
+        return "".join(
+            f"{';'.join((root, *stack))} {elapsed}\n"
+            for stack, elapsed in self.stacks.items()
+        )
+
+
+class _ProfilingTable(dict):  # type: ignore
+    # A dispatch table that resolves the visitor functions through the
+    # table it replaces (the one of the visitor's class, or the one of
+    # an enclosing profile_visitor() block for the same visitor), and
+    # wraps them to record their statistics.
+
+    def __init__(
+        self,
+        profile: VisitorProfile,
+        parent: dict[type, Callable[..., Any]] | None = None,
+    ) -> None:
+        super().__init__()
+        self.profile = profile
+        self.parent = parent
+        self.stack: list[str] = []
+        self.child_times: list[int] = []
+        self.active: Counter[str] = Counter()
+
+    def __missing__(self, node_type: type) -> Callable[..., Any]:
+        visitor = self.profile.visitor
+        table = type(visitor)._dispatch_table if self.parent is None else self.parent
+        try:
+            function = table[node_type]
+        except KeyError:
+            function = type(visitor)._resolve_visitor(node_type)
+
+        name = f"visit_{node_type.__name__}"
+        if not hasattr(visitor, name):
+            name = "generic_visit"
+
+        self[node_type] = profiled = self._wrap(function, name)
+        return profiled
+
+    def _wrap(self, function: Callable[..., Any], name: str) -> Callable[..., Any]:
+        methods = self.profile.methods
+        if name not in methods:
+            methods[name] = MethodStats(name)
+        stats = methods[name]
+        stacks = self.profile.stacks
+        stack, child_times, active = self.stack, self.child_times, self.active
+        clock = time.perf_counter_ns
+
+        def profiled(visitor: ASDLVisitor, node: Any, *args: Any, **kwargs: Any) -> Any:
+            stats.calls += 1
+            stats.nodes[type(node).__name__] += 1
+            stack.append(name)
+            child_times.append(0)
+            active[name] += 1
+            start = clock()
+            try:
+                return function(visitor, node, *args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                exclusive = elapsed - child_times.pop()
+                active[name] -= 1
+                if not active[name]:
+                    stats.inclusive_time += elapsed
+                stats.exclusive_time += exclusive
+                stacks[tuple(stack)] += exclusive
+                stack.pop()
+                if child_times:
+                    child_times[-1] += elapsed
+
+        return profiled
+
+
+@contextmanager
+def profile_visitor(visitor: ASDLVisitor) -> Iterator[VisitorProfile]:
+    """Record the calls to the visit methods (including the `generic_visit`
+    fallbacks) of the given visitor in the block, and return them in a
+    `pyasdl.VisitorProfile`.
+
+    The profiled methods are only installed on the given instance while
+    the block runs, so visitors that aren't profiled pay nothing for it.
+    Iterative visitors recurse through `generic_visit` while profiled,
+    since each fallback is recorded as a separate call."""
+
+    profile = VisitorProfile(visitor)
+    table = _ProfilingTable(profile, vars(visitor).get("_dispatch_table"))
+    visitor._dispatch_table = table  # type: ignore
+    try:
+        yield profile
+    finally:
+        # The parent might have been added in the block, when
+        # visit_* functions were set on the instance
+        if table.parent is None:
+            del visitor._dispatch_table  # type: ignore
+        else:
+            visitor._dispatch_table = table.parent  # type: ignore
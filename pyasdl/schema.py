@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Union
+
+from pyasdl.grammar import Constructor, Field, Module, Sum, Type
+
+__all__ = ["BUILTIN_TYPES", "Reference", "Schema", "is_simple_sum"]
+
+BUILTIN_TYPES = frozenset(["identifier", "string", "int", "constant"])
+
+TypeLike = Union[str, Type]
+
+
+def is_simple_sum(node: Sum) -> bool:
+    """Check whether if the given `node`'s
+    all children lack any fields."""
+    return (
+        all(len(constructor.fields) == 0 for constructor in node.types)
+        and len(node.attributes) == 0
+    )
+
+
+@dataclass(frozen=True)
+class Reference:
+    """A field that refers to a type (through its `kind`), together with
+    the definition (and the constructor, for sums) that it belongs to."""
+
+    definition: Type
+    constructor: Constructor | None
+    field: Field
+
+
+class Schema(Mapping[str, Type]):
+    """A read-only index over the definitions of the given `module`,
+    which maps each name to its `Type` and answers the common queries
+    (the parent of a constructor, the references to a type, etc.) in
+    constant time. All the indexes are built once, so the module
+    shouldn't be mutated afterwards."""
+
+    def __init__(self, module: Module) -> None:
+        self.module = module
+
+        types: dict[str, Type] = {}
+        constructors: dict[str, Constructor] = {}
+        parents: dict[str, Type] = {}
+        references: dict[str, list[Reference]] = {}
+        simple_sums = set()
+
+        for definition in module.body:
+            if definition.name in types:
+                raise ValueError(f"Duplicate definition: {definition.name!r}")
+            types[definition.name] = definition
+
+            value = definition.value
+            if isinstance(value, Sum):
+                if is_simple_sum(value):
+                    simple_sums.add(definition.name)
+                for constructor in value.types:
+                    if constructor.name in constructors:
+                        raise ValueError(f"Duplicate constructor: {constructor.name!r}")
+                    constructors[constructor.name] = constructor
+                    parents[constructor.name] = definition
+                    for field in constructor.fields:
+                        references.setdefault(field.kind, []).append(
+                            Reference(definition, constructor, field)
+                        )
+            else:
+                for field in value.fields:
+                    references.setdefault(field.kind, []).append(
+                        Reference(definition, None, field)
+                    )
+
+            for field in value.attributes:
+                references.setdefault(field.kind, []).append(
+                    Reference(definition, None, field)
+                )
+
+        self._types = types
+        self._constructors = constructors
+        self._parents = parents
+        self._references = {kind: tuple(items) for kind, items in references.items()}
+        self._simple_sums = frozenset(simple_sums)
+        self._undefined = frozenset(
+            kind
+            for kind in self._references
+            if kind not in types and kind not in BUILTIN_TYPES
+        )
+
+    def __getitem__(self, name: str) -> Type:
+        return self._types[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._types)
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._types
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.module.name!r}, {len(self)} types)"
+
+    @property
+    def types(self) -> Mapping[str, Type]:
+        """All the definitions, by their names."""
+        return MappingProxyType(self._types)
+
+    @property
+    def constructors(self) -> Mapping[str, Constructor]:
+        """All the constructors (of all the sums), by their names."""
+        return MappingProxyType(self._constructors)
+
+    @property
+    def simple_sums(self) -> frozenset[str]:
+        """The names of all the simple sums (enums)."""
+        return self._simple_sums
+
+    @property
+    def undefined(self) -> frozenset[str]:
+        """The kinds that are referred to by some field, but are
+        neither defined in the module nor builtin types."""
+        return self._undefined
+
+    def resolve(self, kind: str | Field) -> Type | None:
+        """Return the definition that the given `kind` (or the kind of
+        the given field) refers to, or None if it is a builtin type."""
+        if isinstance(kind, Field):
+            kind = kind.kind
+        if kind in BUILTIN_TYPES:
+            return None
+        return self._types[kind]
+
+    def parent(self, constructor: str | Constructor) -> Type:
+        """Return the definition of the sum that the
+        given constructor (or constructor name) is in."""
+        if isinstance(constructor, Constructor):
+            constructor = constructor.name
+        return self._parents[constructor]
+
+    def references(self, kind: TypeLike) -> tuple[Reference, ...]:
+        """Return all the fields that refer to the given type (or
+        type name), in the order they appear in the module."""
+        if isinstance(kind, Type):
+            kind = kind.name
+        return self._references.get(kind, ())
+
+    def is_builtin(self, kind: str) -> bool:
+        return kind in BUILTIN_TYPES
+
+    def is_simple_sum(self, name: TypeLike) -> bool:
+        if isinstance(name, Type):
+            name = name.name
+        return name in self._simple_sums
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Any
+
+from pyasdl.grammar import (
+    Constructor,
+    Field,
+    FieldQualifier,
+    Module,
+    Product,
+    Sum,
+    Type,
+)
+
+__all__ = ["dump_schema", "load_schema"]
+
+# The format consists of:
+#
+#   header:       b"ASDL" + format version (1 byte)
+#   string table: count, the length of each string (in code points),
+#                 and then the size (in bytes) and the contents of
+#                 all the strings concatenated (in UTF-8)
+#   module:       name, definition count, definitions
+#   definition:   name, kind (0 for products and 1 for sums), then
+#                 either the fields (products) or the constructor
+#                 count and the constructors (sums), and finally
+#                 the attributes
+#   constructor:  name, fields
+#   fields:       count, and each field as its kind and name; the
+#                 qualifier is stored in the lowest 2 bits of the kind
+#
+# where all the integers (counts, lengths and string indices) are
+# unsigned LEB128 varints. The strings are decoded all at once, and
+# then only sliced while the tree is built.
+
+
+_MAGIC = b"ASDL"
+_VERSION = 1
+
+_QUALIFIERS = [None, FieldQualifier.SEQUENCE, FieldQualifier.OPTIONAL]
+_QUALIFIER_CODES = {qualifier: code for code, qualifier in enumerate(_QUALIFIERS)}
+
+_PRODUCT, _SUM = 0, 1
+
+_MULTI_BYTE_VARINT = re.compile(rb"[\x80-\xff]+[\x00-\x7f]")
+_SINGLE_BYTES = bytes(range(0x80))
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+class _Writer:
+    # The tree is first flattened into a list of counts, definition
+    # kinds and strings; so that the string table can be sorted by
+    # the number of references (the most common names then get the
+    # smallest indices, which fit into a single byte).
+
+    def __init__(self) -> None:
+        self.items: list[int | str | tuple[str, int]] = []
+        self.references: Counter[str] = Counter()
+
+    def string(self, value: str) -> None:
+        self.items.append(value)
+        self.references[value] += 1
+
+    def fields(self, fields: list[Field]) -> None:
+        self.items.append(len(fields))
+        for field in fields:
+            self.items.append((field.kind, _QUALIFIER_CODES[field.qualifier]))
+            self.references[field.kind] += 1
+            self.string(field.name)
+
+    def module(self, module: Module) -> None:
+        self.string(module.name)
+        self.items.append(len(module.body))
+        for definition in module.body:
+            self.string(definition.name)
+            value = definition.value
+            if isinstance(value, Sum):
+                self.items.append(_SUM)
+                self.items.append(len(value.types))
+                for constructor in value.types:
+                    self.string(constructor.name)
+                    self.fields(constructor.fields)
+            else:
+                self.items.append(_PRODUCT)
+                self.fields(value.fields)
+            self.fields(value.attributes)
+
+    def dump(self) -> bytes:
+        strings = [string for string, _ in self.references.most_common()]
+        indices = {string: index for index, string in enumerate(strings)}
+
+        buffer = bytearray(_MAGIC)
+        buffer.append(_VERSION)
+        _write_varint(buffer, len(strings))
+        for string in strings:
+            _write_varint(buffer, len(string))
+        blob = "".join(strings).encode("utf-8", errors="surrogatepass")
+        _write_varint(buffer, len(blob))
+        buffer += blob
+
+        for item in self.items:
+            if isinstance(item, int):
+                _write_varint(buffer, item)
+            elif isinstance(item, str):
+                _write_varint(buffer, indices[item])
+            else:
+                kind, qualifier = item
+                _write_varint(buffer, indices[kind] << 2 | qualifier)
+        return bytes(buffer)
+
+
+def _read_varints(data: bytes, position: int, count: int) -> tuple[int, list[int]]:
+    # Read `count` varints starting from the given
+    # position, and return them with the end position.
+    values = []
+    for _ in range(count):
+        value = shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        values.append(value)
+    return position, values
+
+
+def _decode_varints(data: bytes) -> list[int]:
+    # Most of the values fit into a single byte (which is the value
+    # itself), so only the multi byte varints are decoded one by one.
+    values: list[int] = []
+    end = 0
+    for match in _MULTI_BYTE_VARINT.finditer(data):
+        start, next_end = match.span()
+        values.extend(data[end:start])
+        value = shift = 0
+        for byte in match[0]:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        values.append(value)
+        end = next_end
+
+    if data[end:].translate(None, _SINGLE_BYTES):
+        # Continuation bytes without the final byte
+        raise ValueError("Truncated or corrupted schema data")
+    values.extend(data[end:])
+    return values
+
+
+def dump_schema(module: Module) -> bytes:
+    """Serialize the given `module` into a compact
+    binary format, which can be loaded back with
+    `load_schema()`."""
+
+    writer = _Writer()
+    writer.module(module)
+    return writer.dump()
+
+
+def load_schema(data: Any) -> Module:
+    """Load a module that was serialized with `dump_schema()`
+    from the given `data` (anything that supports the buffer
+    protocol)."""
+
+    data = bytes(data)
+    if data[: len(_MAGIC)] != _MAGIC:
+        raise ValueError("Not a serialized ASDL schema")
+    if len(data) == len(_MAGIC):
+        raise ValueError("Truncated or corrupted schema data")
+    if data[len(_MAGIC)] != _VERSION:
+        raise ValueError(
+            f"Unsupported schema format version: {data[len(_MAGIC)]} (expected"
+            f" {_VERSION})"
+        )
+
+    try:
+        position, (count,) = _read_varints(data, len(_MAGIC) + 1, 1)
+        position, lengths = _read_varints(data, position, count + 1)
+        size = lengths.pop()
+        text = data[position : position + size].decode("utf-8", errors="surrogatepass")
+        position += size
+    except (IndexError, UnicodeDecodeError) as exc:
+        raise ValueError("Truncated or corrupted schema data") from exc
+
+    strings = []
+    offset = 0
+    for length in lengths:
+        strings.append(text[offset : offset + length])
+        offset += length
+    if offset != len(text):
+        raise ValueError("Corrupted string table")
+
+    # The rest of the data only consists of varints (the definition
+    # kinds are single byte varints too), so it can be decoded all at
+    # once; and in the common case of every value being less than 128
+    # the bytes are the values themselves.
+    body_data = data[position:]
+    if body_data.isascii():
+        values = iter(body_data)
+    else:
+        values = iter(_decode_varints(body_data))
+    take = values.__next__
+
+    def fields() -> list[Field]:
+        result = []
+        for _ in range(take()):
+            kind = take()
+            result.append(
+                Field(strings[kind >> 2], strings[take()], _QUALIFIERS[kind & 3])
+            )
+        return result
+
+    try:
+        name = strings[take()]
+        body = []
+        for _ in range(take()):
+            type_name = strings[take()]
+            tag = take()
+            if tag == _SUM:
+                constructors = [
+                    Constructor(strings[take()], fields()) for _ in range(take())
+                ]
+                node: Sum | Product = Sum(constructors, fields())
+            elif tag == _PRODUCT:
+                node = Product(fields(), fields())
+            else:
+                raise ValueError(f"Invalid definition kind: {tag}")
+            body.append(Type(type_name, node))  # type: ignore
+    except (IndexError, StopIteration) as exc:
+        raise ValueError("Truncated or corrupted schema data") from exc
+
+    if next(values, None) is not None:
+        raise ValueError("Trailing data after the serialized schema")
+    return Module(name, body)
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, cast
+import copy
+import dataclasses
+import inspect
+from collections.abc import Iterable, Iterator, Sequence
+from types import FunctionType
+from typing import Any, Callable, ClassVar, cast
 
 from pyasdl.grammar import AST
 
@@ -10,22 +15,134 @@ class Visitor:
         ...
 
 
-class ASDLVisitor:
+# The attributes (besides the visit_* ones) that
+# decide which function visits a node
+_VISITOR_NAMES = frozenset(["generic_visit", "find_visitor", "__getattr__"])
+_object_setattr = object.__setattr__
+
+
+def _is_visitor_name(name: str) -> bool:
+    return name.startswith("visit_") or name in _VISITOR_NAMES
+
+
+class _VisitorType(type):
+    # Clears the dispatch tables of a visitor class (and of its subclasses,
+    # which inherit its methods) when its visit methods are changed.
+
+    def __setattr__(cls, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if _is_visitor_name(name):
+            _invalidate(cls)
+
+    def __delattr__(cls, name: str) -> None:
+        super().__delattr__(name)
+        if _is_visitor_name(name):
+            _invalidate(cls)
+
+
+def _invalidate(cls: type) -> None:
+    stack = [cls]
+    while stack:
+        subclass = stack.pop()
+        vars(subclass)["_dispatch_table"].clear()
+        stack.extend(subclass.__subclasses__())
+
+
+class ASDLVisitor(metaclass=_VisitorType):
+    # When set, generic_visit() walks the subtree with an explicit stack
+    # (dispatching to the visit_* methods of the nodes that have one)
+    # instead of recursing through visit(); so the nodes without a
+    # visit_* method don't add to the depth of the Python stack.
+    iterative: ClassVar[bool] = False
+
+    # The visitor function for each node class, which is resolved (by
+    # the name of the node class) once and then shared by all instances.
+    # Each subclass gets its own table, so the methods it overrides are
+    # never shadowed by the ones cached for its base classes; and the
+    # tables are cleared when the methods of the class change. The
+    # instances that have their own visit_* functions get a table of
+    # their own (see _InstanceTable).
+    _dispatch_table: ClassVar[dict[type, Callable[..., Any]]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._dispatch_table = {}
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Most of the attributes that are set on a visitor are its own
+        # state (e.g. counters) rather than visit methods, so this is
+        # kept to the minimum.
+        _object_setattr(self, name, value)
+        if name[:6] == "visit_" or name in _VISITOR_NAMES:
+            _reset_instance_table(self)
+
+    def __delattr__(self, name: str) -> None:
+        super().__delattr__(name)
+        if _is_visitor_name(name):
+            _reset_instance_table(self)
+
     def visit(self, node: AST, *args, **kwargs) -> Any:
-        visitor = self.find_visitor(type(node).__name__)
-        return visitor(node, *args, **kwargs)
+        try:
+            visitor = self._dispatch_table[type(node)]
+        except KeyError:
+            visitor = self._resolve_visitor(type(node))
+        return visitor(self, node, *args, **kwargs)
 
     def visit_all(self, nodes: list[AST], *args, **kwags) -> list[Any]:
         return [self.visit(node, *args, **kwags) for node in nodes]
 
     def generic_visit(self, node: AST, *args, **kwags) -> AST:
-        for value in vars(node).values():
-            if isinstance(value, AST):
+        if self.iterative:
+            self._generic_visit_iteratively(node)
+            return node
+
+        for name in _child_fields(node):
+            value = getattr(node, name)
+            if isinstance(value, (list, tuple)):
+                for item in value:
+                    if _is_node(item):
+                        self.visit(item)
+            elif _is_node(value):
                 self.visit(value)
-            elif isinstance(value, list):
-                self.visit_all(value)
         return node
 
+    def _generic_visit_iteratively(self, node: AST) -> None:
+        table = self._dispatch_table
+        stack = [_iter_child_nodes(node)]
+        while stack:
+            for child in stack[-1]:
+                try:
+                    visitor = table[type(child)]
+                except KeyError:
+                    visitor = self._resolve_visitor(type(child))
+                if visitor is ASDLVisitor.generic_visit:
+                    stack.append(_iter_child_nodes(child))
+                    break
+                visitor(self, child)
+            else:
+                stack.pop()
+
+    @classmethod
+    def _resolve_visitor(cls, node_type: type) -> Callable[..., Any]:
+        visitor: Callable[..., Any]
+        if cls.find_visitor is not ASDLVisitor.find_visitor or hasattr(
+            cls, "__getattr__"
+        ):
+            # The lookup is customized, so it has to be done every time
+            visitor = _find_visitor
+        else:
+            name = f"visit_{node_type.__name__}"
+            if not hasattr(cls, name):
+                name = "generic_visit"
+            visitor = inspect.getattr_static(cls, name)
+            if not isinstance(visitor, FunctionType):
+                # Static methods, class methods and other descriptors
+                # are bound the same way as the attribute access does.
+                visitor = _get_visitor(name)
+
+        cls._dispatch_table[node_type] = visitor
+        return visitor
+
     def find_visitor(self, name: str) -> Visitor:
         visitor = f"visit_{name}"
         if hasattr(self, visitor):
@@ -33,3 +150,218 @@ class ASDLVisitor:
         else:
             func = self.generic_visit
         return cast(Visitor, func)
+
+
+class NodeTransformer(ASDLVisitor):
+    """A visitor whose `visit_*` methods return the replacement of the
+    node they visit (None to remove it from the sequence it is in, or a
+    list of nodes to splice into it). The given tree is never mutated;
+    `generic_visit()` returns the same node if none of its children have
+    changed, or a copy with the new children; so the unchanged subtrees
+    are shared between the old and the new tree."""
+
+    def generic_visit(self, node: AST, *args, **kwargs) -> Any:
+        changes = {}
+        for name in _child_fields(node):
+            value = getattr(node, name)
+            if isinstance(value, (list, tuple)):
+                items = None
+                for index, item in enumerate(value):
+                    new_item = self.visit(item) if _is_node(item) else item
+                    if items is None:
+                        if new_item is item:
+                            continue
+                        items = list(value[:index])
+
+                    if isinstance(new_item, list):
+                        items.extend(new_item)
+                    elif new_item is not None:
+                        items.append(new_item)
+                if items is not None:
+                    changes[name] = type(value)(items)
+            elif _is_node(value):
+                new_value = self.visit(value)
+                if new_value is not value:
+                    changes[name] = new_value
+
+        if not changes:
+            return node
+        elif dataclasses.is_dataclass(node):
+            return dataclasses.replace(node, **changes)  # type: ignore
+
+        new_node = copy.copy(node)
+        for name, value in changes.items():
+            setattr(new_node, name, value)
+        return new_node
+
+
+def _child_fields(node: AST) -> Iterable[str]:
+    # The generated node classes list the fields that might hold other
+    # nodes in their _fields; for the rest, all the attributes are
+    # checked.
+    fields = getattr(node, "_fields", None)
+    if fields is None:
+        fields = [
+            name
+            for name, value in vars(node).items()
+            if isinstance(value, (AST, list, tuple))
+        ]
+    return fields
+
+
+def _is_node(value: Any) -> bool:
+    # The _fields of other classes (e.g. the ones of the `ast` module)
+    # might also list the fields that hold identifiers or constants, so
+    # only the grammar nodes and the other classes with _fields are
+    # visited.
+    return isinstance(value, AST) or hasattr(type(value), "_fields")
+
+
+def _iter_child_nodes(node: AST) -> Iterator[AST]:
+    for name in _child_fields(node):
+        value = getattr(node, name)
+        if isinstance(value, (list, tuple)):
+            yield from filter(_is_node, value)
+        elif _is_node(value):
+            yield value
+
+
+def walk(node: AST, *, order: str = "pre") -> Iterator[AST]:
+    """Iterate over the given `node` and all of its descendants, either
+    in pre-order (each node before its children) or in post-order (each
+    node after its children). It uses an explicit stack instead of the
+    recursion, so it works with trees of any depth."""
+
+    if order == "pre":
+        yield node
+        stack = [_iter_child_nodes(node)]
+        while stack:
+            for child in stack[-1]:
+                yield child
+                stack.append(_iter_child_nodes(child))
+                break
+            else:
+                stack.pop()
+    elif order == "post":
+        post_stack = [(node, _iter_child_nodes(node))]
+        while post_stack:
+            parent, children = post_stack[-1]
+            for child in children:
+                post_stack.append((child, _iter_child_nodes(child)))
+                break
+            else:
+                post_stack.pop()
+                yield parent
+    else:
+        raise ValueError(f"Unknown order: {order!r}")
+
+
+def _dispatch(visitor: ASDLVisitor, node_type: type) -> Callable[..., Any]:
+    try:
+        return visitor._dispatch_table[node_type]
+    except KeyError:
+        return visitor._resolve_visitor(node_type)
+
+
+def run_visitors(tree: AST, visitors: Sequence[ASDLVisitor]) -> list[Any]:
+    """Run all the given visitors over the `tree` in a single traversal,
+    and return what each visitor returned for the `tree`.
+
+    Every node is dispatched to the `visit_*` method of each visitor (in
+    the same order as it would have been by a separate `visitor.visit()`
+    call); only the descent into the children of the nodes that some
+    visitors handle with the default `generic_visit` is shared. The nodes
+    that a visitor has a `visit_*` method for are left to that method
+    (with its own arguments and return values, whatever it visits)."""
+
+    results = []
+    active = []
+    for index, visitor in enumerate(visitors):
+        function = _dispatch(visitor, type(tree))
+        if function is ASDLVisitor.generic_visit:
+            results.append(tree)
+            active.append(index)
+        else:
+            results.append(function(visitor, tree))
+
+    stack = [(_iter_child_nodes(tree), active)]
+    while stack:
+        children, active = stack[-1]
+        for child in children:
+            child_type = type(child)
+            child_active = []
+            for index in active:
+                visitor = visitors[index]
+                function = _dispatch(visitor, child_type)
+                if function is ASDLVisitor.generic_visit:
+                    child_active.append(index)
+                else:
+                    function(visitor, child)
+            if child_active:
+                stack.append((_iter_child_nodes(child), child_active))
+                break
+        else:
+            stack.pop()
+    return results
+
+
+class _InstanceTable(dict):  # type: ignore
+    # The dispatch table of a visitor that has visit_* functions (or a
+    # generic_visit or a find_visitor) set on the instance itself. Only
+    # the functions of the instance are cached, since the table is reset
+    # when they change; the rest are resolved through the class.
+
+    def __init__(self, visitor: ASDLVisitor) -> None:
+        super().__init__()
+        self.visitor = visitor
+
+    def __missing__(self, node_type: type) -> Callable[..., Any]:
+        visitor = self.visitor
+        attributes = vars(visitor)
+        name = f"visit_{node_type.__name__}"
+        if "find_visitor" in attributes:
+            function = self[node_type] = _find_visitor
+        elif name in attributes:
+            function = self[node_type] = _get_visitor(name)
+        elif "generic_visit" in attributes and not hasattr(type(visitor), name):
+            function = _get_visitor("generic_visit")
+        else:
+            function = _dispatch_class(type(visitor), node_type)
+        return function
+
+
+def _reset_instance_table(visitor: ASDLVisitor) -> None:
+    # Clear the tables that are set on the instance (the ones of the
+    # profile_visitor() blocks, and the instance table under them), and
+    # add an instance table under them unless there is one already.
+    attributes = vars(visitor)
+    table = attributes.get("_dispatch_table")
+    if table is None:
+        attributes["_dispatch_table"] = _InstanceTable(visitor)
+        return
+
+    while not isinstance(table, _InstanceTable):
+        table.clear()
+        if table.parent is None:
+            table.parent = _InstanceTable(visitor)
+            return
+        table = table.parent
+    table.clear()
+
+
+def _dispatch_class(cls: type[ASDLVisitor], node_type: type) -> Callable[..., Any]:
+    try:
+        return cls._dispatch_table[node_type]
+    except KeyError:
+        return cls._resolve_visitor(node_type)
+
+
+def _find_visitor(self: ASDLVisitor, node: AST, *args, **kwargs) -> Any:
+    return self.find_visitor(type(node).__name__)(node, *args, **kwargs)
+
+
+def _get_visitor(name: str) -> Callable[..., Any]:
+    def visitor(self: ASDLVisitor, node: AST, *args, **kwargs) -> Any:
+        return getattr(self, name)(node, *args, **kwargs)
+
+    return visitor
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+import concurrent.futures
+import dataclasses
+import enum
+import io
+import os
+import pickle
 import subprocess
 import sys
+import token
+import types
 from pathlib import Path
 
 import pytest
 
 import pyasdl
 from pyasdl import *
+from pyasdl.lexer import tokenize
 
 EXAMPLES_DIR = Path(__file__).parent.parent / "examples"
 GENERATORS_DIR = EXAMPLES_DIR / "generators"
@@ -20,11 +29,21 @@ ALL_ASDLS = {
     if file.suffix == ".asdl"
 }
 LATEST_ASDL = ALL_ASDLS[max(ALL_ASDLS)]
+# The grammar of the running Python, which its `ast` module matches
+CURRENT_ASDL = ALL_ASDLS.get(int("{}{}".format(*sys.version_info[:2])))
+requires_current_asdl = pytest.mark.skipif(
+    CURRENT_ASDL is None, reason="No grammar for the running Python"
+)
+
 
+@pytest.fixture(params=pyasdl.ENGINES)
+def engine(request):
+    return request.param
 
-def test_asdl_generation():
+
+def test_asdl_generation(engine):
     with open(EXAMPLES_DIR / "example.asdl") as stream:
-        parsed_ast = pyasdl.parse(stream.read(), filename="example.asdl")
+        parsed_ast = pyasdl.parse(stream.read(), filename="example.asdl", engine=engine)
 
     expected_ast = Module(
         name="Test",
@@ -123,3 +142,1252 @@ def test_generators(tmp_path, generator, original_file, args):
         ]
     )
     assert original_file.read_text() == result_file.read_text()
+
+
+def test_tokenize():
+    source = "-- comment\nmodule Test\n{\n    a = (int? b) -- trailing\n}\n"
+    tokens = [
+        (token.tok_name[tok.type], tok.string, tok.start, tok.end)
+        for tok in tokenize(source, ignore_comments=False)
+    ]
+    assert tokens == [
+        ("COMMENT", "-- comment\n", (1, 0), (1, 11)),
+        ("NAME", "module", (2, 0), (2, 6)),
+        ("NAME", "Test", (2, 7), (2, 11)),
+        ("NEWLINE", "\n", (2, 11), (2, 12)),
+        ("OP", "{", (3, 0), (3, 1)),
+        ("NAME", "a", (4, 4), (4, 5)),
+        ("OP", "=", (4, 6), (4, 7)),
+        ("OP", "(", (4, 8), (4, 9)),
+        ("NAME", "int", (4, 9), (4, 12)),
+        ("OP", "?", (4, 12), (4, 13)),
+        ("NAME", "b", (4, 14), (4, 15)),
+        ("OP", ")", (4, 15), (4, 16)),
+        ("COMMENT", "-- trailing\n", (4, 17), (4, 29)),
+        ("OP", "}", (5, 0), (5, 1)),
+        ("NEWLINE", "\n", (5, 1), (5, 2)),
+        ("ENDMARKER", "", (6, 0), (6, 0)),
+    ]
+
+
+def test_fetch_comments():
+    with open(LATEST_ASDL) as stream:
+        comments = list(pyasdl.fetch_comments(stream.read()))
+
+    assert comments[0] == " version=3.11\n"
+    assert len(comments) == 16
+
+
+@pytest.mark.parametrize("file", ALL_ASDLS.values(), ids=str)
+def test_parse_examples(file, engine):
+    tree = pyasdl.parse(file.read_text(), filename=file.name, engine=engine)
+    assert tree.name == "Python"
+    assert [definition.name for definition in tree.body][:3] == [
+        "mod",
+        "stmt",
+        "expr",
+    ]
+
+
+def test_stdlib_tokenize_is_untouched():
+    import tokenize as _tokenize
+
+    source = "x = a -- b\n"
+    tokens = [
+        tok.string
+        for tok in _tokenize.generate_tokens(io.StringIO(source).readline)
+        if tok.type == token.OP
+    ]
+    assert tokens == ["=", "-", "-"]
+    assert "--" not in _tokenize.PseudoToken
+
+
+def test_parse_from_threads(engine):
+    import tokenize as _tokenize
+
+    sources = [file.read_text() for file in ALL_ASDLS.values()]
+    expected = [pyasdl.parse(source, engine=engine) for source in sources]
+    python_source = Path(__file__).read_text()
+
+    def tokenize_python():
+        # An unrelated tokenize user, running next to the parser threads.
+        return [
+            tok.string
+            for tok in _tokenize.generate_tokens(io.StringIO(python_source).readline)
+            if tok.type == token.COMMENT
+        ]
+
+    comments = tokenize_python()
+    assert comments
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        parses = [
+            executor.submit(pyasdl.parse, source, engine=engine)
+            for _ in range(8)
+            for source in sources
+        ]
+        tokenizations = [executor.submit(tokenize_python) for _ in range(16)]
+
+        for index, future in enumerate(parses):
+            assert future.result() == expected[index % len(sources)]
+        for future in tokenizations:
+            assert future.result() == comments
+
+
+def test_parse_many_definitions(engine):
+    count = 50_000
+    source = "module Big {\n"
+    source += "".join(f"    t{index} = T{index}\n" for index in range(count))
+    source += "}\n"
+
+    tree = pyasdl.parse(source, engine=engine)
+    assert len(tree.body) == count
+    assert tree.body[-1] == Type(f"t{count - 1}", Sum([Constructor(f"T{count - 1}")]))
+
+
+@pytest.mark.parametrize(
+    "source, position",
+    [
+        ("", (1, 1)),
+        ("module X\n{ }", (2, 3)),
+        ("module X { a = () }", (1, 17)),
+        ("module X { a = B | }", (1, 20)),
+        ("module X { a = B(int) }", (1, 21)),
+        ("module X { a = (int x) | B }", (1, 24)),
+        ("module X { a = B attributes () }", (1, 30)),
+    ],
+)
+def test_syntax_errors(source, position, engine):
+    with pytest.raises(SyntaxError) as exc_info:
+        pyasdl.parse(source, filename="broken.asdl", engine=engine)
+
+    exc = exc_info.value
+    assert exc.filename == "broken.asdl"
+    assert (exc.lineno, exc.offset) == position
+
+
+def test_engines_agree_on_soft_keywords():
+    source = """
+    module X {
+        a = attributes | B attributes (int x)
+        attributes = (int y)
+        c = C
+    }
+    """
+    trees = [pyasdl.parse(source, engine=engine) for engine in pyasdl.ENGINES]
+    assert trees[0] == trees[1]
+    assert [definition.name for definition in trees[0].body] == [
+        "a",
+        "attributes",
+        "c",
+    ]
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        pyasdl.parse("module X { a = B }", engine="yacc")
+
+
+def test_parse_with_comments(engine):
+    source = """\
+-- header
+module Test {
+    -- about a
+    a = A | B -- trailing
+        | C(int x) -- inside
+
+    b = (int y)
+
+    -- about c
+    c = D
+    -- after everything
+}
+"""
+    tree, comments = pyasdl.parse_with_comments(source, engine=engine)
+    assert tree == pyasdl.parse(source)
+
+    a, b, c = tree.body
+    assert [
+        (comment.text, comment.line, comment.column, comment.definition)
+        for comment in comments
+    ] == [
+        (" header", 1, 0, None),
+        (" about a", 3, 4, a),
+        (" trailing", 4, 14, a),
+        (" inside", 5, 19, a),
+        (" about c", 9, 4, c),
+        (" after everything", 11, 4, c),
+    ]
+    assert comments[1].definition is a
+
+
+def test_parse_file(engine):
+    tree = pyasdl.parse_file(LATEST_ASDL, engine=engine)
+    assert tree == pyasdl.parse(LATEST_ASDL.read_text(), engine=engine)
+
+
+def test_parse_file_errors(tmp_path, engine):
+    empty_file = tmp_path / "empty.asdl"
+    empty_file.touch()
+
+    with pytest.raises(SyntaxError) as exc_info:
+        pyasdl.parse_file(empty_file, engine=engine)
+    assert exc_info.value.filename == str(empty_file)
+
+
+@pytest.mark.parametrize("wrapper", [bytes, bytearray, memoryview])
+def test_parse_bytes(wrapper, engine):
+    source = LATEST_ASDL.read_bytes()
+    tree = pyasdl.parse_bytes(wrapper(source), engine=engine)
+    assert tree == pyasdl.parse(source.decode(), engine=engine)
+
+
+def test_iterparse():
+    tree = pyasdl.parse(LATEST_ASDL.read_text())
+    with open(LATEST_ASDL) as stream:
+        definitions = list(pyasdl.iterparse(stream))
+
+    assert definitions == [(tree.name, definition) for definition in tree.body]
+
+
+def test_iterparse_is_incremental():
+    consumed = []
+
+    def lines():
+        for line in ["module X {\n", "  a = A\n", "  b = B\n", "  c = 3\n", "}\n"]:
+            consumed.append(line)
+            yield line
+
+    definitions = pyasdl.iterparse(lines(), filename="stream.asdl")
+    assert next(definitions) == ("X", Type("a", Sum([Constructor("A")])))
+    assert len(consumed) == 3
+    assert next(definitions) == ("X", Type("b", Sum([Constructor("B")])))
+
+    with pytest.raises(SyntaxError) as exc_info:
+        next(definitions)
+    assert exc_info.value.filename == "stream.asdl"
+    assert exc_info.value.lineno == 4
+
+
+def test_reparse(engine):
+    old_source = LATEST_ASDL.read_text()
+    old_tree = pyasdl.parse(old_source, engine=engine)
+
+    new_source = old_source.replace(
+        "Pass | Break | Continue", "Pass | Break | Continue | Goto(identifier label)"
+    )
+    new_tree = pyasdl.reparse(old_tree, old_source, new_source, engine=engine)
+    assert new_tree == pyasdl.parse(new_source, engine=engine)
+
+    changed = [
+        new.name for old, new in zip(old_tree.body, new_tree.body) if old is not new
+    ]
+    assert changed == ["stmt"]
+    assert pyasdl.reparse(old_tree, old_source, old_source) is old_tree
+
+
+@pytest.mark.parametrize(
+    "old_source, new_source",
+    [
+        # new definitions
+        ("module X { a = A\n b = B }", "module X { a = A\n c = C\n b = B }"),
+        # removed definitions
+        ("module X { a = A\n b = B\n c = C }", "module X { a = A\n c = C }"),
+        # continuing the previous definition
+        ("module X { a = A\n b = B }", "module X { a = A\n | C\n b = B }"),
+        # changing the module header
+        ("module X { a = A\n b = B }", "module Y { a = A\n b = B }"),
+        # edits in comments
+        ("module X { a = A -- x = y\n b = B }", "module X { a = A -- z = t\n b = B }"),
+        # closing the module early
+        (
+            "module X { a = A\n b = B\n c = C\n d = D }",
+            "module X { a = A\n b = B }\n c = C\n d = D }",
+        ),
+    ],
+)
+def test_reparse_edits(old_source, new_source, engine):
+    old_tree = pyasdl.parse(old_source, engine=engine)
+    new_tree = pyasdl.reparse(old_tree, old_source, new_source, engine=engine)
+    assert new_tree == pyasdl.parse(new_source, engine=engine)
+
+
+def test_reparse_errors():
+    old_source = "module X {\n a = A\n b = B\n}"
+    old_tree = pyasdl.parse(old_source)
+
+    with pytest.raises(SyntaxError) as exc_info:
+        pyasdl.reparse(old_tree, old_source, old_source.replace("b = B", "b = B |"))
+    assert exc_info.value.lineno == 4
+
+
+@pytest.mark.parametrize("executor", ["process", "thread"])
+def test_parse_many(tmp_path, executor):
+    broken_file = tmp_path / "broken.asdl"
+    broken_file.write_text("module Broken {\n    a = (int x,)\n}\n")
+    undecodable_file = tmp_path / "undecodable.asdl"
+    undecodable_file.write_bytes(b"module X { a = B\xff }\n")
+    missing_file = tmp_path / "missing.asdl"
+    paths = [
+        *ALL_ASDLS.values(),
+        broken_file,
+        undecodable_file,
+        missing_file,
+        EXAMPLES_DIR / "example.asdl",
+    ]
+
+    results = pyasdl.parse_many(paths, workers=2, executor=executor)
+    assert [result.path for result in results] == paths
+    for result in results:
+        if result.path == broken_file:
+            assert result.module is None
+            assert isinstance(result.error, SyntaxError)
+            assert result.error.filename == str(broken_file)
+            assert result.error.lineno == 2
+        elif result.path == undecodable_file:
+            assert result.module is None
+            assert isinstance(result.error, UnicodeDecodeError)
+        elif result.path == missing_file:
+            assert result.module is None
+            assert isinstance(result.error, FileNotFoundError)
+        else:
+            assert result.error is None
+            assert result.module == pyasdl.parse_file(result.path)
+
+
+@pytest.fixture
+def parse_cache(tmp_path):
+    try:
+        yield pyasdl.cache.enable(tmp_path / "cache", memory_entries=2)
+    finally:
+        pyasdl.cache.disable()
+
+
+def test_parse_cache(parse_cache, engine):
+    source = LATEST_ASDL.read_text()
+    tree = pyasdl.parse(source, engine=engine)
+    assert parse_cache.stats.misses == 1
+    assert parse_cache.stats.writes == 1
+
+    assert pyasdl.parse(source, engine=engine) == tree
+    assert pyasdl.parse_file(LATEST_ASDL, engine=engine) == tree
+    assert parse_cache.stats.hits == parse_cache.stats.memory_hits == 2
+
+    # A fresh cache on the same directory (e.g. another process)
+    # loads the tree that the first one stored.
+    other_cache = pyasdl.cache.ParseCache(parse_cache.directory)
+    assert other_cache.get(other_cache.key(source.encode())) is not None
+    assert other_cache.stats.hits == 1
+    assert other_cache.stats.memory_hits == 0
+
+    # Syntax errors are never cached
+    for _ in range(2):
+        with pytest.raises(SyntaxError):
+            pyasdl.parse("module X { a = }", engine=engine)
+    assert parse_cache.stats.writes == 1
+
+
+def test_parse_cache_eviction(tmp_path):
+    cache = pyasdl.cache.ParseCache(tmp_path, max_size=256, memory_entries=0)
+    trees = {}
+    for index in range(10):
+        source = f"module M{index} {{ a = A{index} | B(int x) }}"
+        trees[source] = cache.fetch(source.encode(), "utf-8", lambda: parse(source))
+
+    assert cache.stats.writes == 10
+    assert cache.stats.evictions > 0
+    assert sum(path.stat().st_size for path in tmp_path.iterdir()) <= 256
+
+    source, tree = trees.popitem()
+    key = cache.key(source.encode())
+    cache.put(key, tree)
+    assert cache.fetch(source.encode(), "utf-8", None) == tree
+
+    # Entries that weren't used in the last `max_age` seconds are stale
+    os.utime(tmp_path / f"{key}.asdlc", (0, 0))
+    cache.max_age = 60
+    assert cache.get(key) is None
+
+    # Corrupted entries are treated as misses (and removed)
+    (tmp_path / f"{key}.asdlc").write_bytes(b"garbage")
+    assert cache.get(key) is None
+    assert not (tmp_path / f"{key}.asdlc").exists()
+
+    cache.clear()
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("file", ALL_ASDLS.values(), ids=str)
+def test_dump_schema(file):
+    tree = pyasdl.parse_file(file)
+    data = pyasdl.dump_schema(tree)
+    assert len(data) < file.stat().st_size
+    assert pyasdl.load_schema(data) == tree
+    assert pyasdl.load_schema(memoryview(data)) == tree
+
+
+def test_dump_schema_large_tables():
+    # More than 128 strings (multi byte indices), non-ASCII names
+    # and all the qualifiers.
+    source = "module Ünïcode {\n"
+    for index in range(300):
+        source += f"    t_{index} = Ç_{index}(t_{index}* a, int? b, ß c) | D_{index}\n"
+    source += "    p = (identifier name) attributes (int lineno)\n}\n"
+    tree = pyasdl.parse(source)
+    assert pyasdl.load_schema(pyasdl.dump_schema(tree)) == tree
+
+
+def test_load_schema_errors():
+    data = pyasdl.dump_schema(pyasdl.parse_file(LATEST_ASDL))
+    with pytest.raises(ValueError, match="Not a serialized"):
+        pyasdl.load_schema(b"module X {}")
+    with pytest.raises(ValueError, match="version"):
+        pyasdl.load_schema(data[:4] + b"\xff" + data[5:])
+    for end in [4, 5, 20, len(data) // 2, len(data) - 1]:
+        with pytest.raises(ValueError):
+            pyasdl.load_schema(data[:end])
+    with pytest.raises(ValueError, match="Trailing"):
+        pyasdl.load_schema(data + b"\x00")
+
+
+def test_lazy_imports():
+    code = (
+        "import sys, pyasdl\n"
+        "pyasdl.ASDLVisitor, pyasdl.Module\n"
+        "print(*sorted(sys.modules))\n"
+    )
+    modules = subprocess.check_output([sys.executable, "-c", code], text=True).split()
+    for module in [
+        "argparse",
+        "pegen",
+        "pyasdl.asdl",
+        "pyasdl.parser",
+        "pyasdl.cache",
+        "pyasdl.codec",
+    ]:
+        assert module not in modules
+
+    for name, module in pyasdl._LAZY_ATTRIBUTES.items():
+        assert name in sys.modules[module].__all__
+        assert getattr(pyasdl, name) is getattr(sys.modules[module], name)
+    for module in set(pyasdl._LAZY_ATTRIBUTES.values()):
+        assert set(sys.modules[module].__all__) <= set(pyasdl._LAZY_ATTRIBUTES)
+    assert pyasdl.cache is sys.modules["pyasdl.cache"]
+    assert set(dir(pyasdl)) >= set(pyasdl.__all__)
+
+    with pytest.raises(AttributeError):
+        pyasdl.missing
+
+
+def test_freeze():
+    trees = [pyasdl.parse_file(file) for file in ALL_ASDLS.values()]
+    frozen_trees = [pyasdl.freeze(tree) for tree in trees]
+    for tree, frozen_tree in zip(trees, frozen_trees):
+        assert isinstance(frozen_tree, pyasdl.Module)
+        assert pyasdl.thaw(frozen_tree) == tree
+        assert pyasdl.freeze(tree) is frozen_tree
+        assert hash(frozen_tree) == hash(pyasdl.freeze(pyasdl.thaw(frozen_tree)))
+
+    # Identical subtrees are shared between the versions
+    attributes = [
+        field
+        for tree in frozen_trees
+        for definition in tree.body
+        for field in definition.value.attributes
+    ]
+    assert len(attributes) > 20
+    assert len({id(field) for field in attributes}) == len(
+        {(field.kind, field.name, field.qualifier) for field in attributes}
+    )
+
+    field = pyasdl.frozen.Field("int", "lineno")
+    assert field is pyasdl.frozen.Field("int", "lineno", None)
+    assert field == pyasdl.freeze(Field("int", "lineno"))
+    assert field != pyasdl.frozen.Field("int", "lineno", FieldQualifier.OPTIONAL)
+    assert {field: 1}[pyasdl.frozen.Field("int", "lineno")] == 1
+    with pytest.raises(AttributeError):
+        field.name = "col_offset"
+
+    constructor = pyasdl.frozen.Constructor("Name", [Field("identifier", "id")])
+    assert constructor.fields == (pyasdl.frozen.Field("identifier", "id"),)
+
+
+def test_visit_frozen_tree():
+    class FieldCollector(pyasdl.ASDLVisitor):
+        def __init__(self):
+            self.fields = []
+
+        def visit_Field(self, node):
+            self.fields.append(node.name)
+
+    tree = pyasdl.parse_file(LATEST_ASDL)
+    collectors = [FieldCollector(), FieldCollector()]
+    collectors[0].visit(tree)
+    collectors[1].visit(pyasdl.freeze(tree))
+    assert collectors[0].fields == collectors[1].fields
+
+
+def test_visitor_dispatch():
+    class Base(pyasdl.ASDLVisitor):
+        def visit_Field(self, node):
+            return "base"
+
+    class Child(Base):
+        def visit_Field(self, node):
+            return "child"
+
+        @staticmethod
+        def visit_Constructor(node):
+            return "static"
+
+    class Fallback(Child):
+        def generic_visit(self, node):
+            return "generic"
+
+    class Custom(Base):
+        def find_visitor(self, name):
+            return lambda node: name
+
+    field = Field("int", "x")
+    constructor = Constructor("X")
+    assert Base().visit(field) == "base"
+    assert Child().visit(field) == "child"
+    assert Base().visit(field) == "base"
+    assert Child().visit(constructor) == "static"
+    assert Base().visit(constructor) is constructor
+    assert Fallback().visit(constructor) == "static"
+    assert Fallback().visit(Module("X", [])) == "generic"
+    assert Custom().visit(field) == "Field"
+    assert Custom().visit(pyasdl.freeze(constructor)) == "Constructor"
+    assert Base._dispatch_table.keys() == {Field, Constructor}
+
+    # Functions set on an instance, and methods changed on a class
+    instance = Base()
+    instance.visit_Field = lambda node: "instance"
+    assert instance.visit(field) == "instance"
+    assert Base().visit(field) == "base"
+    del instance.visit_Field
+    assert instance.visit(field) == "base"
+    instance.generic_visit = lambda node: "instance"
+    assert instance.visit(constructor) == "instance"
+    assert instance.visit(field) == "base"
+
+    class Plain(Base):
+        pass
+
+    assert Plain().visit(constructor) is constructor
+    Base.visit_Constructor = lambda self, node: "added"
+    assert Plain().visit(constructor) == "added"
+    assert Child().visit(constructor) == "static"
+    del Base.visit_Constructor
+    assert Plain().visit(constructor) is constructor
+
+    instance = Base()
+    with pyasdl.profile_visitor(instance) as profile:
+        assert instance.visit(field) == "base"
+        instance.visit_Field = lambda node: "instance"
+        assert instance.visit(field) == "instance"
+    assert profile.methods["visit_Field"].calls == 2
+    assert instance.visit(field) == "instance"
+
+    class Lookup(Base):
+        def find_visitor(self, name):
+            return super().find_visitor(name)
+
+    instance = Lookup()
+    instance.visit_Field = lambda node: "instance"
+    assert instance.visit(field) == "instance"
+
+
+def test_walk():
+    tree = pyasdl.parse("module X { a = A(int x, b y) | B b = (int? z) }")
+    names = [node.__class__.__name__ for node in pyasdl.walk(tree)]
+    assert names == [
+        "Module",
+        "Type",
+        "Sum",
+        "Constructor",
+        "Field",
+        "Field",
+        "Constructor",
+        "Type",
+        "Product",
+        "Field",
+    ]
+    post_order = [node.__class__.__name__ for node in pyasdl.walk(tree, order="post")]
+    assert post_order[:3] == ["Field", "Field", "Constructor"]
+    assert post_order[-3:] == ["Product", "Type", "Module"]
+    assert sorted(post_order) == sorted(names)
+
+    with pytest.raises(ValueError):
+        list(pyasdl.walk(tree, order="in"))
+
+
+def test_iterative_visitor():
+    @dataclasses.dataclass
+    class Chain(AST):
+        child: AST
+
+    depth = sys.getrecursionlimit() * 2
+    tree = Field("int", "x")
+    for _ in range(depth):
+        tree = Chain(tree)
+
+    assert len(list(pyasdl.walk(tree))) == depth + 1
+    assert next(pyasdl.walk(tree, order="post")).name == "x"
+
+    class FieldCollector(pyasdl.ASDLVisitor):
+        iterative = True
+
+        def __init__(self):
+            self.fields = []
+
+        def visit_Field(self, node):
+            self.fields.append(node.name)
+
+    visitor = FieldCollector()
+    assert visitor.visit(tree) is tree
+    assert visitor.fields == ["x"]
+
+    visitor.iterative = False
+    with pytest.raises(RecursionError):
+        visitor.visit(tree)
+
+    visitor = FieldCollector()
+    visitor.visit(pyasdl.parse_file(LATEST_ASDL))
+    assert len(visitor.fields) == sum(
+        isinstance(node, Field) for node in pyasdl.walk(pyasdl.parse_file(LATEST_ASDL))
+    )
+
+
+def test_node_transformer():
+    class Renamer(pyasdl.NodeTransformer):
+        def visit_Field(self, node):
+            if node.name == "x":
+                return Field(node.kind, "renamed", node.qualifier)
+            elif node.name == "removed":
+                return None
+            elif node.name == "split":
+                return [Field("int", "a"), Field("int", "b")]
+            return node
+
+    assert Module._fields == ("body",)
+    assert Field._fields == ()
+
+    tree = pyasdl.parse(
+        """
+        module X {
+            a = A(int x, int y) | B(int y)
+            b = (int removed, int split, int z)
+            c = C
+        }
+        """
+    )
+    new_tree = Renamer().visit(tree)
+    assert new_tree is not tree
+    a, b, c = new_tree.body
+    assert [field.name for field in a.value.types[0].fields] == ["renamed", "y"]
+    assert a.value.types[1] is tree.body[0].value.types[1]
+    assert [field.name for field in b.value.fields] == ["a", "b", "z"]
+    assert b.value.fields[2] is tree.body[1].value.fields[2]
+    assert c is tree.body[2]
+
+    # The original tree is left as is
+    assert (
+        pyasdl.parse(
+            "module X { a = A(int x, int y) | B(int y) b = (int removed, int split,"
+            " int z) c = C }"
+        )
+        == tree
+    )
+
+    frozen_tree = pyasdl.freeze(tree)
+    new_frozen_tree = Renamer().visit(frozen_tree)
+    assert isinstance(new_frozen_tree, pyasdl.FrozenNode)
+    assert new_frozen_tree == pyasdl.freeze(new_tree)
+    assert pyasdl.NodeTransformer().visit(frozen_tree) is frozen_tree
+
+
+def test_visitor_foreign_fields():
+    import ast
+
+    # The _fields of the ast classes also list the identifiers and constants
+    class NameCollector(pyasdl.ASDLVisitor):
+        def __init__(self):
+            self.names = []
+
+        def visit_Name(self, node):
+            self.names.append(node.id)
+
+    class Renamer(pyasdl.NodeTransformer):
+        def visit_Name(self, node):
+            return ast.Name("y", node.ctx)
+
+    tree = ast.parse("f(x, 1)\nglobal g")
+    assert pyasdl.ASDLVisitor().visit(tree) is tree
+    for iterative in [False, True]:
+        visitor = NameCollector()
+        visitor.iterative = iterative
+        visitor.visit(tree)
+        assert visitor.names == ["f", "x"]
+    assert [node.__class__.__name__ for node in pyasdl.walk(tree.body[0])] == [
+        "Expr",
+        "Call",
+        "Name",
+        "Load",
+        "Name",
+        "Load",
+        "Constant",
+    ]
+    new_tree = Renamer().visit(tree)
+    assert ast.unparse(new_tree) == "y(y, 1)\nglobal g"
+    assert new_tree.body[1] is tree.body[1]
+
+
+def test_profile_visitor():
+    class FieldCollector(pyasdl.ASDLVisitor):
+        def __init__(self):
+            self.fields = []
+
+        def visit_Type(self, node):
+            self.visit(node.value)
+
+        def visit_Field(self, node):
+            self.fields.append(node.name)
+
+    tree = pyasdl.parse_file(LATEST_ASDL)
+    expected = FieldCollector()
+    expected.visit(tree)
+
+    for iterative in [False, True]:
+        visitor = FieldCollector()
+        visitor.iterative = iterative
+        with pyasdl.profile_visitor(visitor) as profile:
+            visitor.visit(tree)
+        assert visitor.fields == expected.fields
+        assert "_dispatch_table" not in vars(visitor)
+
+        stats = {stats.name: stats for stats in profile.report()}
+        assert stats.keys() == {"visit_Type", "visit_Field", "generic_visit"}
+        assert stats["visit_Type"].calls == len(tree.body)
+        assert stats["visit_Field"].calls == len(expected.fields)
+        assert stats["visit_Field"].nodes == {"Field": len(expected.fields)}
+        assert {"Module", "Sum", "Product", "Constructor"} == set(
+            stats["generic_visit"].nodes
+        )
+        for method in stats.values():
+            assert 0 <= method.exclusive_time <= method.inclusive_time
+
+        lines = profile.collapsed_stacks().splitlines()
+        assert "FieldCollector;generic_visit;visit_Type;generic_visit;visit_Field" in {
+            line.rsplit(" ", 1)[0] for line in lines
+        }
+        assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == sum(
+            method.exclusive_time for method in stats.values()
+        )
+
+    # Nested profiles of the same visitor both record the calls
+    visitor = FieldCollector()
+    with pyasdl.profile_visitor(visitor) as outer:
+        with pyasdl.profile_visitor(visitor) as inner:
+            visitor.visit(tree)
+        visitor.visit(tree)
+    assert "_dispatch_table" not in vars(visitor)
+    assert inner.methods["visit_Type"].calls == len(tree.body)
+    assert outer.methods["visit_Type"].calls == 2 * len(tree.body)
+
+
+def test_run_visitors():
+    class FieldCollector(pyasdl.ASDLVisitor):
+        def __init__(self):
+            self.fields = []
+
+        def visit_Field(self, node):
+            self.fields.append(node.name)
+
+    class KindCollector(pyasdl.ASDLVisitor):
+        def __init__(self):
+            self.kinds = []
+
+        def visit_Type(self, node):
+            return self.visit(node.value, name=node.name)
+
+        def visit_Sum(self, node, name):
+            self.kinds.append((name, "sum"))
+
+        def visit_Product(self, node, name):
+            self.kinds.append((name, "product"))
+            self.visit_all(node.fields, name=name)
+
+        def visit_Field(self, node, name):
+            self.kinds.append((name, node.kind))
+
+    class Counter(pyasdl.ASDLVisitor):
+        def visit_Module(self, node):
+            return len(node.body)
+
+    tree = pyasdl.parse_file(LATEST_ASDL)
+    expected = [FieldCollector(), KindCollector(), Counter()]
+    expected_results = [visitor.visit(tree) for visitor in expected]
+
+    visitors = [FieldCollector(), KindCollector(), Counter()]
+    assert pyasdl.run_visitors(tree, visitors) == expected_results
+    assert expected_results == [tree, tree, len(tree.body)]
+    assert visitors[0].fields == expected[0].fields
+    assert visitors[1].kinds == expected[1].kinds
+    assert pyasdl.run_visitors(tree, []) == []
+
+
+def test_build_classes():
+    namespace = pyasdl.build_classes(pyasdl.parse_file(LATEST_ASDL))
+    assert namespace.__name__ == "Python"
+    assert issubclass(namespace.expr_context, enum.Enum)
+    assert [member.name for member in namespace.expr_context] == [
+        "Load",
+        "Store",
+        "Del",
+    ]
+    with pytest.raises(TypeError):
+        namespace.expr()
+
+    name = namespace.Name("x", namespace.expr_context.Load, 1, 0)
+    assert isinstance(name, namespace.expr) and isinstance(name, namespace.AST)
+    assert (name.id, name.lineno, name.end_lineno) == ("x", 1, None)
+    assert not hasattr(name, "__dict__")
+    assert name == namespace.Name("x", namespace.expr_context.Load, 1, 0)
+    assert name != namespace.Name("y", namespace.expr_context.Load, 1, 0)
+    assert repr(name).startswith("Name(id='x', ctx=<expr_context.Load: 1>, lineno=1")
+    assert namespace.Name.__match_args__ == ("id", "ctx")
+
+    call = namespace.Call(name, [])
+    assert call.keywords == [] and call.args == []
+    assert namespace.Call._fields == ("func", "args", "keywords")
+    assert namespace.Module().body == []
+    function = namespace.FunctionDef("f", namespace.arguments())
+    assert function.body == [] and function.returns is None
+    with pytest.raises(TypeError):
+        namespace.FunctionDef("f")
+
+    class NameCollector(pyasdl.ASDLVisitor):
+        def __init__(self):
+            self.names = []
+
+        def visit_Name(self, node):
+            self.names.append(node.id)
+
+    collector = NameCollector()
+    collector.visit(namespace.Expr(namespace.Call(name, [name, namespace.Constant(1)])))
+    assert collector.names == ["x", "x"]
+
+    with pytest.raises(ValueError):
+        pyasdl.build_classes(pyasdl.parse("module X { a = (int class) }"))
+    with pytest.raises(ValueError):
+        pyasdl.build_classes(pyasdl.parse("module X { a = A(int x, string x) }"))
+
+
+CODEC_SOURCE = """\
+import os
+from x import y as z
+
+@decorator
+async def f(a, /, b: int = 1, *args, c, **kwargs) -> None:
+    global g
+    x = {**a, "k": 1, None: b"\\xff"}
+    x[1:2, ...] += -10 ** 40 + 2.5j
+    return f"{x!r:>{10}}", [i async for i in y if i], lambda: (yield)
+"""
+
+
+@requires_current_asdl
+def test_codec():
+    import ast
+
+    codec = pyasdl.codec.compile(pyasdl.parse_file(CURRENT_ASDL), ast)
+    tree = ast.parse(CODEC_SOURCE)
+    data = codec.encode(tree)
+    assert ast.dump(codec.decode(data), include_attributes=True) == ast.dump(
+        tree, include_attributes=True
+    )
+    assert codec.decode(memoryview(bytearray(data))).body[0].names[0].name == "os"
+    assert len(data) * 2 < len(pickle.dumps(tree))
+
+    constant = ast.Constant(
+        (1, -3, 10**40, -(10**40), 2.5, 1j, b"\xff", ..., None, True, "\ud800")
+    )
+    constant.value += (frozenset([1]),)
+    expression = ast.Expression(ast.fix_missing_locations(constant))
+    assert codec.decode(codec.encode(expression)).body.value == constant.value
+
+    # Decoded into the classes of build_classes(), and encoded from them
+    classes_codec = pyasdl.codec.compile(pyasdl.parse_file(CURRENT_ASDL))
+    converted = classes_codec.decode(data)
+    assert isinstance(converted, classes_codec.classes.Module)
+    assert converted.body[0].names[0].name == "os"
+    assert converted.body[2].body[1].value.keys[0] is None
+    assert classes_codec.decode(classes_codec.encode(converted)) == converted
+    assert classes_codec.encode(converted) == data
+
+    with pytest.raises(TypeError):
+        codec.encode(ast.Expr(ast.Pass()))
+    with pytest.raises(TypeError):
+        codec.encode(ast.Load())
+    with pytest.raises(ValueError, match="Not an encoded"):
+        codec.decode(b"ASDL")
+    with pytest.raises(ValueError, match="schema"):
+        pyasdl.codec.compile(pyasdl.parse_file(ALL_ASDLS[36])).decode(data)
+    with pytest.raises(ValueError, match="Truncated"):
+        codec.decode(data[:-5])
+    with pytest.raises(ValueError, match="Trailing"):
+        codec.decode(data + b"\x00")
+
+
+def test_codec_classes():
+    class Node:
+        __slots__ = ("value", "doc", "children", "line")
+
+        def __init__(self, value, doc=None, children=(), *, line=None):
+            self.value = value
+            self.doc = doc
+            self.children = list(children)
+            self.line = line
+
+        def __eq__(self, other):
+            return all(
+                getattr(self, name) == getattr(other, name) for name in self.__slots__
+            )
+
+    class Kind(enum.Enum):
+        Leaf = 1
+        Branch = 2
+
+    module = pyasdl.parse(
+        "module X { node = Node(kind value, string? doc, node* children)"
+        " attributes (int line) kind = Leaf | Branch }"
+    )
+    codec = pyasdl.codec.compile(module, types.SimpleNamespace(Node=Node, kind=Kind))
+    tree = Node(
+        Kind.Branch,
+        "root",
+        [Node(Kind.Leaf, line=-1), Node(Kind.Leaf, None, [], line=2**70)],
+        line=1,
+    )
+    assert codec.decode(codec.encode(tree)) == tree
+    assert codec.decode_lazy(codec.encode(tree, indexed=True)) == tree
+
+    with pytest.raises(ValueError, match="'Node', 'kind.Branch'"):
+        pyasdl.codec.compile(
+            module, types.SimpleNamespace(kind=enum.Enum("kind", ["Leaf"]))
+        )
+
+    module.body[0].name = "a-b"
+    with pytest.raises(ValueError, match="Invalid name: 'a-b'"):
+        pyasdl.codec.compile(module, types.SimpleNamespace(**{"a-b": Node}))
+    module.body[0].name = "node"
+    module.body[1].value.types[0].name = "class"
+    with pytest.raises(ValueError, match="Invalid name: 'class'"):
+        pyasdl.codec.compile(module, types.SimpleNamespace(Node=Node, kind=Kind))
+
+
+@requires_current_asdl
+def test_codec_lazy(tmp_path):
+    import ast
+
+    codec = pyasdl.codec.compile(pyasdl.parse_file(CURRENT_ASDL), ast)
+    tree = ast.parse(CODEC_SOURCE)
+    data = codec.encode(tree, indexed=True)
+
+    lazy = codec.decode_lazy(data)
+    assert isinstance(lazy, ast.Module) and lazy.__class__ is not ast.Module
+    function = lazy.body[2]
+    assert lazy.__class__ is ast.Module
+    assert isinstance(function, ast.AsyncFunctionDef)
+    assert function.__class__ is not ast.AsyncFunctionDef
+    assert function.name == "f"
+    assert function.__class__ is ast.AsyncFunctionDef
+    assert ast.dump(lazy, include_attributes=True) == ast.dump(
+        tree, include_attributes=True
+    )
+    assert ast.dump(pickle.loads(pickle.dumps(codec.decode_lazy(data)))) == ast.dump(
+        tree
+    )
+
+    path = tmp_path / "tree.asdt"
+    path.write_bytes(data)
+    loaded = codec.load(path)
+    assert loaded.body[0].names[0].name == "os"
+    compile(loaded, "<lazy>", "exec")
+
+    # Proxies of the classes of build_classes()
+    classes_codec = pyasdl.codec.compile(pyasdl.parse_file(CURRENT_ASDL))
+    converted = classes_codec.decode(codec.encode(tree))
+    lazy = classes_codec.decode_lazy(classes_codec.encode(converted, indexed=True))
+    assert lazy == converted
+    assert lazy.body[2].body[1].value.keys[0] is None
+
+    with pytest.raises(ValueError, match="decode_lazy"):
+        codec.decode(data)
+    with pytest.raises(ValueError, match="indexed=True"):
+        codec.decode_lazy(codec.encode(tree))
+    with pytest.raises(ValueError, match="Truncated"):
+        ast.dump(codec.decode_lazy(data[:-5]))
+
+
+def test_schema():
+    tree = pyasdl.parse_file(LATEST_ASDL)
+    schema = pyasdl.Schema(tree)
+    assert len(schema) == len(tree.body)
+    assert list(schema) == [definition.name for definition in tree.body]
+    assert schema["expr"] is tree.body[2]
+    assert "expr" in schema and "int" not in schema
+
+    name = schema.constructors["Name"]
+    assert schema.parent(name) is schema.parent("Name") is schema["expr"]
+    assert schema.resolve(name.fields[1]) is schema["expr_context"]
+    assert schema.resolve("identifier") is None
+    assert schema.is_builtin("identifier") and not schema.is_builtin("expr")
+
+    references = schema.references("expr_context")
+    assert {reference.constructor.name for reference in references} == {
+        "Attribute",
+        "Subscript",
+        "Starred",
+        "Name",
+        "List",
+        "Tuple",
+    }
+    assert all(reference.definition is schema["expr"] for reference in references)
+    assert schema.references(schema["mod"]) == ()
+    reference = schema.references("arg")[0]
+    assert reference.definition is schema["arguments"]
+    assert reference.constructor is None
+
+    assert schema.simple_sums == {
+        name
+        for name, definition in schema.items()
+        if isinstance(definition.value, Sum) and is_simple_sum(definition.value)
+    }
+    assert schema.is_simple_sum("boolop") and not schema.is_simple_sum("expr")
+    assert schema.undefined == set()
+
+    with pytest.raises(TypeError):
+        schema.types["expr"] = schema["stmt"]
+
+
+@pytest.mark.parametrize(
+    "source, error",
+    [
+        ("module X { a = A | B\n a = C }", "Duplicate definition: 'a'"),
+        ("module X { a = A | B\n b = C | A }", "Duplicate constructor: 'A'"),
+    ],
+)
+def test_schema_errors(source, error):
+    with pytest.raises(ValueError, match=error):
+        pyasdl.Schema(pyasdl.parse(source))
+
+
+def test_schema_undefined():
+    schema = pyasdl.Schema(pyasdl.parse("module X { a = (b x, int y, c? z) }"))
+    assert schema.undefined == {"b", "c"}
+
+
+def test_type_graph():
+    graph = pyasdl.TypeGraph(pyasdl.parse_file(LATEST_ASDL))
+    assert graph.successors("arguments") == ["arg", "expr"]
+    assert graph.predecessors("arg") == ["arguments"]
+    assert graph.reachable("mod") == list(graph.names)
+    assert graph.reachable("arg") == [
+        "expr",
+        "expr_context",
+        "boolop",
+        "operator",
+        "unaryop",
+        "cmpop",
+        "comprehension",
+        "arguments",
+        "arg",
+        "keyword",
+    ]
+    assert graph.recursive_types() == {
+        "stmt",
+        "expr",
+        "comprehension",
+        "excepthandler",
+        "arguments",
+        "arg",
+        "keyword",
+        "match_case",
+        "pattern",
+    }
+
+    order = graph.topological_order()
+    assert sorted(order) == sorted(graph.names)
+    components = graph.strongly_connected_components()
+    position = {
+        name: index for index, component in enumerate(components) for name in component
+    }
+    for name in graph.names:
+        for dependency in graph.successors(name):
+            assert position[dependency] <= position[name]
+    assert ["stmt", "excepthandler", "match_case"] in components
+
+
+def test_type_graph_cycles():
+    source = """
+    module X {
+        a = (b x, c y, identifier z)
+        b = (a? x, undefined y)
+        c = C(d* x) | E
+        d = (d? next)
+        e = (int x)
+    }
+    """
+    graph = pyasdl.TypeGraph(pyasdl.parse(source))
+    assert graph.strongly_connected_components() == [["d"], ["c"], ["a", "b"], ["e"]]
+    assert graph.topological_order() == ["d", "c", "a", "b", "e"]
+    assert graph.recursive_types() == {"a", "b", "d"}
+    assert graph.reachable("c") == ["c", "d"]
+    assert graph.reachable(["b", "e"]) == ["a", "b", "c", "d", "e"]
+    with pytest.raises(KeyError):
+        graph.reachable("undefined")
+
+
+def test_type_graph_deep_chain():
+    # Deep enough to overflow the recursion limit, if
+    # the graph was walked recursively.
+    count = sys.getrecursionlimit() * 2
+    body = [
+        Type(f"t{index}", Product([Field(f"t{index + 1}", "next")]))
+        for index in range(count)
+    ]
+    graph = pyasdl.TypeGraph(Module("Chain", body))
+    assert graph.topological_order() == [
+        f"t{index}" for index in reversed(range(count))
+    ]
+    assert len(graph.reachable("t0")) == count
+    assert graph.recursive_types() == set()
+
+
+def test_diff():
+    old = pyasdl.parse_file(ALL_ASDLS[310])
+    new = pyasdl.parse_file(ALL_ASDLS[311])
+    result = pyasdl.diff(old, new)
+    assert result
+    assert result.added == result.removed == []
+    assert result.changed_names == {"stmt"}
+    (change,) = result.changed
+    assert [constructor.name for constructor in change.added_constructors] == [
+        "TryStar"
+    ]
+    assert not change.changed_constructors and not change.kind_changed
+
+    assert not pyasdl.diff(new, pyasdl.parse_file(ALL_ASDLS[311]))
+    assert not pyasdl.diff(new, pyasdl.freeze(new))
+
+
+def test_diff_changes():
+    old = pyasdl.parse(
+        """
+        module X {
+            a = A(int x, string y, expr z) | B | C
+            b = (identifier name, int value) attributes (int lineno)
+            c = C1 | C2
+            d = (int x)
+            e = E1
+        }
+        """
+    )
+    new = pyasdl.parse(
+        """
+        module X {
+            a = A(int* x, expr z, identifier y, int w) | C | B | D
+            b = (string name, int value) attributes (int? lineno)
+            c = (int x)
+            e = E1
+            f = (int y)
+        }
+        """
+    )
+    result = pyasdl.diff(old, new)
+    assert [definition.name for definition in result.added] == ["f"]
+    assert [definition.name for definition in result.removed] == ["d"]
+    assert [change.name for change in result.changed] == ["a", "b", "c"]
+    a, b, c = result.changed
+
+    assert [constructor.name for constructor in a.added_constructors] == ["D"]
+    assert a.removed_constructors == []
+    assert a.reordered_constructors
+    (constructor,) = a.changed_constructors
+    assert constructor.name == "A"
+    assert constructor.fields.added == [Field("int", "w")]
+    assert constructor.fields.removed == []
+    assert constructor.fields.reordered
+    x, y = constructor.fields.changed
+    assert x.name == "x" and x.qualifier_changed and not x.kind_changed
+    assert y.name == "y" and y.kind_changed and not y.qualifier_changed
+
+    assert not b.fields.added and not b.fields.removed
+    assert [change.name for change in b.fields.changed] == ["name"]
+    assert b.fields.changed[0].kind_changed
+    assert b.attributes.changed[0].qualifier_changed
+
+    assert c.kind_changed
+
+
+def test_merge_versions():
+    versions = [
+        (version, pyasdl.parse_file(ALL_ASDLS[version])) for version in (38, 39, 310)
+    ]
+    merged = pyasdl.merge_versions(versions)
+    assert merged.versions == (38, 39, 310)
+
+    slice_type = merged.types["slice"]
+    assert merged.versions_of(slice_type.versions) == [38]
+    assert slice_type.sum_versions == slice_type.versions
+    assert merged.versions_of(merged.types["match_case"].versions) == [310]
+    assert merged.types["stmt"].versions == merged.all_versions
+
+    # Slice moved from the slice sum to expr
+    constructor = merged.constructors["Slice"]
+    assert constructor.versions == merged.all_versions
+    assert constructor.parents == {
+        "slice": merged.bitset([38]),
+        "expr": merged.bitset([39, 310]),
+    }
+    assert merged.versions_of(merged.types["expr"].constructors["Slice"]) == [39, 310]
+
+    names = [field.name for field in merged.types["alias"].attributes]
+    assert names == ["lineno", "col_offset", "end_lineno", "end_col_offset"]
+    assert all(
+        merged.versions_of(field.versions) == [310]
+        for field in merged.types["alias"].attributes
+    )
+
+
+def test_merge_versions_fields():
+    merged = pyasdl.merge_versions(
+        [
+            ("a", pyasdl.parse("module X { a = (int x, int y) b = B(int z) }")),
+            ("b", pyasdl.parse("module X { a = (int x, string y, int w) }")),
+            ("c", pyasdl.parse("module X { a = A | B(int? z) }")),
+        ]
+    )
+    a = merged.types["a"]
+    assert a.versions == 0b111
+    assert a.sum_versions == 0b100 and a.product_versions == 0b011
+    assert [(field.name, field.kind, field.versions) for field in a.fields] == [
+        ("x", "int", 0b011),
+        ("y", "int", 0b001),
+        ("y", "string", 0b010),
+        ("w", "int", 0b010),
+    ]
+    assert a.constructors == {"A": 0b100, "B": 0b100}
+
+    b = merged.constructors["B"]
+    assert b.parents == {"b": 0b001, "a": 0b100}
+    assert [(field.qualifier, field.versions) for field in b.fields] == [
+        (None, 0b001),
+        (FieldQualifier.OPTIONAL, 0b100),
+    ]
+    assert list(merged.iter_versions(0b101)) == ["a", "c"]
+
+    with pytest.raises(ValueError):
+        pyasdl.merge_versions([("a", pyasdl.parse("module X { a = A }"))] * 2)